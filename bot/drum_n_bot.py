@@ -1,32 +1,17 @@
 import os
-import logging
-import logging.handlers
+import sys
 from dotenv import load_dotenv
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 import aiohttp
 import asyncio
 
-# Настройка логирования
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.logs import setup_logging
+
+# Настройка логирования: файл и консоль (для отладки), запись в отдельном потоке
 log_path = '/home/beasty197/projects/vtrnk_radio/logs/drum_n_bot.log'
-handler = logging.handlers.RotatingFileHandler(
-    filename=log_path,
-    maxBytes=5*1024*1024,  # 5MB
-    backupCount=5
-)
-console_handler = logging.StreamHandler()  # Консольный вывод для отладки
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
-class NoDebugFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno > logging.DEBUG
-handler.addFilter(NoDebugFilter())
-console_handler.addFilter(NoDebugFilter())
-logger.addHandler(handler)
-logger.addHandler(console_handler)
+logger = setup_logging(__name__, log_path, console=True)
 
 # Загрузка .env
 load_dotenv('/home/beasty197/projects/vtrnk_radio/.env')
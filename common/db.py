@@ -0,0 +1,184 @@
+import logging
+import queue
+import sqlite3
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUSY_TIMEOUT = 10.0  # Seconds a statement waits for another writer before "database is locked"
+DEFAULT_MMAP_SIZE = 64 * 1024 * 1024  # Bytes of the database file read through mmap
+DEFAULT_CACHE_SIZE = 8 * 1024  # KiB of page cache per connection
+DEFAULT_CACHED_STATEMENTS = 256  # Prepared statements kept per connection
+DEFAULT_POOL_SIZE = 4  # Idle connections kept open
+
+
+class TimedCursor:
+    """Cursor that reports statement and fetch times to on_query(site, operation, elapsed).
+
+    site is the name of the function that called execute(), so timings
+    group by call site without naming every query.
+    """
+
+    def __init__(self, cursor, on_query):
+        self._cursor = cursor
+        self._on_query = on_query
+        self._site = 'unknown'
+
+    def _timed(self, operation, fn, *args):
+        start_time = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._on_query(self._site, operation, time.perf_counter() - start_time)
+
+    def execute(self, sql, parameters=(), _site=None):
+        self._site = _site or sys._getframe(1).f_code.co_name
+        self._timed('execute', self._cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters, _site=None):
+        self._site = _site or sys._getframe(1).f_code.co_name
+        self._timed('execute', self._cursor.executemany, sql, seq_of_parameters)
+        return self
+
+    def fetchone(self):
+        return self._timed('fetch', self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed('fetch', self._cursor.fetchmany, self._cursor.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed('fetch', self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Connection handle from Database.connect(); close() returns it to the pool instead of closing it"""
+
+    def __init__(self, db, conn):
+        object.__setattr__(self, '_db', db)
+        object.__setattr__(self, '_conn', conn)
+
+    def close(self):
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            self._db._release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same as sqlite3.Connection: commit or roll back, but keep the connection
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    def _live(self):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._conn
+
+    def cursor(self):
+        cursor = self._live().cursor()
+        return cursor if self._db.on_query is None else TimedCursor(cursor, self._db.on_query)
+
+    def execute(self, sql, parameters=()):
+        if self._db.on_query is None:
+            return self._live().execute(sql, parameters)
+        return TimedCursor(self._live().cursor(), self._db.on_query).execute(sql, parameters, _site=sys._getframe(1).f_code.co_name)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self._db.on_query is None:
+            return self._live().executemany(sql, seq_of_parameters)
+        return TimedCursor(self._live().cursor(), self._db.on_query).executemany(sql, seq_of_parameters, _site=sys._getframe(1).f_code.co_name)
+
+    def __getattr__(self, name):
+        return getattr(self._live(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+
+class Database:
+    """Shared SQLite access for the player and the track watcher.
+
+    Connections are opened once with WAL journaling and tuned pragmas, then
+    reused: connect() checks one out for the calling thread and close()
+    puts it back. WAL lets readers continue while another process writes,
+    and the busy timeout makes writers wait instead of failing.
+    connect_fn is the raw connect function, e.g. a cooperative wrapper.
+    With on_query, cursors report their timings (see TimedCursor).
+    """
+
+    def __init__(self, path, busy_timeout=DEFAULT_BUSY_TIMEOUT, mmap_size=DEFAULT_MMAP_SIZE,
+                 cache_size=DEFAULT_CACHE_SIZE, cached_statements=DEFAULT_CACHED_STATEMENTS,
+                 pool_size=DEFAULT_POOL_SIZE, connect_fn=sqlite3.connect, on_query=None):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.cached_statements = cached_statements
+        self._connect_fn = connect_fn
+        self.on_query = on_query
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self.stats = {'opened': 0, 'reused': 0}
+
+    def _open(self):
+        # check_same_thread=False: a pooled connection is used by one thread at a time, but not always the same one
+        conn = self._connect_fn(self.path, timeout=self.busy_timeout, check_same_thread=False,
+                                cached_statements=self.cached_statements)
+        try:
+            journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if journal_mode.lower() != 'wal':
+                logger.warning(f"Could not enable WAL for {self.path}, journal_mode={journal_mode}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_size)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+        except Exception:
+            conn.close()
+            raise
+        self.stats['opened'] += 1
+        logger.debug(f"Opened database connection to {self.path}")
+        return conn
+
+    def connect(self):
+        """Check out a connection with rows as sqlite3.Row; call close() when done"""
+        try:
+            conn = self._idle.get_nowait()
+            self.stats['reused'] += 1
+        except queue.Empty:
+            conn = self._open()
+        conn.row_factory = sqlite3.Row
+        return PooledConnection(self, conn)
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()  # Uncommitted work must not leak to the next user
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        except Exception as e:
+            logger.error(f"Dropping database connection to {self.path}: {str(e)}")
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
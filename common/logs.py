@@ -0,0 +1,222 @@
+import atexit
+import importlib
+import json
+import logging
+import logging.handlers
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # Size at which a log file is rotated
+DEFAULT_BACKUP_COUNT = 5  # Rotated files kept
+DEFAULT_REPEAT_WINDOW = 60  # Seconds an identical message is logged once
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed with extra= and goes into JSON lines
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+def _original(module, name):
+    # The writer must be a real OS thread fed by a real queue even in gevent-patched processes
+    try:
+        from gevent import monkey
+    except ImportError:
+        return getattr(importlib.import_module(module), name)
+    return monkey.get_original(module, name)
+
+
+def _native_lock(handler):
+    # Handlers are only entered on the writer thread, or for a non-blocking put; a native lock suits both
+    handler.lock = _original('threading', 'RLock')()
+    return handler
+
+
+class RepeatFilter(logging.Filter):
+    """Drop messages identical to one logged less than window seconds ago.
+
+    The next copy logged after the window says how many were dropped.
+    Runs on the writer thread, so building the message costs callers nothing.
+    """
+
+    def __init__(self, window=DEFAULT_REPEAT_WINDOW, max_keys=1024):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = OrderedDict()  # (logger, level, message) -> [logged_at, dropped]
+        self.suppressed = 0
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.getMessage())
+        entry = self._seen.get(key)
+        if entry is not None and record.created - entry[0] < self.window:
+            entry[1] += 1
+            self.suppressed += 1
+            return False
+        if entry is not None and entry[1]:
+            record.msg = f"{key[2]} (repeated {entry[1]} more times in {record.created - entry[0]:.0f}s)"
+            record.args = None
+        self._seen[key] = [record.created, 0]
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with extra= are included"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer unformatted, tagged with the handlers that should write them.
+
+    %-style arguments are rendered on the writer thread; only arguments
+    that could change before then (lists, dicts, objects) are rendered here.
+    """
+
+    def __init__(self, queue, targets):
+        super().__init__(queue)
+        self.targets = targets
+        _native_lock(self)
+
+    def prepare(self, record):
+        args = record.args.values() if isinstance(record.args, dict) else record.args or ()
+        if not all(isinstance(arg, IMMUTABLE_ARGS) for arg in args):
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        self.queue.put_nowait((self.targets, record))
+
+
+class LogWriter(logging.Filterer):
+    """The single thread of a process that formats records and writes them to disk.
+
+    Callers only append to an in-memory queue, so a slow disk or a log
+    rotation never holds up a request handler or the gevent hub.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queue = _original('queue', 'SimpleQueue')()
+        self._done = _original('_thread', 'allocate_lock')()
+        self._running = False
+        self.stats = {'written': 0, 'errors': 0}
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._done.acquire()
+            _original('_thread', 'start_new_thread')(self._run, ())
+
+    def stop(self, timeout=5):
+        """Write what is queued and end the thread"""
+        if self._running:
+            self.queue.put_nowait(None)
+            if self._done.acquire(timeout=timeout):
+                self._done.release()
+            self._running = False
+
+    def flush(self, timeout=5):
+        """Wait until everything queued so far is written; returns False on timeout"""
+        if not self._running:
+            return True
+        marker = _original('_thread', 'allocate_lock')()
+        marker.acquire()
+        self.queue.put_nowait(marker)
+        return marker.acquire(timeout=timeout)
+
+    def _run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                if not isinstance(item, tuple):
+                    item.release()
+                    continue
+                targets, record = item
+                try:
+                    self._write(targets, record)
+                except Exception:
+                    self.stats['errors'] += 1
+        finally:
+            for targets in self._targets():
+                for handler in targets:
+                    handler.flush()
+            self._done.release()
+
+    def _targets(self):
+        return {id(targets): targets for targets in _TARGETS.values()}.values()
+
+    def _write(self, targets, record):
+        if not self.filter(record):
+            return
+        for handler in targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        self.stats['written'] += 1
+
+
+_writer = None
+_TARGETS = {}  # Logger name -> handlers written by the writer thread
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = LogWriter()
+        repeat_window = float(os.getenv('LOG_REPEAT_WINDOW', DEFAULT_REPEAT_WINDOW))
+        if repeat_window > 0:
+            _writer.addFilter(RepeatFilter(repeat_window))
+        _writer.start()
+        atexit.register(_writer.stop)
+    return _writer
+
+
+def setup_logging(name, filename=None, level=logging.INFO, console=False, json_format=None,
+                  max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+    """Configure logger name (None for the root logger) to write through the process's log writer thread.
+
+    Writes to a rotating filename and/or the console. LOG_FORMAT=json
+    switches to JSON lines unless json_format is given, and LOG_REPEAT_WINDOW
+    (0 disables) sets how long identical messages are collapsed.
+    """
+    if json_format is None:
+        json_format = os.getenv('LOG_FORMAT', 'text') == 'json'
+    formatter = JsonFormatter() if json_format else logging.Formatter(FORMAT)
+    targets = []
+    if filename:
+        targets.append(logging.handlers.RotatingFileHandler(filename=filename, maxBytes=max_bytes, backupCount=backup_count))
+    if console:
+        targets.append(logging.StreamHandler())
+    for handler in targets:
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+        _native_lock(handler)
+    writer = get_writer()
+    writer.flush()  # Records already queued for the previous handlers go out before they are replaced
+    for handler in _TARGETS.pop(name, []):
+        handler.close()
+    _TARGETS[name] = targets
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    for handler in [h for h in logger.handlers if isinstance(h, DeferredQueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(writer.queue, targets))
+    return logger
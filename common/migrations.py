@@ -0,0 +1,116 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# (version, description, statements). Append new migrations; never edit one that has shipped.
+MIGRATIONS = [
+    (1, "Base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS tracks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            title TEXT,
+            cover TEXT,
+            duration REAL,
+            style TEXT,
+            uploaded_by TEXT,
+            upload_date TEXT,
+            playcount INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'available',
+            artist TEXT DEFAULT 'Unknown Artist',
+            track_title TEXT DEFAULT '',
+            path TEXT,
+            track_info TEXT DEFAULT 'track',
+            path_img TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            track_id INTEGER,
+            played_at REAL,
+            FOREIGN KEY (track_id) REFERENCES tracks(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            track_path TEXT,
+            start_time TEXT,
+            enabled INTEGER DEFAULT 1,
+            queued INTEGER DEFAULT 0
+        )
+        """,
+    ]),
+    (2, "Indexes for hot track and schedule queries", [
+        # Metadata, cover, duration and playcount lookups by path
+        "CREATE INDEX IF NOT EXISTS idx_tracks_path ON tracks(path)",
+        # Catalog load and /tracks listing: equality on status and track_info, ordered by upload_date,
+        # covering the catalog columns (id is the rowid and always included)
+        "CREATE INDEX IF NOT EXISTS idx_tracks_listing ON tracks(status, track_info, upload_date, playcount, path)",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_status_upload_date ON tracks(status, upload_date)",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_status_style ON tracks(status, style)",
+        "CREATE INDEX IF NOT EXISTS idx_history_track_id ON history(track_id)",
+        "CREATE INDEX IF NOT EXISTS idx_schedule_pending ON schedule(enabled, queued, start_time)",
+        "CREATE INDEX IF NOT EXISTS idx_schedule_track_path ON schedule(track_path)",
+    ]),
+    (3, "Keyset pagination indexes for /tracks", [
+        # Every index ends with the rowid, so these also order by (upload_date, id) for the cursor
+        "CREATE INDEX IF NOT EXISTS idx_tracks_info_upload_date ON tracks(status, track_info, upload_date)",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_style_upload_date ON tracks(status, style, upload_date)",
+    ]),
+    (4, "Leases for leader election between player processes", [
+        """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            acquired_at REAL
+        )
+        """,
+    ]),
+]
+
+
+def schema_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at REAL
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply pending migrations, each in its own transaction; return the resulting schema version.
+
+    The player and the track watcher both call this at startup. BEGIN
+    IMMEDIATE takes the write lock before the version is read, so only one
+    of them applies a given migration.
+    """
+    version = schema_version(conn)
+    conn.commit()
+    for target, description, statements in migrations:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if target <= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                         (target, description, time.time()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+        logger.info(f"Applied schema migration {target}: {description}")
+    return version
@@ -0,0 +1,144 @@
+import re
+from collections import Counter
+
+UNKNOWN_STYLE = "Unknown"
+
+# Styles shown in the UI and accepted by /update_style
+PREDEFINED_STYLES = [
+    "Jungle", "Techstep", "Drum & Bass", "Breakbeat", "Liquid Funk", "Neurofunk",
+    "Hardstep", "Darkstep", "Ragga Jungle", "Jump Up", "Minimal DnB", "Ambient DnB",
+    "Electronic", "Dance", "Blues", "Reggae"
+]
+# Genre tag spellings mapped to the style stored in tracks.style; these win over PREDEFINED_STYLES
+STYLE_VARIANTS = {
+    "Drum & Bass": [
+        "drum and bass", "dnb", "drum n bass", "d&b", "drumnbass", "drum&bass",
+        "drum 'n' bass", "d'n'b", "drumn'bass"
+    ],
+    "Jungle": [
+        "ragga jungle", "junglist", "jungle dnb", "jungle drum & bass",
+        "jungle drum and bass", "oldskool jungle"
+    ],
+    "Techstep": ["tech step", "tech-step"],
+    "Liquid Funk": ["liquid funk", "liquid dnb", "liquid"],
+    "Neurofunk": ["neuro funk", "neuro"],
+    "Breakbeat": ["break beat", "breaks"],
+    "Hardstep": ["hard step"],
+    "Darkstep": ["dark step", "dark dnb"],
+    "Jump Up": ["jumpup", "jump-up"],
+    "Minimal DnB": ["minimal drum & bass", "minimal dnb"],
+    "Ambient DnB": ["ambient drum & bass", "ambient dnb"],
+    "Electronic": ["электронная музыка", "electronic", "electro"],
+    "Dance": ["dance & dj", "dance & dj/general"],
+    "Experimental": ["experimental", "drone", "noise", "ambient", "musique concrète"]
+}
+
+TOKEN_RE = re.compile(r"[\w&']+")
+
+
+def style_tokens(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+class StyleTaxonomy:
+    """Style names and their spellings, indexed once for constant-time lookups.
+
+    normalize() maps a genre tag to its style through a dict keyed by the
+    tag's tokens, so "Drum-n-Bass " and "drum n bass" hit the same entry.
+    match() finds a predefined style named in free text (a title, an
+    artist) by looking up every run of up to the longest style name's
+    tokens; when several are named, the earliest in styles wins.
+    """
+
+    def __init__(self, styles, variants):
+        self.styles = list(styles)
+        self._aliases = {}
+        for style in self.styles:
+            self._aliases[' '.join(style_tokens(style))] = style
+        for canonical, spellings in variants.items():
+            for spelling in [canonical] + list(spellings):
+                self._aliases[' '.join(style_tokens(spelling))] = canonical
+        self._names = {}  # Tokens of a predefined style -> (priority, style)
+        for priority, style in enumerate(self.styles):
+            self._names.setdefault(' '.join(style_tokens(style)), (priority, self.normalize(style)))
+        self._max_tokens = max((len(key.split()) for key in self._names), default=0)
+
+    def normalize(self, style):
+        """Style for a genre tag, or UNKNOWN_STYLE; only the first of several ';'-separated genres counts"""
+        if not style:
+            return UNKNOWN_STYLE
+        return self._aliases.get(' '.join(style_tokens(style.split(';')[0])), UNKNOWN_STYLE)
+
+    def match(self, *texts):
+        """Predefined style named in any of texts, or UNKNOWN_STYLE"""
+        best = None
+        for text in texts:
+            tokens = style_tokens(text or '')
+            for start in range(len(tokens)):
+                for end in range(start + 1, min(start + self._max_tokens, len(tokens)) + 1):
+                    found = self._names.get(' '.join(tokens[start:end]))
+                    if found is not None and (best is None or found[0] < best[0]):
+                        best = found
+        return best[1] if best else UNKNOWN_STYLE
+
+    def classify(self, genre, *texts):
+        """Style from the genre tag, else from a style named in texts"""
+        style = self.normalize(genre)
+        return style if style != UNKNOWN_STYLE else self.match(*texts)
+
+
+taxonomy = StyleTaxonomy(PREDEFINED_STYLES, STYLE_VARIANTS)
+
+
+def normalize_style(style):
+    return taxonomy.normalize(style)
+
+
+def classify_style(genre, *texts):
+    return taxonomy.classify(genre, *texts)
+
+
+def reclassify_tracks(conn, apply=False, sample_size=20):
+    """Re-run classification over tracks.style, from the stored style, track title and artist.
+
+    Only values that map to the taxonomy (a style, an alias, or empty and
+    "Unknown") are rewritten; a stored style outside it may be curated by
+    hand, so it is kept and listed under unmapped in the report.
+    Reads and writes in one IMMEDIATE transaction, so the column never mixes
+    old and new values; with apply=False the transaction is rolled back.
+    Returns a report: totals, (old, new) counts, unmapped styles and sample rows.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute("SELECT id, name, style, track_title, artist FROM tracks").fetchall()
+        updates = []
+        transitions = Counter()
+        unmapped = Counter()
+        samples = []
+        for row in rows:
+            if row['style'] and row['style'] != UNKNOWN_STYLE and taxonomy.normalize(row['style']) == UNKNOWN_STYLE:
+                unmapped[row['style']] += 1
+                continue
+            new_style = taxonomy.classify(row['style'], row['track_title'], row['artist'])
+            if new_style != row['style']:
+                updates.append((new_style, row['id']))
+                transitions[(row['style'], new_style)] += 1
+                if len(samples) < sample_size:
+                    samples.append({'id': row['id'], 'name': row['name'], 'old': row['style'], 'new': new_style})
+        if apply and updates:
+            conn.executemany("UPDATE tracks SET style = ? WHERE id = ?", updates)
+        if apply:
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    return {
+        'applied': apply,
+        'total': len(rows),
+        'changed': len(updates),
+        'transitions': [{'old': old, 'new': new, 'count': count} for (old, new), count in transitions.most_common()],
+        'unmapped': [{'style': style, 'count': count} for style, count in unmapped.most_common()],
+        'samples': samples
+    }
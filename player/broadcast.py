@@ -0,0 +1,234 @@
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger('radio_player.broadcast')
+
+
+class LocalBus:
+    """In-process bus for a single player process; messages are passed through as-is"""
+
+    def __init__(self):
+        self._handlers = []
+
+    def open(self):
+        pass
+
+    def subscribe(self, handler):
+        self._handlers.append(handler)
+
+    def publish(self, message):
+        for handler in self._handlers:
+            handler(message)
+
+    def close(self):
+        self._handlers = []
+
+
+class UnixSocketBus:
+    """Fanout between player processes on one host over Unix datagram sockets.
+
+    Every process binds its own socket in directory and publishes by sending
+    one datagram to each socket found there, itself included. Sockets left
+    behind by dead processes are removed on the first refused send.
+    Nothing is bound until open().
+    """
+
+    def __init__(self, directory, max_message_size=65536):
+        self.directory = directory
+        self.max_message_size = max_message_size
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock = None
+        self._send_sock = None
+        self._handlers = []
+        self._closed = False
+        self._listener = None
+
+    def open(self):
+        if self._sock is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._listener = threading.Thread(target=self._listen, name='broadcast-bus', daemon=True)
+        self._listener.start()
+
+    def subscribe(self, handler):
+        self._handlers.append(handler)
+
+    def publish(self, message):
+        data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.max_message_size:
+            raise ValueError(f"Broadcast message of {len(data)} bytes exceeds {self.max_message_size}")
+        for path in glob.glob(os.path.join(self.directory, '*.sock')):
+            try:
+                self._send_sock.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                logger.info(f"Removing stale broadcast socket {path}")
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as e:
+                logger.error(f"Error sending broadcast to {path}: {str(e)}")
+
+    def _listen(self):
+        while not self._closed:
+            try:
+                data = self._sock.recv(self.max_message_size)
+                message = json.loads(data)
+            except OSError:
+                if self._closed:
+                    return
+                logger.exception("Error receiving broadcast message")
+                time.sleep(1)
+                continue
+            except ValueError as e:
+                logger.error(f"Dropping malformed broadcast message: {str(e)}")
+                continue
+            for handler in self._handlers:
+                try:
+                    handler(message)
+                except Exception:
+                    logger.exception("Error handling broadcast message")
+
+    def close(self):
+        self._closed = True
+        if self._sock is None:
+            return
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        self._sock.close()
+        self._send_sock.close()
+
+
+def make_bus(url):
+    """Build a bus from a URL: 'local' (default) or 'unix:///path/to/socket/dir'"""
+    if not url or url == 'local':
+        return LocalBus()
+    if url.startswith('unix://'):
+        return UnixSocketBus(url[len('unix://'):])
+    raise ValueError(f"Unsupported broadcast bus: {url}")
+
+
+class Broadcaster:
+    """Socket.IO broadcasts fanned out through a bus, with bursts coalesced.
+
+    publish() sends each message to the bus once; every process then emits
+    it to its own clients with a single socketio.emit, which encodes the
+    packet once for all of them. Events in coalesce are throttled to one
+    emit per interval carrying the latest payload, and a client is skipped
+    when the snapshot it got on connect already covers that payload.
+    on_remote(event, data) is called for messages published by other
+    processes so they can update their local state; listeners added with
+    add_listener() see every event as it is emitted locally. Messages
+    published with emit=False only reach on_remote, for coordination
+    between processes. start() opens the bus.
+    """
+
+    def __init__(self, socketio, bus, interval=0.25, coalesce=('track_update',), on_remote=None):
+        self.socketio = socketio
+        self.bus = bus
+        self.interval = interval
+        self.coalesce = set(coalesce)
+        self.on_remote = on_remote
+        self._listeners = []
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._pending = {}  # event -> (seq, data)
+        self._clients = {}  # sid -> seq of the last payload the client has seen
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._stopped = False
+        self.stats = {'published': 0, 'received': 0, 'emitted': 0, 'coalesced': 0, 'skipped': 0}
+        bus.subscribe(self._receive)
+
+    def start(self):
+        self.bus.open()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='broadcast-flusher', daemon=True)
+            self._flusher.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=2)
+        self.flush()
+        self.bus.close()
+
+    def publish(self, event, data, emit=True):
+        self.stats['published'] += 1
+        self.bus.publish({'event': event, 'data': data, 'origin': self.origin, 'emit': emit})
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _emit(self, event, data, skip_sid=None):
+        self.socketio.emit(event, data, skip_sid=skip_sid)
+        self.stats['emitted'] += 1
+        for listener in self._listeners:
+            try:
+                listener(event, data)
+            except Exception:
+                logger.exception(f"Error in broadcast listener for {event}")
+
+    def client_connected(self, sid):
+        """Call before reading the snapshot sent to sid, so no update can fall between the two"""
+        with self._lock:
+            self._clients[sid] = self._seq
+
+    def client_disconnected(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    def _receive(self, message):
+        event, data = message['event'], message['data']
+        self.stats['received'] += 1
+        if message.get('origin') != self.origin and self.on_remote is not None:
+            self.on_remote(event, data)
+        if not message.get('emit', True):
+            return
+        if event not in self.coalesce:
+            self._emit(event, data)
+            return
+        with self._lock:
+            if event in self._pending:
+                self.stats['coalesced'] += 1
+            self._seq += 1
+            self._pending[event] = (self._seq, data)
+        self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            clients = dict(self._clients)
+        for event, (seq, data) in pending.items():
+            skip = [sid for sid, seen in clients.items() if seen >= seq]
+            self._emit(event, data, skip_sid=skip or None)
+            self.stats['skipped'] += len(skip)
+
+    def _flush_loop(self):
+        while not self._stopped:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error flushing broadcasts")
+            time.sleep(self.interval)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, clients=len(self._clients), pending=len(self._pending))
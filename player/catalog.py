@@ -0,0 +1,170 @@
+import bisect
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger('radio_player.catalog')
+
+
+class _Bucket:
+    """Set of paths with O(1) add, remove and uniform random pick"""
+
+    def __init__(self):
+        self.paths = []
+        self.index = {}
+
+    def add(self, path):
+        if path not in self.index:
+            self.index[path] = len(self.paths)
+            self.paths.append(path)
+
+    def remove(self, path):
+        position = self.index.pop(path)
+        last = self.paths.pop()
+        if last != path:
+            self.paths[position] = last
+            self.index[last] = position
+
+    def __len__(self):
+        return len(self.paths)
+
+
+class TrackCatalog:
+    """In-memory index of playable tracks bucketed by playcount.
+
+    sample() picks a bucket with probability proportional to its eligible
+    size times playcount_decay ** (playcount - lowest eligible playcount),
+    then draws recency_choices random tracks from it and keeps the most
+    recent upload.
+    Excluded tracks are skipped with O(1) set lookups, so the cost does not
+    depend on library size.
+    """
+
+    def __init__(self, playcount_decay=0.5, recency_choices=2, rng=None):
+        self.playcount_decay = playcount_decay
+        self.recency_choices = max(1, recency_choices)
+        self.rng = rng or random.Random()
+        self._tracks = {}  # path -> {'id', 'playcount', 'upload_date'}
+        self._buckets = {}  # playcount -> _Bucket
+        self._playcounts = []  # sorted keys of _buckets
+        self._max_id = 0
+        self.loaded_at = None
+        self.synced_at = None
+        self._lock = threading.Lock()
+
+    def _insert(self, path, track_id, playcount, upload_date):
+        playcount = playcount or 0
+        self._tracks[path] = {'id': track_id, 'playcount': playcount, 'upload_date': upload_date or ''}
+        bucket = self._buckets.get(playcount)
+        if bucket is None:
+            bucket = self._buckets[playcount] = _Bucket()
+            bisect.insort(self._playcounts, playcount)
+        bucket.add(path)
+        if track_id and track_id > self._max_id:
+            self._max_id = track_id
+
+    def _delete(self, path):
+        track = self._tracks.pop(path, None)
+        if track is None:
+            return None
+        bucket = self._buckets[track['playcount']]
+        bucket.remove(path)
+        if not bucket:
+            del self._buckets[track['playcount']]
+            self._playcounts.remove(track['playcount'])
+        return track
+
+    def load(self, rows):
+        """Replace the catalog with rows of (id, path, playcount, upload_date)"""
+        with self._lock:
+            self._tracks.clear()
+            self._buckets.clear()
+            self._playcounts = []
+            self._max_id = 0
+            for row in rows:
+                self._insert(row['path'], row['id'], row['playcount'], row['upload_date'])
+            self.loaded_at = self.synced_at = time.time()
+            logger.info(f"Loaded track catalog: {len(self._tracks)} tracks in {len(self._playcounts)} playcount buckets")
+
+    def add(self, path, track_id=None, playcount=0, upload_date=''):
+        with self._lock:
+            self._delete(path)
+            self._insert(path, track_id, playcount, upload_date)
+
+    def remove(self, path):
+        with self._lock:
+            return self._delete(path) is not None
+
+    def played(self, path, count=1):
+        """Move a track to the next playcount bucket"""
+        with self._lock:
+            track = self._delete(path)
+            if track is not None:
+                self._insert(path, track['id'], track['playcount'] + count, track['upload_date'])
+
+    def invalidate(self):
+        """Force a full reload on the next sync"""
+        with self._lock:
+            self.loaded_at = None
+
+    def needs_load(self):
+        return self.loaded_at is None
+
+    def needs_sync(self, interval):
+        return self.synced_at is None or time.time() - self.synced_at > interval
+
+    def mark_synced(self):
+        self.synced_at = time.time()
+
+    @property
+    def max_id(self):
+        return self._max_id
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __contains__(self, path):
+        return path in self._tracks
+
+    def get(self, path):
+        with self._lock:
+            track = self._tracks.get(path)
+            return dict(track, path=path) if track else None
+
+    def sample(self, exclude=()):
+        """Pick a track not in exclude; return its record or None"""
+        with self._lock:
+            if not self._playcounts:
+                return None
+            excluded_per_bucket = {}
+            for path in exclude:
+                track = self._tracks.get(path)
+                if track is not None:
+                    excluded_per_bucket[track['playcount']] = excluded_per_bucket.get(track['playcount'], 0) + 1
+            eligible_per_bucket = [len(self._buckets[playcount]) - excluded_per_bucket.get(playcount, 0)
+                                   for playcount in self._playcounts]
+            # Relative to the lowest bucket with an eligible track: a fully excluded bucket far below would underflow every weight
+            lowest = next((playcount for playcount, eligible in zip(self._playcounts, eligible_per_bucket)
+                           if eligible > 0), None)
+            if lowest is None:
+                return None
+            weights = [eligible * self.playcount_decay ** (playcount - lowest) if eligible > 0 else 0.0
+                       for playcount, eligible in zip(self._playcounts, eligible_per_bucket)]
+            playcount = self.rng.choices(self._playcounts, weights=weights)[0]
+            bucket = self._buckets[playcount]
+            best = None
+            for _ in range(self.recency_choices):
+                path = self._pick_eligible(bucket, exclude)
+                if best is None or self._tracks[path]['upload_date'] > self._tracks[best]['upload_date']:
+                    best = path
+            return dict(self._tracks[best], path=best)
+
+    def _pick_eligible(self, bucket, exclude, attempts=16):
+        for _ in range(attempts):
+            path = bucket.paths[self.rng.randrange(len(bucket.paths))]
+            if path not in exclude:
+                return path
+        # Only reached when most of the bucket is excluded, so the bucket is small
+        eligible = [path for path in bucket.paths if path not in exclude]
+        return self.rng.choice(eligible)
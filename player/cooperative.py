@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import sys
+from dotenv import load_dotenv
+
+
+def enabled():
+    """COOPERATIVE_MODE=1 (the default) runs the server with gevent-patched sockets, sleeps and threads"""
+    load_dotenv()
+    return os.getenv('COOPERATIVE_MODE', '1') == '1'
+
+
+def patch():
+    """Monkey-patch the standard library for gevent; must run before threading, socket or time are used"""
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def is_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Run fn in gevent's native thread pool when patched, so C-level blocking calls don't stall the hub.
+
+    fn must not touch gevent primitives (patched locks, events, sockets):
+    it runs on a real OS thread, outside any greenlet.
+    """
+    if not is_patched():
+        return fn(*args, **kwargs)
+    import gevent
+    ok, value = gevent.get_hub().threadpool.apply(_capture, (fn, args, kwargs))
+    if not ok:
+        raise value
+    return value
+
+
+def start_native_thread(fn, *args):
+    """Run fn on a real OS thread even when patched, so it keeps running while greenlets hold the hub.
+
+    The same restrictions as run_blocking apply; use native_sleep to wait.
+    """
+    if is_patched():
+        from gevent import monkey
+        monkey.get_original('_thread', 'start_new_thread')(fn, args)
+    else:
+        import threading
+        threading.Thread(target=fn, args=args, daemon=True).start()
+
+
+def native_thread_ident():
+    """Identifier of the calling OS thread, as used by sys._current_frames(); patched threads report greenlet ids"""
+    if is_patched():
+        from gevent import monkey
+        return monkey.get_original('_thread', 'get_ident')()
+    import threading
+    return threading.get_ident()
+
+
+def native_sleep(seconds):
+    if is_patched():
+        from gevent import monkey
+        return monkey.get_original('time', 'sleep')(seconds)
+    import time
+    return time.sleep(seconds)
+
+
+def in_unpatched_greenlet():
+    """True inside a gevent greenlet of an unpatched process, e.g. gevent's WSGIServer with COOPERATIVE_MODE=0.
+
+    There threading waits block the one OS thread that serves every request.
+    """
+    if is_patched() or 'gevent' not in sys.modules:
+        return False
+    import gevent
+    return isinstance(gevent.getcurrent(), gevent.Greenlet)
+
+
+class HubWaiter:
+    """Parks the calling greenlet on its hub; wake() may be called from any thread"""
+
+    def __init__(self):
+        import gevent
+        from gevent.event import Event
+        self._event = Event()
+        self._loop = gevent.get_hub().loop
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+        self._event.clear()
+
+    def wake(self):
+        # gevent events belong to one thread; the set runs as a callback on the waiter's hub
+        self._loop.run_callback_threadsafe(self._event.set)
+
+
+def _capture(fn, args, kwargs):
+    # Hand exceptions back to the caller; the thread pool would otherwise print them to stderr as well
+    try:
+        return True, fn(*args, **kwargs)
+    except Exception as e:
+        return False, e
+
+
+class ThreadpoolCursor:
+    """sqlite3.Cursor whose statements and fetches run through run_blocking"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parameters=()):
+        run_blocking(self._cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        run_blocking(self._cursor.executemany, sql, list(seq_of_parameters))
+        return self
+
+    def fetchone(self):
+        return run_blocking(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return run_blocking(self._cursor.fetchmany, size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return run_blocking(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        # rowcount, lastrowid, description
+        return getattr(self._cursor, name)
+
+
+class ThreadpoolConnection:
+    """sqlite3.Connection whose blocking calls run through run_blocking"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return ThreadpoolCursor(self._conn.cursor())
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        run_blocking(self._conn.commit)
+
+    def rollback(self):
+        run_blocking(self._conn.rollback)
+
+    def close(self):
+        run_blocking(self._conn.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def __getattr__(self, name):
+        # row_factory, total_changes, in_transaction
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name == '_conn':
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+
+def connect_sqlite(path, **kwargs):
+    """sqlite3.connect(); in cooperative mode the connection offloads every query to the thread pool"""
+    if not is_patched():
+        return sqlite3.connect(path, **kwargs)
+    kwargs['check_same_thread'] = False
+    conn = run_blocking(sqlite3.connect, path, **kwargs)
+    return ThreadpoolConnection(conn)
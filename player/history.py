@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from cooperative import run_blocking
+
+logger = logging.getLogger('radio_player.history')
+
+
+def append_lines(path, lines):
+    with open(path, 'a') as f:
+        f.write(''.join(f"{line}\n" for line in lines))
+
+
+def replace_lines(path, lines):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(''.join(f"{line}\n" for line in lines))
+    os.replace(tmp_path, path)
+
+
+class PlaybackHistory:
+    """Most recently played tracks, oldest first, with O(1) membership and eviction.
+
+    The history file doubles as an append-only journal: every play appends
+    one line, and replaying the lines in order rebuilds the same state. Once
+    the journal grows past compact_factor * max_size lines it is rewritten
+    with just the live entries, which is also the classic file format.
+    File writes happen outside the lock guarding the in-memory state, so
+    lookups never wait on the disk; a separate lock keeps appends and
+    compactions in order.
+    """
+
+    def __init__(self, path, max_size, compact_factor=4):
+        self.path = path
+        self.max_size = max_size
+        self.compact_threshold = max_size * compact_factor
+        self._tracks = OrderedDict()
+        self._journal_lines = 0  # Guarded by _io_lock
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+
+    def _push(self, track_path):
+        if track_path in self._tracks:
+            self._tracks.move_to_end(track_path)
+        else:
+            self._tracks[track_path] = None
+            if len(self._tracks) > self.max_size:
+                self._tracks.popitem(last=False)
+
+    def load(self):
+        """Replay the journal into memory"""
+        with self._io_lock:
+            lines = []
+            try:
+                with open(self.path, 'r') as f:
+                    lines = [line.strip() for line in f if line.strip()]
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error loading playback history: {str(e)}")
+            with self._lock:
+                self._tracks.clear()
+                for line in lines:
+                    self._push(line)
+                count = len(self._tracks)
+            self._journal_lines = len(lines)
+            logger.info(f"Loaded playback history, {count} tracks from {self._journal_lines} journal lines")
+            if self._journal_lines > self.compact_threshold:
+                self._compact()
+
+    def add(self, track_path, persist=True):
+        """Record a play in memory; with persist=False the caller journals it later with persist()"""
+        with self._lock:
+            self._push(track_path)
+        if persist:
+            self.persist([track_path])
+
+    def persist(self, track_paths):
+        """Append plays already added in memory to the journal in one write"""
+        with self._io_lock:
+            try:
+                run_blocking(append_lines, self.path, track_paths)
+                self._journal_lines += len(track_paths)
+            except Exception as e:
+                logger.error(f"Error appending to playback history: {str(e)}")
+            if self._journal_lines > self.compact_threshold:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the journal with the live entries; the caller holds _io_lock"""
+        with self._lock:
+            tracks = list(self._tracks)
+        try:
+            run_blocking(replace_lines, self.path, tracks)
+            logger.info(f"Compacted playback history journal from {self._journal_lines} to {len(tracks)} lines")
+            self._journal_lines = len(tracks)
+        except Exception as e:
+            logger.error(f"Error compacting playback history: {str(e)}")
+
+    def __contains__(self, track_path):
+        return track_path in self._tracks
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def recent(self, count=None):
+        """Return up to count most recent tracks, oldest first"""
+        with self._lock:
+            tracks = list(self._tracks)
+        return tracks if count is None else tracks[-count:] if count > 0 else []
+
+    def recent_set(self, count=None):
+        if count is None or count >= self.max_size:
+            with self._lock:
+                return set(self._tracks)
+        return set(self.recent(count))
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('radio_player.jobs')
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobManager:
+    """Runs slow control actions on a thread pool and tracks their status.
+
+    submit() returns immediately with a job record. Jobs sharing a key are
+    deduplicated: while one is queued or running, submitting another with the
+    same key returns the existing job instead of starting a new one.
+    on_update(job) is called with a copy of the record on every status change.
+    Finished jobs are kept for ttl seconds so clients can still poll them.
+    """
+
+    def __init__(self, max_workers=2, ttl=3600, on_update=None):
+        self.ttl = ttl
+        self.on_update = on_update
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}  # id -> job record
+        self._active = {}  # key -> id of the queued or running job
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, key=None, params=None):
+        """Queue fn(); return (job, created), where created is False for a deduplicated submit"""
+        key = key or kind
+        with self._lock:
+            self._prune()
+            active_id = self._active.get(key)
+            if active_id is not None:
+                return dict(self._jobs[active_id]), False
+            job = {
+                'id': uuid.uuid4().hex,
+                'kind': kind,
+                'key': key,
+                'params': params or {},
+                'status': 'queued',
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self._jobs[job['id']] = job
+            self._active[key] = job['id']
+            snapshot = dict(job)
+        logger.info(f"Queued job {job['id']} ({kind})")
+        self._notify(snapshot)
+        self._executor.submit(self._run, job['id'], fn)
+        return snapshot, True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def active(self):
+        with self._lock:
+            return [dict(self._jobs[job_id]) for job_id in self._active.values()]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if job['status'] not in ACTIVE_STATUSES and self._active.get(job['key']) == job_id:
+                del self._active[job['key']]
+            snapshot = dict(job)
+        self._notify(snapshot)
+        return snapshot
+
+    def _run(self, job_id, fn):
+        job = self._update(job_id, status='running', started_at=time.time())
+        try:
+            result = fn()
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['kind']}) failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+        else:
+            logger.info(f"Job {job_id} ({job['kind']}) finished in {time.time() - job['started_at']:.1f}s")
+            self._update(job_id, status='succeeded', result=result, finished_at=time.time())
+
+    def _notify(self, job):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job)
+        except Exception as e:
+            logger.error(f"Error publishing update for job {job['id']}: {str(e)}")
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
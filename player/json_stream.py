@@ -0,0 +1,44 @@
+import base64
+import json
+import zlib
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe pagination cursor for a list of JSON values"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {str(e)}") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def json_array_chunks(items, batch_size=200):
+    """Encode an iterable of JSON-serializable items as one array, a batch of items per chunk"""
+    yield b'['
+    batch = []
+    first = True
+    for item in items:
+        batch.append(json.dumps(item, separators=(',', ':'), sort_keys=True))
+        if len(batch) >= batch_size:
+            yield (('' if first else ',') + ','.join(batch)).encode('utf-8')
+            first = False
+            batch = []
+    if batch:
+        yield (('' if first else ',') + ','.join(batch)).encode('utf-8')
+    yield b']\n'
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,152 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger('radio_player.leader')
+
+
+def holder_alive(holder):
+    """False only when holder names a process on this host that no longer exists"""
+    host, _, rest = holder.partition(':')
+    pid = rest.partition(':')[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LeaderElection:
+    """Lease-based leader election over a row of the leases table.
+
+    Every process runs one election thread that tries to take or renew the
+    lease named name every renew_interval seconds. The lease is taken over
+    when it has expired, or at once when its holder was a process on this
+    host that has died. A leader that cannot renew steps down before its
+    lease runs out, so two processes never lead at the same time.
+    on_elected() and on_demoted() start and stop the work only the leader
+    does.
+    """
+
+    def __init__(self, db, name, ttl=15.0, renew_interval=5.0, on_elected=None, on_demoted=None):
+        self.db = db
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self._expires_at = 0.0
+        self._lock = threading.Lock()  # Serializes elections with stop()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self.stats = {'elections': 0, 'demotions': 0, 'errors': 0, 'leader': None}
+
+    def start(self):
+        """Run the first election in the calling thread, then keep the lease from a background thread"""
+        if self._thread is None:
+            self._stopped = False
+            self.elect()
+            self._thread = threading.Thread(target=self._loop, name='leader-election', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Release the lease so another process takes over without waiting for it to expire"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            if self.is_leader:
+                self._set_leader(False)
+                try:
+                    conn = self.db.connect()
+                    try:
+                        conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+                        conn.commit()
+                    finally:
+                        conn.close()
+                except Exception as e:
+                    logger.error(f"Error releasing lease {self.name}: {str(e)}")
+
+    def _try_acquire(self, now):
+        conn = self.db.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+            if row is not None and row[0] != self.holder and row[1] > now and holder_alive(row[0]):
+                conn.rollback()
+                return row[0]
+            conn.execute("""
+                INSERT INTO leases (name, holder, expires_at, acquired_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    acquired_at = CASE WHEN holder = excluded.holder THEN acquired_at ELSE excluded.acquired_at END,
+                    holder = excluded.holder,
+                    expires_at = excluded.expires_at
+            """, (self.name, self.holder, now + self.ttl, now))
+            conn.commit()
+            return self.holder
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def elect(self):
+        """Take or renew the lease once; return True while this process is the leader"""
+        with self._lock:
+            if self._stopped:
+                return False
+            now = time.time()
+            try:
+                leader = self._try_acquire(now)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error renewing lease {self.name}: {str(e)}")
+                # Step down while the lease is still ours, before anyone else can take it
+                if self.is_leader and time.time() >= self._expires_at - self.renew_interval:
+                    self._set_leader(False)
+                return self.is_leader
+            self.stats['leader'] = leader
+            if leader == self.holder:
+                self._expires_at = now + self.ttl
+            if (leader == self.holder) != self.is_leader:
+                self._set_leader(leader == self.holder)
+            return self.is_leader
+
+    def _set_leader(self, is_leader):
+        self.is_leader = is_leader
+        if is_leader:
+            self.stats['elections'] += 1
+            logger.info(f"Acquired lease {self.name} as {self.holder}")
+            callback = self.on_elected
+        else:
+            self.stats['demotions'] += 1
+            logger.warning(f"Gave up lease {self.name} held by {self.holder}")
+            callback = self.on_demoted
+        if callback is not None:
+            try:
+                callback()
+            except Exception:
+                logger.exception(f"Error in leader callback for {self.name}")
+
+    def _loop(self):
+        while not self._stopped:
+            self._wake.wait(self.renew_interval)
+            if self._stopped:
+                return
+            self.elect()
+
+    def snapshot(self):
+        return dict(self.stats, name=self.name, holder=self.holder, is_leader=self.is_leader,
+                    expires_in=max(0.0, self._expires_at - time.time()) if self.is_leader else None)
@@ -0,0 +1,328 @@
+import logging
+import random
+import select
+import telnetlib
+import threading
+import time
+from queue import LifoQueue, Empty
+
+logger = logging.getLogger('radio_player.liquidsoap')
+
+# Liquidsoap terminates every telnet response with a line containing only END
+END_MARKER = b"END"
+# Commands that only read state, so they may be sent again when a reply is lost
+READ_ONLY_PREFIX = 'get_'
+
+
+class LiquidsoapError(Exception):
+    """Raised when a command cannot be delivered to Liquidsoap or times out"""
+
+
+class LiquidsoapUnavailable(LiquidsoapError):
+    """Raised when a command was not sent: the breaker is open or no connection could be made"""
+
+
+class _StaleConnection(LiquidsoapError):
+    pass
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker with exponential backoff between recovery probes."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=2.0, max_reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._backoff = reset_timeout
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go through; in the open state only one probe is let out per backoff period"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self._retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """Close the breaker; return True if this call recovered it from open or half-open"""
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._backoff = self.reset_timeout
+            return recovered
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._backoff = min(self._backoff * 2, self.max_reset_timeout)
+                self._open()
+                return
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        if self.state == self.CLOSED:
+            self.opened_at = time.time()
+            logger.error(f"Liquidsoap circuit breaker opened after {self.failures} consecutive failures")
+        self.state = self.OPEN
+        # Jitter keeps probes from lining up with other periodic callers
+        self._retry_at = time.monotonic() + self._backoff * random.uniform(1.0, 1.2)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'opened_at': self.opened_at,
+                'retry_in': max(0.0, self._retry_at - time.monotonic()) if self.state != self.CLOSED else 0.0
+            }
+
+
+class _Connection:
+    def __init__(self, host, port, timeout):
+        self.telnet = telnetlib.Telnet(host, port, timeout)
+        self.last_used = time.monotonic()
+        self.reused = False
+
+    def looks_closed(self):
+        """Liquidsoap never writes unprompted: an idle connection with something to read was closed by it"""
+        try:
+            readable, _, _ = select.select([self.telnet.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def close(self):
+        try:
+            self.telnet.write(b"quit\n")
+        except Exception:
+            pass
+        try:
+            self.telnet.close()
+        except Exception:
+            pass
+
+
+class LiquidsoapClient:
+    """Pooled telnet client for the Liquidsoap control server.
+
+    Connections are kept open between commands and reused; a connection that
+    fails or sits idle longer than idle_timeout is dropped and reopened on the
+    next call, and one Liquidsoap has closed is detected before anything is
+    written to it. Every command has a deadline covering both the wait for a
+    free connection and the full read up to the END marker. Once a command
+    has been written it is only retried if it is read-only (get_*), since
+    Liquidsoap may already have run it.
+
+    With a breaker, commands fail fast with LiquidsoapUnavailable while
+    Liquidsoap is down. Commands queued with defer() are replayed once, in
+    order, when the breaker closes again; only the latest command per name
+    is kept.
+    """
+
+    def __init__(self, host, port, pool_size=2, connect_timeout=2.0,
+                 command_timeout=5.0, idle_timeout=20.0, breaker=None, on_command=None):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.idle_timeout = idle_timeout
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._stats_lock = threading.Lock()
+        self.stats = {}
+        self.breaker = breaker
+        self.on_command = on_command  # on_command(name, elapsed, failed) after every round trip, e.g. for metrics
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def _acquire(self, deadline):
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise LiquidsoapUnavailable("Timed out waiting for a free Liquidsoap connection")
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            if time.monotonic() - conn.last_used < self.idle_timeout and not conn.looks_closed():
+                conn.reused = True
+                return conn
+            conn.close()
+        try:
+            timeout = min(self.connect_timeout, max(0.01, deadline - time.monotonic()))
+            return _Connection(self.host, self.port, timeout)
+        except Exception as e:
+            self._slots.release()
+            raise LiquidsoapUnavailable(f"Cannot connect to Liquidsoap at {self.host}:{self.port}: {e}") from e
+
+    def _release(self, conn, reuse):
+        if reuse:
+            conn.last_used = time.monotonic()
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def _read_response(self, conn, deadline):
+        lines = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LiquidsoapError("Timed out reading Liquidsoap response")
+            line = conn.telnet.read_until(b"\n", remaining)
+            if not line.endswith(b"\n"):
+                if conn.telnet.eof:
+                    raise LiquidsoapError("Liquidsoap closed the connection")
+                raise LiquidsoapError("Timed out reading Liquidsoap response")
+            line = line.rstrip(b"\r\n")
+            if line == END_MARKER:
+                return "\n".join(lines)
+            lines.append(line.decode('utf-8', errors='replace'))
+
+    def _execute(self, command, deadline):
+        conn = self._acquire(deadline)
+        reuse = False
+        written = False
+        try:
+            conn.telnet.write((command + "\n").encode('utf-8'))
+            written = True
+            response = self._read_response(conn, deadline)
+            reuse = True
+            return response
+        except (OSError, EOFError, LiquidsoapError) as e:
+            retryable = not written or command.startswith(READ_ONLY_PREFIX)
+            if conn.reused and retryable and time.monotonic() < deadline:
+                raise _StaleConnection(str(e)) from e
+            raise
+        finally:
+            self._release(conn, reuse)
+
+    def command(self, command, timeout=None):
+        """Send a command and return the full response without the END marker"""
+        timeout = self.command_timeout if timeout is None else timeout
+        name = command.split(' ', 1)[0]
+        with self._pending_lock:
+            superseded = self._pending.get(name)
+        if self.breaker and not self.breaker.allow():
+            self._record(command, 0.0, failed=True)
+            raise LiquidsoapUnavailable("Liquidsoap circuit breaker is open")
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        try:
+            try:
+                response = self._execute(command, deadline)
+            except _StaleConnection as e:
+                # A pooled connection failed before the command was written, or a read-only
+                # command lost its reply; retry once on a fresh connection
+                logger.warning(f"Liquidsoap command '{command}' failed ({e}), retrying on a new connection")
+                self._drain_idle()
+                response = self._execute(command, deadline)
+        except (OSError, EOFError) as e:
+            self._on_failure(command, start_time)
+            raise LiquidsoapError(str(e)) from e
+        except LiquidsoapError:
+            self._on_failure(command, start_time)
+            raise
+        elapsed = time.monotonic() - start_time
+        self._record(command, elapsed)
+        if superseded is not None:
+            # Delivered, so it supersedes the deferred command with the same name; one deferred meanwhile is kept
+            with self._pending_lock:
+                if self._pending.get(name) is superseded:
+                    del self._pending[name]
+        if self.breaker and self.breaker.record_success():
+            logger.info("Liquidsoap is reachable again, circuit breaker closed")
+            self._replay_pending()
+        logger.debug("Liquidsoap command '%s' executed, response: '%s', time: %.1fms", command, response, elapsed * 1000)
+        return response
+
+    def _on_failure(self, command, start_time):
+        self._record(command, time.monotonic() - start_time, failed=True)
+        if self.breaker:
+            self.breaker.record_failure()
+
+    def defer(self, command, replace=True):
+        """Queue a command to be sent once when Liquidsoap becomes reachable again"""
+        name = command.split(' ', 1)[0]
+        with self._pending_lock:
+            if not replace and name in self._pending:
+                return
+            self._pending.pop(name, None)
+            self._pending[name] = command
+        logger.warning(f"Liquidsoap unavailable, deferred command '{command}'")
+
+    def command_or_defer(self, command):
+        """Send a command, deferring it if it could not be delivered; return None when deferred"""
+        try:
+            return self.command(command)
+        except LiquidsoapUnavailable:
+            self.defer(command)
+            return None
+
+    def available(self):
+        """False while the breaker is open or probing; callers should skip non-urgent work"""
+        return self.breaker is None or self.breaker.state == CircuitBreaker.CLOSED
+
+    def pending_commands(self):
+        with self._pending_lock:
+            return list(self._pending.values())
+
+    def _replay_pending(self):
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        if pending:
+            threading.Thread(target=self._send_pending, args=(pending,), daemon=True).start()
+
+    def _send_pending(self, pending):
+        for command in pending:
+            try:
+                self.command(command)
+                logger.info(f"Replayed deferred Liquidsoap command '{command}'")
+            except LiquidsoapUnavailable:
+                self.defer(command, replace=False)
+            except LiquidsoapError as e:
+                # The command may have reached Liquidsoap; do not risk sending it twice
+                logger.error(f"Replay of deferred command '{command}' failed: {str(e)}")
+
+    def _record(self, command, elapsed, failed=False):
+        name = command.split(' ', 1)[0]
+        with self._stats_lock:
+            entry = self.stats.setdefault(name, {'count': 0, 'errors': 0, 'total_time': 0.0, 'max_time': 0.0, 'last_time': 0.0})
+            entry['count'] += 1
+            entry['total_time'] += elapsed
+            entry['last_time'] = elapsed
+            entry['max_time'] = max(entry['max_time'], elapsed)
+            if failed:
+                entry['errors'] += 1
+        if self.on_command is not None:
+            self.on_command(name, elapsed, failed)
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {name: dict(entry) for name, entry in self.stats.items()}
+
+    def _drain_idle(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+    def close(self):
+        self._drain_idle()
@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from cooperative import run_blocking
+
+logger = logging.getLogger('radio_player.now_playing')
+
+
+def dump_json(data):
+    """Serialize the way Flask's jsonify does, so pre-encoded bodies match"""
+    return (json.dumps(data, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file in the same directory and rename it over path"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class NowPlayingStore:
+    """Thread-safe in-memory record of the current track.
+
+    Memory is the source of truth; the file is only a restart snapshot,
+    written by a background thread with an atomic rename. Registered views
+    are serialized once per update so hot endpoints return ready-made bytes.
+    """
+
+    def __init__(self, path, default):
+        self.path = path
+        self.default = dict(default)
+        self._data = dict(default)
+        self._views = {}
+        self._renderers = {}
+        self.version = 0
+        # Versions restart with the process; the epoch keeps ETags from colliding across restarts
+        self._epoch = format(int(time.time()), 'x')
+        self._written_version = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Serializes writers so update() never loses a concurrent set()
+        self._dirty = threading.Event()
+        self._writer = None
+        self._stopped = False
+
+    def load(self):
+        """Load the snapshot persisted by a previous run, if any"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("snapshot is not a JSON object")
+            self._apply(data)
+            self._written_version = self.version
+            logger.info(f"Loaded now playing state from {self.path}: {data.get('filename', '')}")
+        except FileNotFoundError:
+            self._apply(self.default)
+            self._written_version = self.version
+        except Exception as e:
+            logger.error(f"Error loading now playing state from {self.path}: {str(e)}")
+            self._apply(self.default)
+
+    def add_view(self, name, render):
+        """Register a pre-serialized view; render(data) returns bytes or another value callers must not modify"""
+        with self._lock:
+            self._renderers[name] = render
+            self._views[name] = render(self._data)
+
+    def _apply(self, data):
+        views = {name: render(data) for name, render in self._renderers.items()}
+        with self._lock:
+            self._data = dict(data)
+            self._views = views
+            self.version += 1
+
+    def get(self):
+        with self._lock:
+            return dict(self._data)
+
+    def view(self, name):
+        with self._lock:
+            return self._views[name]
+
+    def peek(self, name):
+        """Return (etag, data, view bytes) from one consistent version; data must not be modified"""
+        with self._lock:
+            return f"{self._epoch}-{self.version}", self._data, self._views[name]
+
+    def set(self, data):
+        """Replace the current track and schedule a write of the snapshot"""
+        with self._write_lock:
+            self._apply(data)
+        self._dirty.set()
+
+    def update(self, **fields):
+        """Merge fields into the current track"""
+        with self._write_lock:
+            data = dict(self._data)
+            data.update(fields)
+            self._apply(data)
+        self._dirty.set()
+
+    def start(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='now-playing-writer', daemon=True)
+            self._writer.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped = True
+        self._dirty.set()
+        if self._writer is not None:
+            self._writer.join(timeout=2)
+        self.flush()
+
+    def flush(self):
+        """Write the snapshot now if it changed since the last write"""
+        with self._lock:
+            data = dict(self._data)
+            version = self.version
+        if version == self._written_version:
+            return
+        try:
+            run_blocking(write_json_atomic, self.path, data)
+            self._written_version = version
+        except Exception as e:
+            logger.error(f"Error persisting now playing state to {self.path}: {str(e)}")
+
+    def _write_loop(self):
+        while not self._stopped:
+            self._dirty.wait()
+            self._dirty.clear()
+            if self._stopped:
+                return
+            self.flush()
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger('radio_player.play_recorder')
+
+
+class PlayRecorder:
+    """Write-behind buffer for track starts.
+
+    record() is called from the Liquidsoap callbacks and only touches
+    memory: the same transition reported by both /track_started and
+    POST /track is counted once, and plays accumulate until a background
+    thread hands them to persist(increments, plays) every interval seconds,
+    and once more on stop(). increments maps path to a play count and plays
+    lists (path, played_at) in order; persist is expected to write both in
+    one transaction. A failed flush is merged back and retried.
+    """
+
+    def __init__(self, persist, interval=2.0, last_played=None):
+        self._persist = persist
+        self.interval = interval
+        self.last_played = last_played
+        self._increments = Counter()
+        self._plays = []
+        self._in_flight = Counter()
+        self._lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # Held while a flush writes; readers of the database can hold it too
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self.stats = {'recorded': 0, 'duplicates': 0, 'flushes': 0, 'errors': 0, 'last_flush': None}
+
+    def start(self):
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name='play-recorder', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def record(self, track_path, played_at=None):
+        """Buffer a track start; return False if it repeats the last recorded transition"""
+        with self._lock:
+            if track_path == self.last_played:
+                self.stats['duplicates'] += 1
+                return False
+            self.last_played = track_path
+            self._increments[track_path] += 1
+            self._plays.append((track_path, played_at or time.time()))
+            self.stats['recorded'] += 1
+        self._wake.set()
+        return True
+
+    def recorded_elsewhere(self, track_path):
+        """Another process recorded this start; return False if this one already had it as the last transition"""
+        with self._lock:
+            if track_path == self.last_played:
+                return False
+            self.last_played = track_path
+            return True
+
+    def set_last_played(self, track_path):
+        """Treat track_path as the last transition, so its next start is not counted"""
+        with self._lock:
+            self.last_played = track_path
+
+    def unflushed(self):
+        """Play counts not yet committed, including a flush in progress"""
+        with self._lock:
+            return self._increments + self._in_flight
+
+    def flush(self):
+        with self.flush_lock:
+            with self._lock:
+                if not self._plays:
+                    return 0
+                increments, self._increments = self._increments, Counter()
+                plays, self._plays = self._plays, []
+                self._in_flight = increments
+            try:
+                self._persist(dict(increments), plays)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error flushing {len(plays)} plays, will retry: {str(e)}")
+                with self._lock:
+                    self._increments = increments + self._increments
+                    self._plays = plays + self._plays
+                self._wake.set()
+                return 0
+            finally:
+                with self._lock:
+                    self._in_flight = Counter()
+            self.stats['flushes'] += 1
+            self.stats['last_flush'] = time.time()
+            logger.info(f"Flushed {len(plays)} plays for {len(increments)} tracks")
+            return len(plays)
+
+    def _loop(self):
+        while not self._stopped:
+            self._wake.wait()
+            if self._stopped:
+                return
+            time.sleep(self.interval)  # Collect everything that arrives in the interval into one flush
+            self._wake.clear()
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, pending=len(self._plays), last_played=self.last_played)
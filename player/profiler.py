@@ -0,0 +1,193 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from cooperative import start_native_thread, native_sleep, native_thread_ident
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Statistical profiler: samples the stack of every thread at a fixed interval.
+
+    The sampler runs on a native OS thread, so in cooperative mode it sees
+    whichever greenlet is on the CPU, including one that blocks the hub;
+    greenlets parked in the hub are not sampled. Stacks are aggregated in the collapsed format used by flamegraph.pl and
+    speedscope: "thread;outer;...;inner count". One session runs at a time;
+    the sampler thread only writes plain Python objects, never locks.
+    """
+
+    def __init__(self, max_seconds=300, max_stacks=20000):
+        # Create in the main thread: in cooperative mode every greenlet runs on it
+        self._main_ident = native_thread_ident()
+        self.max_seconds = max_seconds
+        self.max_stacks = max_stacks
+        self._stacks = Counter()
+        self._running = False
+        self._stop_requested = False
+        self._start_lock = threading.Lock()  # Two concurrent requests must not both start a session
+        self.samples = 0
+        self.dropped = 0
+        self.started_at = None
+        self.finished_at = None
+        self.seconds = None
+        self.interval = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, seconds, interval=0.01):
+        """Start a session of seconds; return False if one is already running"""
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be between 0 and {self.max_seconds}")
+        if not 0.001 <= interval <= 1:
+            raise ValueError("interval must be between 0.001 and 1 second")
+        with self._start_lock:
+            if self._running:
+                return False
+            self._stacks = Counter()
+            self.samples = self.dropped = 0
+            self.seconds, self.interval = seconds, interval
+            self.started_at, self.finished_at = time.time(), None
+            self._stop_requested = False
+            self._running = True
+        start_native_thread(self._run, seconds, interval)
+        return True
+
+    def stop(self):
+        self._stop_requested = True
+
+    def _thread_names(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        names[self._main_ident] = 'MainThread'
+        return names
+
+    def _run(self, seconds, interval):
+        try:
+            names = self._thread_names()
+            deadline = time.monotonic() + seconds
+            while not self._stop_requested and time.monotonic() < deadline:
+                own_frame = sys._getframe()
+                for ident, frame in sys._current_frames().items():
+                    if frame is own_frame:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(ident) or f"thread-{ident}")
+                    stack = ';'.join(reversed(labels))
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    else:
+                        self.dropped += 1
+                self.samples += 1
+                native_sleep(interval)
+        finally:
+            self.finished_at = time.time()
+            self._running = False
+
+    def collapsed(self):
+        """Collapsed stacks, heaviest first; safe to call while sampling"""
+        while True:
+            try:
+                stacks = list(self._stacks.items())
+                break
+            except RuntimeError:  # The sampler added a stack meanwhile
+                continue
+        stacks.sort(key=lambda item: item[1], reverse=True)
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def snapshot(self):
+        return {
+            'running': self._running,
+            'samples': self.samples,
+            'stacks': len(self._stacks),
+            'dropped': self.dropped,
+            'seconds': self.seconds,
+            'interval': self.interval,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class MemoryTracker:
+    """tracemalloc control: start and stop tracing, take snapshots and diff them.
+
+    Only the last max_snapshots snapshots are kept, each under an increasing id.
+    """
+
+    IGNORED = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+               tracemalloc.Filter(False, '<unknown>'))
+
+    def __init__(self, max_snapshots=4):
+        self.max_snapshots = max_snapshots
+        self._snapshots = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return tracemalloc.get_traceback_limit()
+
+    def stop(self):
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    @classmethod
+    def capture(cls):
+        """Snapshot current allocations without touching the tracker; safe to run in a native thread pool"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        return tracemalloc.take_snapshot().filter_traces(cls.IGNORED)
+
+    def take_snapshot(self):
+        """Snapshot current allocations; returns (id, snapshot)"""
+        snapshot = self.capture()
+        return self.add(snapshot), snapshot
+
+    def add(self, snapshot):
+        """Keep a snapshot from capture(); returns its id"""
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+        return snapshot_id
+
+    def get(self, snapshot_id):
+        with self._lock:
+            return self._snapshots.get(snapshot_id)
+
+    def ids(self):
+        with self._lock:
+            return sorted(self._snapshots)
+
+    @staticmethod
+    def top(snapshot, key_type='lineno', limit=20):
+        return [{'location': str(stat.traceback), 'size': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics(key_type)[:limit]]
+
+    @staticmethod
+    def diff(base, target, key_type='lineno', limit=20):
+        """Largest growth from base to target first"""
+        return [{'location': str(stat.traceback), 'size': stat.size, 'size_diff': stat.size_diff,
+                 'count': stat.count, 'count_diff': stat.count_diff}
+                for stat in target.compare_to(base, key_type)[:limit]]
+
+    def snapshot(self):
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {'tracing': tracemalloc.is_tracing(), 'traced_bytes': current, 'peak_bytes': peak, 'snapshots': self.ids()}
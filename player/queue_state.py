@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+
+QUEUE_NAMES = ('normal', 'special', 'track')
+
+
+class _QueueView:
+    def __init__(self):
+        self.entries = deque()  # Known filenames, oldest first
+        self.length = None  # Length last reported by Liquidsoap; None until first report
+        self.expected = set()  # Filenames we pushed ourselves and expect a callback for
+        self.updated_at = None
+        self.reconciled_at = None
+
+    def trim(self):
+        if self.length is not None:
+            while len(self.entries) > self.length:
+                self.entries.popleft()
+
+    def snapshot(self):
+        return {
+            'length': self.length if self.length is not None else len(self.entries),
+            'entries': list(self.entries),
+            'known_length': self.length is not None,
+            'updated_at': self.updated_at,
+            'reconciled_at': self.reconciled_at
+        }
+
+
+class QueueMirror:
+    """In-process model of Liquidsoap's normal, special and track queues.
+
+    Fed by the /track, /track_added_normal and /track_added_special callbacks
+    and by our own pushes; reconcile() overwrites it with an authoritative
+    answer from Liquidsoap, which callers do periodically or when stale.
+    """
+
+    def __init__(self):
+        self._queues = {name: _QueueView() for name in QUEUE_NAMES}
+        self._lock = threading.Lock()
+
+    def _queue(self, name):
+        if name not in self._queues:
+            raise KeyError(f"Unknown queue: {name}")
+        return self._queues[name]
+
+    def pushed(self, name, filename):
+        """Record a track we enqueued ourselves; the matching callback will not add it twice"""
+        with self._lock:
+            queue = self._queue(name)
+            queue.entries.append(filename)
+            queue.expected.add(filename)
+            if queue.length is not None:
+                queue.length += 1
+            queue.updated_at = time.time()
+
+    def added(self, name, filename):
+        """Handle a track_added_* callback from Liquidsoap"""
+        with self._lock:
+            queue = self._queue(name)
+            if filename in queue.expected:
+                queue.expected.discard(filename)
+            else:
+                queue.entries.append(filename)
+                if queue.length is not None:
+                    queue.length += 1
+            queue.updated_at = time.time()
+
+    def track_started(self, name, filename, normal_length=None, special_length=None):
+        """Handle a /track callback: the track left its queue, lengths come from Liquidsoap"""
+        with self._lock:
+            now = time.time()
+            reported = {'normal': normal_length, 'special': special_length}
+            queue = self._queues.get(name)
+            if queue is not None:
+                if filename in queue.entries:
+                    queue.entries.remove(filename)
+                    if queue.length is not None and reported.get(name) is None:
+                        queue.length = max(0, queue.length - 1)
+                queue.expected.discard(filename)
+                queue.updated_at = now
+            for queue_name, length in reported.items():
+                if length is None:
+                    continue
+                try:
+                    length = int(length)
+                except (TypeError, ValueError):
+                    continue
+                queue = self._queues[queue_name]
+                queue.length = max(0, length)
+                queue.trim()
+                # Lengths in the callback come from Liquidsoap itself, so they count as a reconcile
+                queue.updated_at = queue.reconciled_at = now
+
+    def reconcile(self, name, length=None, entries=None):
+        """Overwrite a queue with what Liquidsoap reports"""
+        with self._lock:
+            queue = self._queue(name)
+            if entries is not None:
+                queue.entries = deque(entries)
+                queue.length = len(entries)
+            if length is not None:
+                queue.length = max(0, int(length))
+                queue.trim()
+            queue.expected.clear()
+            queue.updated_at = queue.reconciled_at = time.time()
+
+    def length(self, name):
+        """Best known queue length, or None if Liquidsoap has never reported it"""
+        with self._lock:
+            return self._queue(name).length
+
+    def entries(self, name):
+        with self._lock:
+            return list(self._queue(name).entries)
+
+    def contains(self, name, filename):
+        with self._lock:
+            return filename in self._queue(name).entries
+
+    def is_stale(self, name, max_age):
+        """True if Liquidsoap has not been asked about this queue within max_age seconds"""
+        with self._lock:
+            reconciled_at = self._queue(name).reconciled_at
+            return reconciled_at is None or time.time() - reconciled_at > max_age
+
+    def snapshot(self):
+        with self._lock:
+            return {name: queue.snapshot() for name, queue in self._queues.items()}
@@ -1,20 +1,49 @@
-from flask import Flask, jsonify, request, Response
+if __name__ == '__main__':
+    # Patch before flask, threading and socket are imported so every module sees the cooperative versions
+    import cooperative
+    if cooperative.enabled():
+        cooperative.patch()
+
+from flask import Flask, jsonify, request, Response, g
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-import sqlite3
+import atexit
+import hmac
 import json
 import logging
-import logging.handlers
-import telnetlib
 import threading
 import time
 import os
+import sys
 from dotenv import load_dotenv
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
+from functools import wraps
 from queue import Queue, Empty
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from liquidsoap_client import LiquidsoapClient, LiquidsoapError, LiquidsoapUnavailable, CircuitBreaker
+from queue_state import QueueMirror
+from now_playing import NowPlayingStore, dump_json
+from history import PlaybackHistory
+from catalog import TrackCatalog
+from refill import RefillCoordinator
+from track_cache import TrackCache
+from schedule_engine import ScheduleEngine
+from jobs import JobManager
+from cooperative import connect_sqlite, run_blocking
+from json_stream import encode_cursor, decode_cursor, json_array_chunks, gzip_chunks
+from broadcast import Broadcaster, make_bus
+from sse import EventStream
+from leader import LeaderElection
+from play_recorder import PlayRecorder
+from metrics import Registry
+from profiler import StackSampler, MemoryTracker
+from tracing import TransitionTracer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import Database
+from common.migrations import migrate
+from common.logs import setup_logging
+from common.styles import normalize_style
 
 load_dotenv()
 
@@ -22,6 +51,13 @@ load_dotenv()
 # Telnet settings for Liquidsoap
 TELNET_HOST = os.getenv('TELNET_HOST', '127.0.0.1')
 TELNET_PORT = int(os.getenv('TELNET_PORT', 1234))
+TELNET_POOL_SIZE = int(os.getenv('TELNET_POOL_SIZE', 2))  # Persistent connections kept open to Liquidsoap
+TELNET_CONNECT_TIMEOUT = float(os.getenv('TELNET_CONNECT_TIMEOUT', 2))  # Seconds to establish a connection
+TELNET_COMMAND_TIMEOUT = float(os.getenv('TELNET_COMMAND_TIMEOUT', 5))  # Seconds for a full command round trip
+TELNET_IDLE_TIMEOUT = float(os.getenv('TELNET_IDLE_TIMEOUT', 20))  # Drop pooled connections idle longer than this (Liquidsoap closes at 30s)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 3))  # Consecutive failures before failing fast
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 2))  # First delay before probing Liquidsoap again
+BREAKER_MAX_RESET_TIMEOUT = float(os.getenv('BREAKER_MAX_RESET_TIMEOUT', 60))  # Upper bound for probe backoff
 
 # Directories and files
 TRACKS_DIR = os.getenv('TRACKS_DIR', '/home/beasty197/projects/vtrnk_radio/audio/mp3')
@@ -29,8 +65,12 @@ CURRENT_TRACK_FILE = os.getenv('CURRENT_TRACK_FILE', '/home/beasty197/projects/v
 LAST_PLAYED_TRACK_FILE = os.getenv('LAST_PLAYED_TRACK_FILE', '/home/beasty197/projects/vtrnk_radio/data/last_played_track.txt')
 PLAYBACK_HISTORY_FILE = os.getenv('PLAYBACK_HISTORY_FILE', '/home/beasty197/projects/vtrnk_radio/data/playback_history.txt')
 DB_PATH = os.getenv('DB_PATH', '/home/beasty197/projects/vtrnk_radio/data/radio.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 4))  # Idle SQLite connections kept open
+DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 10))  # Seconds to wait for the track watcher's write lock
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 64 * 1024 * 1024))  # Bytes of the database read through mmap
 LOGS_DIR = os.getenv('LOGS_DIR', '/home/beasty197/projects/vtrnk_radio/logs')
 LOG_FILE = os.getenv('LOG_FILE', 'radio_player.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # DEBUG adds per-request lookups and every Liquidsoap command
 UPLOAD_RADIO_DIR = os.getenv('UPLOAD_RADIO_DIR', '/home/beasty197/projects/vtrnk_radio/audio/radio_show')
 UPLOAD_TRACK_DIR = os.getenv('UPLOAD_TRACK_DIR', '/home/beasty197/projects/vtrnk_radio/audio/upload_dir')
 IMAGES_DIR = os.getenv('IMAGES_DIR', '/home/beasty197/projects/vtrnk_radio/images')
@@ -39,45 +79,45 @@ IMAGES_DIR = os.getenv('IMAGES_DIR', '/home/beasty197/projects/vtrnk_radio/image
 MAX_HISTORY_SIZE = 60  # Maximum tracks in playback history
 PLAYBACK_MODE = "random"  # Playback mode (currently fixed as random)
 HISTORY_EXCLUDE_SIZE = 60  # Number of recent tracks to exclude from next track selection
-NEXT_TRACK_CANDIDATES = 50  # Number of candidates to select random next track from
+CATALOG_PLAYCOUNT_DECAY = float(os.getenv('CATALOG_PLAYCOUNT_DECAY', 0.5))  # Weight multiplier per extra play when picking the next track
+CATALOG_RECENCY_CHOICES = int(os.getenv('CATALOG_RECENCY_CHOICES', 2))  # Candidates drawn per pick; the most recent upload wins
+CATALOG_SYNC_INTERVAL = int(os.getenv('CATALOG_SYNC_INTERVAL', 30))  # Seconds between checks for tracks added or removed by track_watcher
+NOW_PLAYING_MAX_AGE = int(os.getenv('NOW_PLAYING_MAX_AGE', 10))  # Upper bound for Cache-Control max-age on /now_playing
+QUEUE_RECONCILE_INTERVAL = int(os.getenv('QUEUE_RECONCILE_INTERVAL', 60))  # Seconds between telnet checks of the queue mirror
+REFILL_WATERMARK = int(os.getenv('REFILL_WATERMARK', 2))  # Refill normal_queue when it holds fewer tracks than this
+REFILL_DEBOUNCE = float(os.getenv('REFILL_DEBOUNCE', 0.5))  # Seconds to coalesce refill triggers
+REFILL_SAFETY_INTERVAL = float(os.getenv('REFILL_SAFETY_INTERVAL', 60))  # Refill anyway if no event arrived for this long
+SCHEDULE_TZ = pytz.timezone(os.getenv('SCHEDULE_TZ', 'Europe/Moscow'))  # Timezone of schedule start_time values
+SCHEDULE_WINDOW = int(os.getenv('SCHEDULE_WINDOW', 300))  # Seconds after start_time a show may still be queued
+SCHEDULE_RETRY_DELAY = int(os.getenv('SCHEDULE_RETRY_DELAY', 10))  # Seconds before retrying a show that failed to queue
+SCHEDULE_RELOAD_INTERVAL = int(os.getenv('SCHEDULE_RELOAD_INTERVAL', 600))  # Seconds between full reloads of the schedule table
+TRACK_CACHE_SIZE = int(os.getenv('TRACK_CACHE_SIZE', 2048))  # Track rows kept in the metadata LRU cache
+TRACKS_PAGE_MAX = int(os.getenv('TRACKS_PAGE_MAX', 500))  # Largest page /tracks returns when limit is given
+TRACKS_FETCH_SIZE = 200  # Rows fetched from SQLite per batch while streaming /tracks
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # Threads running slow control actions (smart_skip, play_radio_show)
+JOB_TTL = int(os.getenv('JOB_TTL', 3600))  # Seconds a finished job stays available at /jobs/<id>
+BROADCAST_BUS = os.getenv('BROADCAST_BUS', 'local')  # Socket.IO fanout between processes: 'local' or 'unix:///path/to/socket/dir'
+BROADCAST_INTERVAL = float(os.getenv('BROADCAST_INTERVAL', 0.25))  # Seconds to coalesce bursts of track_update events
+SSE_HEARTBEAT = int(os.getenv('SSE_HEARTBEAT', 15))  # Seconds between keepalive comments on /now_playing/stream
+SSE_BUFFER_SIZE = 32  # Recent track updates kept for Last-Event-ID resume
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', 15))  # Seconds before another process takes over a leader that stopped renewing
+LEADER_RENEW_INTERVAL = float(os.getenv('LEADER_RENEW_INTERVAL', 5))  # Seconds between lease renewals
+PLAY_FLUSH_INTERVAL = float(os.getenv('PLAY_FLUSH_INTERVAL', 2))  # Seconds track starts are buffered before playcounts and history are written
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # X-Admin-Token or Bearer token required by /metrics and /debug endpoints; unset disables them
+PROFILER_MAX_SECONDS = int(os.getenv('PROFILER_MAX_SECONDS', 300))  # Longest stack sampling session
+SHUTDOWN_GRACE = float(os.getenv('SHUTDOWN_GRACE', 10))  # Seconds after SIGTERM the server keeps serving with /ready at 503, so load balancers see it
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 10))  # Seconds in-flight requests get to finish once the listener is closed
+WARM_UP_RETRY_DELAY = 2  # Seconds between attempts to reach Liquidsoap while warming up
 
 # Delay settings
 SMART_SKIP_DELAY = 10  # Delay in seconds for smart_skip
-RADIO_SHOW_SKIP_DELAY = 10  # Delay in seconds for radio show skip in schedule_checker and play_radio_show
+RADIO_SHOW_SKIP_DELAY = 10  # Delay in seconds for radio show skip in scheduled shows and play_radio_show
+RADIO_SHOW_VERIFY_DELAY = 55  # Delay in seconds before checking that a scheduled show was queued
 
 # Title validation settings
 MAX_TITLE_LENGTH = 200  # Maximum length for track/set titles
 MAX_ARTIST_LENGTH = 100  # Maximum length for artist names
 
-# Styles for normalization
-PREDEFINED_STYLES = [
-    "Jungle", "Techstep", "Drum & Bass", "Breakbeat", "Liquid Funk", "Neurofunk",
-    "Hardstep", "Darkstep", "Ragga Jungle", "Jump Up", "Minimal DnB", "Ambient DnB",
-    "Electronic", "Dance", "Blues", "Reggae"
-]
-STYLE_VARIANTS = {
-    "Drum & Bass": [
-        "drum and bass", "dnb", "drum n bass", "d&b", "drumnbass", "drum&bass",
-        "drum 'n' bass", "d'n'b", "drumn'bass"
-    ],
-    "Jungle": [
-        "ragga jungle", "junglist", "jungle dnb", "jungle drum & bass",
-        "jungle drum and bass", "oldskool jungle"
-    ],
-    "Techstep": ["tech step", "tech-step"],
-    "Liquid Funk": ["liquid funk", "liquid dnb", "liquid"],
-    "Neurofunk": ["neuro funk", "neuro"],
-    "Breakbeat": ["break beat", "breaks"],
-    "Hardstep": ["hard step"],
-    "Darkstep": ["dark step", "dark dnb"],
-    "Jump Up": ["jumpup", "jump-up"],
-    "Minimal DnB": ["minimal drum & bass", "minimal dnb"],
-    "Ambient DnB": ["ambient drum & bass", "ambient dnb"],
-    "Electronic": ["электронная музыка", "electronic", "electro"],
-    "Dance": ["dance & dj", "dance & dj/general"],
-    "Experimental": ["experimental", "drone", "noise", "ambient", "musique concrète"]
-}
-
 def validate_title_length(title, max_length=MAX_TITLE_LENGTH):
     """Validate and truncate title if too long"""
     if not title:
@@ -96,90 +136,253 @@ def validate_artist_length(artist, max_length=MAX_ARTIST_LENGTH):
         return artist[:max_length].rstrip()
     return artist
 
-# Normalize style function
-def normalize_style(style):
-    if not style:
-        return "Unknown"
-    style = style.lower().strip()
-    if ';' in style:
-        style = style.split(';')[0].strip()  # Take first genre
-    for canonical, variants in STYLE_VARIANTS.items():
-        if style == canonical.lower() or style in [v.lower() for v in variants]:
-            return canonical
-    return "Unknown" if style not in [s.lower() for s in PREDEFINED_STYLES] else style.title()
-
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=['ETag', 'X-Next-Cursor'])
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# On-demand profiling behind /debug; idle until an admin starts a session
+stack_sampler = StackSampler(max_seconds=PROFILER_MAX_SECONDS)
+memory_tracker = MemoryTracker()
+
+# Metrics exported at /metrics; components that keep their own counters are read at scrape time
+metrics = Registry()
+http_request_seconds = metrics.histogram('radio_http_request_duration_seconds', 'Flask request latency by route', ('route', 'method'))
+http_requests = metrics.counter('radio_http_requests_total', 'Flask requests by route and status', ('route', 'method', 'status'))
+telnet_command_seconds = metrics.histogram('radio_liquidsoap_command_duration_seconds', 'Liquidsoap telnet round trips by command', ('command',))
+telnet_command_errors = metrics.counter('radio_liquidsoap_command_errors_total', 'Liquidsoap telnet commands that failed', ('command',))
+db_query_seconds = metrics.histogram('radio_db_query_duration_seconds', 'SQLite statement and fetch time by calling function', ('site', 'operation'))
+skips = metrics.counter('radio_skips_total', 'Skip commands sent to Liquidsoap', ('kind',))
+transition_stage_seconds = metrics.histogram('radio_transition_stage_duration_seconds', 'Time spent in each stage of the POST /track callback', ('stage',))
+transition_emit_seconds = metrics.histogram('radio_transition_callback_to_emit_seconds', 'From POST /track arriving to the track_update emit')
+transition_origin_seconds = metrics.histogram('radio_transition_origin_to_emit_seconds', 'From Liquidsoap starting the track (origin_ts) to the track_update emit')
+transition_ack_seconds = metrics.histogram('radio_transition_emit_to_ack_seconds', 'From the track_update emit to a client acknowledging it', ('transport',))
+
+def observe_liquidsoap_command(command, elapsed, failed):
+    telnet_command_seconds.labels(command).observe(elapsed)
+    if failed:
+        telnet_command_errors.labels(command).inc()
+
+def observe_db_query(site, operation, elapsed):
+    db_query_seconds.labels(site, operation).observe(elapsed)
+
+def observe_transition_emit(callback_to_emit, origin_to_emit):
+    if callback_to_emit is not None:
+        transition_emit_seconds.observe(callback_to_emit)
+    if origin_to_emit is not None:
+        transition_origin_seconds.observe(origin_to_emit)
+
+# Track transitions traced from the Liquidsoap callback to listeners, see /transitions
+transition_tracer = TransitionTracer(
+    on_stage=lambda stage, seconds: transition_stage_seconds.labels(stage).observe(seconds),
+    on_emit=observe_transition_emit,
+    on_ack=lambda seconds, transport: transition_ack_seconds.labels(transport).observe(seconds)
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        http_request_seconds.labels(route, request.method).observe(time.perf_counter() - started)
+        http_requests.labels(route, request.method, str(response.status_code)).inc()
+    return response
+
 # Queue for updates
 updates = Queue()
 
-# Logging setup
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-log_path = os.path.join(LOGS_DIR, LOG_FILE)
-handler = logging.handlers.RotatingFileHandler(
-    filename=log_path,
-    maxBytes=5*1024*1024,
-    backupCount=5
-)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-
-class NoDebugFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno > logging.DEBUG
-handler.addFilter(NoDebugFilter())
-logger.addHandler(handler)
+# Handlers are attached by start(); records are written by one background thread, see common/logs.py
+logger = logging.getLogger('radio_player')
 
 # Playback variables
 next_track = None
 last_played_track_lock = threading.Lock()
 
+# Current track lives in memory; CURRENT_TRACK_FILE is a snapshot for restarts
+DEFAULT_CURRENT_TRACK = {"filename": "", "artist": "VTRNK", "title": "Radio Show"}
+
+def render_track_view(data):
+    return dump_json([
+        ["filename", data.get("filename", "Unknown File")],
+        ["artist", data.get("artist", "Unknown Artist")],
+        ["title", data.get("title", "Unknown Title")],
+        ["album", data.get("album", "Radio VTRNK Stream")]
+    ])
+
+def now_playing_fields(data):
+    return {
+        'filename': data.get('filename', ''),
+        'artist': data.get('artist', 'VTRNK'),
+        'title': data.get('title', 'Radio Show'),
+        'album': data.get('album', 'Radio VTRNK Stream'),
+        'cover_path': data.get('cover_path') or "/images/placeholder2.png",
+        'next_track': data.get('next_track') or "",
+        'next_cover_path': data.get('next_cover_path') or "/images/placeholder2.png",
+        'queue': data.get('queue', 'unknown'),
+        'timestamp': data.get('timestamp', ''),
+        'started_at': data.get('started_at'),
+        'duration': data.get('duration')
+    }
+
+def track_update_fields(data):
+    return dict(now_playing_fields(data), trace=data.get('trace'))
+
+def render_now_playing_view(data):
+    return dump_json(now_playing_fields(data))
+
+now_playing = NowPlayingStore(CURRENT_TRACK_FILE, DEFAULT_CURRENT_TRACK)
+now_playing.add_view('track', render_track_view)
+now_playing.add_view('now_playing', render_now_playing_view)
+now_playing.add_view('snapshot', track_update_fields)  # Payload of track_update, sent on connect and on every track change
+
+# Recently played tracks; PLAYBACK_HISTORY_FILE is an append-only journal of plays
+playback_history = PlaybackHistory(PLAYBACK_HISTORY_FILE, MAX_HISTORY_SIZE)
+
+# Playable tracks indexed by playcount for next track selection
+track_catalog = TrackCatalog(playcount_decay=CATALOG_PLAYCOUNT_DECAY, recency_choices=CATALOG_RECENCY_CHOICES)
+
+# Pooled connections in WAL mode; close() returns a connection to the pool
+db = Database(DB_PATH, busy_timeout=DB_BUSY_TIMEOUT, mmap_size=DB_MMAP_SIZE, pool_size=DB_POOL_SIZE,
+              connect_fn=connect_sqlite, on_query=observe_db_query)
+
 def get_db():
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return db.connect()
     except Exception as e:
         logger.error(f"Error connecting to database at {DB_PATH}: {str(e)}")
         raise
 
-def liquidsoap_command(command):
+def migrate_db():
     try:
-        command = command.encode('utf-8').decode('utf-8')
-        start_time = time.time()
-        tn = telnetlib.Telnet(TELNET_HOST, TELNET_PORT)
-        tn.write((command + "\n").encode('utf-8'))
-        response = tn.read_until(b"\n").decode('utf-8').strip()
-        tn.write(b"quit\n")
-        tn.close()
-        elapsed_time = time.time() - start_time
-        logger.info(f"Liquidsoap command '{command}' executed, response: '{response}', time: {elapsed_time:.2f}s")
-        return response
+        conn = get_db()
+        version = migrate(conn)
+        conn.close()
+        logger.info(f"Database schema version {version}")
+        return True
     except Exception as e:
-        logger.error(f"Error sending command to Liquidsoap: {str(e)}")
+        logger.error(f"Error migrating database: {str(e)}")
+        return False
+
+def load_track_row(column, value):
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM tracks WHERE {column} = ?", (value,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+# Track rows by path and name for /track callbacks and cover lookups; writers below invalidate it
+track_cache = TrackCache(load_track_row, max_size=TRACK_CACHE_SIZE)
+
+liquidsoap = LiquidsoapClient(
+    TELNET_HOST, TELNET_PORT,
+    pool_size=TELNET_POOL_SIZE,
+    connect_timeout=TELNET_CONNECT_TIMEOUT,
+    command_timeout=TELNET_COMMAND_TIMEOUT,
+    idle_timeout=TELNET_IDLE_TIMEOUT,
+    breaker=CircuitBreaker(
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+        max_reset_timeout=BREAKER_MAX_RESET_TIMEOUT
+    ),
+    on_command=observe_liquidsoap_command
+)
+
+# Local model of Liquidsoap queues, fed by callbacks and reconciled over telnet
+queue_mirror = QueueMirror()
+
+def liquidsoap_command(command):
+    """Send a command to Liquidsoap; raises LiquidsoapUnavailable when it was not sent"""
+    try:
+        return liquidsoap.command(command).strip()
+    except LiquidsoapUnavailable as e:
+        logger.warning(f"Liquidsoap unavailable, command '{command}' not sent: {str(e)}")
+        raise
+    except LiquidsoapError as e:
+        logger.error(f"Error sending command '{command}' to Liquidsoap: {str(e)}")
         return str(e)
 
+def liquidsoap_unavailable_response(e):
+    return jsonify({
+        'success': False,
+        'error': f"Liquidsoap unavailable: {str(e)}",
+        'liquidsoap': liquidsoap.breaker.snapshot()
+    }), 503
+
+def liquidsoap_breaker_open():
+    return liquidsoap.breaker is not None and liquidsoap.breaker.state == CircuitBreaker.OPEN
+
+def apply_remote_broadcast(event, data):
+    if event == 'track_update':
+        now_playing.set(data)
+    elif event == 'track_started':
+        apply_remote_track_start(data)
+    elif event == 'next_track':
+        set_next_track(data['next_track'], data['next_cover_path'])
+    elif event == 'refill' and leader.is_leader:
+        refill_coordinator.trigger(data['reason'])
+    elif event == 'schedule_changed' and leader.is_leader:
+        schedule_engine.reload()
+
+# Socket.IO events go through a bus so every player process pushes them to its own clients
+broadcaster = Broadcaster(socketio, make_bus(BROADCAST_BUS), interval=BROADCAST_INTERVAL, on_remote=apply_remote_broadcast)
+
+# /now_playing/stream: the same coalesced track_update events as Server-Sent Events
+now_playing_events = EventStream(buffer_size=SSE_BUFFER_SIZE, heartbeat=SSE_HEARTBEAT)
+
+def forward_to_event_stream(event, data):
+    if event == 'track_update':
+        now_playing_events.publish(event, data)
+
+def trace_track_update(event, data):
+    if event == 'track_update':
+        transition_tracer.emitted(data.get('trace'))
+
+broadcaster.add_listener(forward_to_event_stream)
+broadcaster.add_listener(trace_track_update)
+
+# Slow control actions run as background jobs; status changes are pushed as job_update events
+job_manager = JobManager(max_workers=JOB_WORKERS, ttl=JOB_TTL, on_update=lambda job: broadcaster.publish('job_update', job))
+
+def job_accepted_response(job, created):
+    response = jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'deduplicated': not created,
+        'status_url': f"/jobs/{job['id']}"
+    })
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response, 202
+
+def get_cached_normal_queue_length():
+    queue_length = queue_mirror.length('normal')
+    return queue_length if queue_length is not None else 0
+
 def get_normal_queue_length():
-    response = liquidsoap_command("get_normal_queue_length")
+    try:
+        response = liquidsoap_command("get_normal_queue_length")
+    except LiquidsoapUnavailable:
+        cached = get_cached_normal_queue_length()
+        logger.warning(f"Using last known normal_queue_length={cached}")
+        return cached
     if response:
         try:
-            return int(response.split("\n")[0])
+            queue_length = int(response.split("\n")[0])
+            queue_mirror.reconcile('normal', length=queue_length)
+            return queue_length
         except (ValueError, IndexError):
             logger.error("Failed to parse normal_queue_length")
-            return 0
+            return get_cached_normal_queue_length()
     return 0
 
 def get_current_track():
-    try:
-        with open(CURRENT_TRACK_FILE, 'r') as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        logger.error(f"Error reading current track: {str(e)}")
-        return {"filename": "", "artist": "VTRNK", "title": "Radio Show"}
+    return now_playing.get()
 
 def get_last_played_track():
     try:
@@ -200,129 +403,233 @@ def save_last_played_track(track_path):
         logger.error(f"Error saving last played track: {str(e)}")
 
 def load_playback_history():
+    return playback_history.recent()
+
+def persist_plays(increments, plays):
+    """Write buffered track starts: playcounts and history rows in one transaction, then the files"""
+    conn = get_db()
     try:
-        if not os.path.exists(PLAYBACK_HISTORY_FILE):
-            return []
-        with open(PLAYBACK_HISTORY_FILE, 'r') as f:
-            history = [line.strip() for line in f.readlines() if line.strip()]
-        logger.info(f"Loaded playback history, {len(history)} tracks")
-        return history
-    except Exception as e:
-        logger.error(f"Error loading playback history: {str(e)}")
-        return []
+        with conn:
+            conn.executemany("UPDATE tracks SET playcount = playcount + ? WHERE path = ?",
+                             [(count, track_path) for track_path, count in increments.items()])
+            conn.executemany("INSERT INTO history (track_id, played_at) SELECT id, ? FROM tracks WHERE path = ?",
+                             [(played_at, track_path) for track_path, played_at in plays])
+    finally:
+        conn.close()
+    playback_history.persist([track_path for track_path, _ in plays])
+    run_blocking(save_last_played_track, plays[-1][0])
 
-def save_playback_history(history):
+# Track starts are applied in memory at once and written behind in batches
+play_recorder = PlayRecorder(persist_plays, interval=PLAY_FLUSH_INTERVAL)
+
+def sync_track_catalog():
+    """Load the catalog on first use, then pick up tracks added or removed by track_watcher"""
+    if not track_catalog.needs_load() and not track_catalog.needs_sync(CATALOG_SYNC_INTERVAL):
+        return
     try:
-        history = history[-MAX_HISTORY_SIZE:]
-        with open(PLAYBACK_HISTORY_FILE, 'w') as f:
-            for track in history:
-                f.write(f"{track}\n")
-        logger.info(f"Saved playback history, {len(history)} tracks")
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            if not track_catalog.needs_load():
+                cursor.execute("""
+                    SELECT id, path, playcount, upload_date FROM tracks
+                    WHERE id > ? AND status = 'available' AND track_info = 'track'
+                """, (track_catalog.max_id,))
+                rows = cursor.fetchall()
+                for row in rows:
+                    track_catalog.add(row['path'], row['id'], row['playcount'], row['upload_date'])
+                track_cache.invalidate(paths=[row['path'] for row in rows])
+                cursor.execute("SELECT COUNT(*) AS count FROM tracks WHERE status = 'available' AND track_info = 'track'")
+                if cursor.fetchone()['count'] == len(track_catalog):
+                    track_catalog.mark_synced()
+                    return
+                logger.info("Track catalog out of sync with database, reloading")
+                track_cache.clear()
+            with play_recorder.flush_lock:
+                cursor.execute("SELECT id, path, playcount, upload_date FROM tracks WHERE status = 'available' AND track_info = 'track'")
+                track_catalog.load(cursor.fetchall())
+                unflushed = play_recorder.unflushed()
+            for track_path, count in unflushed.items():
+                track_catalog.played(track_path, count)
+        finally:
+            conn.close()
     except Exception as e:
-        logger.error(f"Error saving playback history: {str(e)}")
+        logger.error(f"Error syncing track catalog: {str(e)}")
 
-def add_to_playback_history(track_path):
-    history = load_playback_history()
-    if track_path in history:
-        history.remove(track_path)
-    history.append(track_path)
-    save_playback_history(history)
-    logger.info(f"Added track {track_path} to playback history")
+def refresh_catalog_tracks(paths=(), names=(), ids=()):
+    """Apply tracks added, changed or deleted in the database to the catalog without a full reload.
 
-def select_next_track():
+    Falls back to a full reload when the lookup fails or a name or id is no
+    longer in the database, since the catalog only knows tracks by path.
+    """
+    paths, names, ids = list(paths), list(names), list(ids)
+    if track_catalog.needs_load() or not (paths or names or ids):
+        return
     try:
         conn = get_db()
-        cursor = conn.cursor()
-        current_track_data = get_current_track()
-        current_track = current_track_data.get('filename', '')
-        history = load_playback_history()
-        exclude_tracks = history[-HISTORY_EXCLUDE_SIZE:]
-        if current_track and current_track not in exclude_tracks:
-            exclude_tracks.append(current_track)
-        placeholders = ','.join(['?'] * len(exclude_tracks))
-        exclude_condition = f"path NOT IN ({placeholders})" if exclude_tracks else "1=1"
-        cursor.execute(f"""
-            SELECT path, playcount, upload_date
-            FROM tracks
-            WHERE {exclude_condition} AND status = 'available' AND track_info = 'track'
-            ORDER BY playcount ASC, upload_date DESC
-            LIMIT {NEXT_TRACK_CANDIDATES}
-        """, exclude_tracks)
-        candidates = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        if not candidates:
-            logger.warning("No eligible tracks found for selection, excluded tracks: %s", exclude_tracks)
+        try:
+            cursor = conn.cursor()
+            rows = []
+            with play_recorder.flush_lock:
+                for column, values in (('path', paths), ('name', names), ('id', ids)):
+                    for start in range(0, len(values), 500):
+                        chunk = values[start:start + 500]
+                        cursor.execute(f"""
+                            SELECT id, name, path, playcount, upload_date, status, track_info FROM tracks
+                            WHERE {column} IN ({','.join('?' * len(chunk))})
+                        """, chunk)
+                        rows.extend(cursor.fetchall())
+                unflushed = play_recorder.unflushed()
+        finally:
+            conn.close()
+        for row in rows:
+            if row['status'] == 'available' and row['track_info'] == 'track':
+                playcount = (row['playcount'] or 0) + unflushed.get(row['path'], 0)
+                track_catalog.add(row['path'], row['id'], playcount, row['upload_date'])
+            else:
+                track_catalog.remove(row['path'])
+        found_paths = {row['path'] for row in rows}
+        for track_path in paths:
+            if track_path not in found_paths:
+                track_catalog.remove(track_path)
+        found_names = {row['name'] for row in rows}
+        found_ids = {str(row['id']) for row in rows}
+        if any(name not in found_names for name in names) or any(str(track_id) not in found_ids for track_id in ids):
+            logger.info("Changed tracks no longer in the database by name or id, reloading track catalog")
+            track_catalog.invalidate()
+    except Exception as e:
+        logger.error(f"Error refreshing catalog tracks, reloading instead: {str(e)}")
+        track_catalog.invalidate()
+
+def select_next_track():
+    try:
+        sync_track_catalog()
+        current_track = get_current_track().get('filename', '')
+        exclude_tracks = playback_history.recent_set(HISTORY_EXCLUDE_SIZE)
+        if current_track:
+            exclude_tracks.add(current_track)
+        selected_track = track_catalog.sample(exclude_tracks)
+        if not selected_track:
+            logger.warning(f"No eligible tracks found for selection, {len(exclude_tracks)} tracks excluded")
             return None
-        selected_track = random.choice(candidates)
         logger.info(f"Selected next track: {repr(selected_track['path'])}, playcount={selected_track['playcount']}, upload_date={selected_track['upload_date']}")
         return selected_track['path']
     except Exception as e:
         logger.error(f"Error selecting next track: {str(e)}")
         return None
 
-def increment_play_count(track_path):
-    if not track_path:
-        logger.warning("Cannot increment playcount: track_path is empty")
-        return
+def apply_track_start(track_path):
+    """In-memory effects of a track start: recent history, cached playcount and catalog bucket"""
+    playback_history.add(track_path, persist=False)
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT playcount FROM tracks WHERE path = ?", (track_path,))
-        track = cursor.fetchone()
+        track = track_cache.get_by_path(track_path)
         if not track:
             logger.warning(f"Track {track_path} does not exist in the database, cannot increment playcount")
-            conn.close()
             return
-        cursor.execute("UPDATE tracks SET playcount = playcount + 1 WHERE path = ?", (track_path,))
-        affected_rows = cursor.rowcount
-        conn.commit()
-        conn.close()
-        if affected_rows == 0:
-            logger.warning(f"No track found with path {track_path} to increment playcount")
-        else:
-            logger.info(f"Incremented playcount for track {track_path}, affected rows: {affected_rows}")
+        track_cache.update(track_path, playcount=(track['playcount'] or 0) + 1)
+        track_catalog.played(track_path)
     except Exception as e:
-        logger.error(f"Error incrementing playcount for track {str(e)}")
+        logger.error(f"Error applying start of track {track_path}: {str(e)}")
+
+def record_track_start(track_path):
+    """Count a track start once per transition; return False for a repeat of the last one"""
+    if not play_recorder.record(track_path):
+        return False
+    apply_track_start(track_path)
+    logger.info(f"Recorded start of track {track_path}, playcount write buffered")
+    return True
+
+def share_track_start(track_path, counted, queue_state=None):
+    """Tell the other processes about a callback received here; the leader selects from their plays too"""
+    broadcaster.publish('track_started', dict(queue_state or {}, filename=track_path, counted=counted), emit=False)
+
+def apply_remote_track_start(data):
+    track_path = data.get('filename')
+    if not track_path:
+        return
+    if data.get('queue'):
+        queue_mirror.track_started(data['queue'], track_path, data.get('normal_queue_length'), data.get('special_queue_length'))
+    # The process that received the callback writes the play; here it only joins history and the catalog,
+    # and a later callback for the same transition to this process is not counted again
+    if data.get('counted') and play_recorder.recorded_elsewhere(track_path):
+        apply_track_start(track_path)
+
+def set_next_track(track_path, cover_path):
+    global next_track
+    next_track = track_path
+    now_playing.update(next_track=track_path, next_cover_path=cover_path)
 
 def add_track_to_queue():
-    queue_length = get_normal_queue_length()
-    if queue_length < 2:
+    if queue_mirror.is_stale('normal', QUEUE_RECONCILE_INTERVAL):
+        queue_length = get_normal_queue_length()
+    else:
+        queue_length = get_cached_normal_queue_length()
+    if queue_length < REFILL_WATERMARK:
         track_path = select_next_track()
         if track_path:
-            global next_track
-            next_track = track_path
-            response = liquidsoap_command(f"set_next_track {track_path}")
-            logger.info(f"Added track to normal_queue: {track_path}, response: {response}")
+            cover_path = lookup_cover_path(track_path)
+            set_next_track(track_path, cover_path)
+            # Followers answering POST /track put next_track into the snapshot they publish
+            broadcaster.publish('next_track', {'next_track': track_path, 'next_cover_path': cover_path}, emit=False)
+            response = liquidsoap.command_or_defer(f"set_next_track {track_path}")
+            if response is None:
+                logger.warning(f"Liquidsoap unavailable, next track {track_path} will be set on recovery")
+            else:
+                queue_mirror.pushed('normal', track_path)
+                logger.info(f"Added track to normal_queue: {track_path}, response: {response}")
         else:
             logger.error("No track selected for normal_queue")
 
 def skip_track():
     response = liquidsoap_command("skip_track")
+    skips.labels('skip_track').inc()
     logger.info(f"Skipped track, response: {response}")
     return response
 
 def smart_skip():
+    """Queue the next track, give Liquidsoap time to prepare it, then skip; runs as a job"""
+    logger.info("Starting smart skip process")
+    skips.labels('smart_skip').inc()
+    # Refill only ever runs on the leader; its debounce is well inside SMART_SKIP_DELAY
+    request_refill('smart_skip')
+    logger.info(f"Requested next track, waiting {SMART_SKIP_DELAY} seconds")
+    time.sleep(SMART_SKIP_DELAY)
+    response = skip_track()
+    logger.info("Smart skip completed successfully")
+    return {"message": "Smart skip executed successfully", "response": response}
+
+def play_radio_show_now(track_path):
+    """Push a show to special_queue and skip the normal track after a delay; runs as a job"""
+    response = liquidsoap_command(f"play_radio_show {track_path}")
+    logger.info(f"Sent to Liquidsoap: play_radio_show {track_path}, response: {response}")
+    time.sleep(RADIO_SHOW_SKIP_DELAY)
+    skip_response = skip_normal_queue()
+    logger.info(f"Skipped normal queue after manual show play, response: {skip_response}")
+    artist, title = get_track_metadata(track_path)
+    # Only the file: the show has not started yet, and its start must still be counted once by the recorder
+    save_last_played_track(track_path)
+    request_refill('show_inserted')
+    return {
+        'response': response,
+        'skip_response': skip_response,
+        'track_path': track_path,
+        'artist': artist,
+        'title': title
+    }
+
+def lookup_cover_path(track_path):
     try:
-        logger.info("Starting smart skip process")
-        add_track_to_queue()
-        logger.info(f"Added next track, waiting {SMART_SKIP_DELAY} seconds")
-        time.sleep(SMART_SKIP_DELAY)
-        skip_track()
-        logger.info("Smart skip completed successfully")
-        return {"success": True, "message": "Smart skip executed successfully"}
+        track = track_cache.get_by_path(track_path)
+        return track['path_img'] if track and track['path_img'] else "/images/placeholder2.png"
     except Exception as e:
-        logger.error(f"Error in smart_skip: {str(e)}")
-        return {"success": False, "error": str(e)}
+        logger.error(f"Error fetching cover for track {track_path}: {str(e)}")
+        return "/images/placeholder2.png"
 
 def get_track_duration(track_path):
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT duration FROM tracks WHERE path = ?", (track_path,))
-        track = cursor.fetchone()
-        conn.close()
+        track = track_cache.get_by_path(track_path)
         if track and track['duration']:
-            logger.info(f"Found duration for {track_path}: {track['duration']}s")
+            logger.debug("Found duration for %s: %ss", track_path, track['duration'])
             return track['duration']
         logger.warning(f"No duration found for track {track_path}")
         return None
@@ -332,15 +639,11 @@ def get_track_duration(track_path):
 
 def get_track_metadata(track_path):
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT artist, track_title, name FROM tracks WHERE path = ?", (track_path,))
-        track = cursor.fetchone()
-        conn.close()
+        track = track_cache.get_by_path(track_path)
         if track:
             artist = track['artist'] if track['artist'] and track['artist'].strip() else "VTRNK"
             title = track['track_title'] if track['track_title'] and track['track_title'].strip() else (track['name'] if track['name'] and track['name'].strip() else "Radio Show")
-            logger.info(f"Found metadata for {track_path}: artist={artist}, title={title}")
+            logger.debug("Found metadata for %s: artist=%s, title=%s", track_path, artist, title)
             return artist, title
         logger.warning(f"No metadata found for track {track_path}")
         return "VTRNK", "Radio Show"
@@ -354,10 +657,10 @@ def track_started():
         data = request.get_json()
         track_path = data.get('filename')
         if track_path:
-            increment_play_count(track_path)
-            add_to_playback_history(track_path)
-            save_last_played_track(track_path)
-            logger.info(f"Track started: {track_path}, playcount incremented")
+            counted = record_track_start(track_path)
+            share_track_start(track_path, counted)
+            if counted:
+                logger.info(f"Track started: {track_path}")
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"Error in track_started: {str(e)}")
@@ -368,10 +671,12 @@ def handle_track():
     if request.method == 'POST':
         try:
             data = request.get_json()
+            trace = transition_tracer.begin(data.get('trace_id'), data.get('origin_ts'))
             artist_from_request = data.get('artist', 'Unknown Artist')
             title_from_request = data.get('title', 'Unknown Title')
             filename = data.get('filename', 'Unknown File')
             artist, title = get_track_metadata(filename)
+            trace.mark('metadata')
             normal_queue_length = data.get('normal_queue_length', 0)
             special_queue_length = data.get('special_queue_length', 0)
             timestamp = data.get('timestamp', 'Unknown Timestamp')
@@ -379,6 +684,7 @@ def handle_track():
             normal_queue_timestamp = data.get('normal_queue_timestamp', '')
             track_queue_timestamp = data.get('track_queue_timestamp', '')
             queue = data.get('queue', 'unknown')
+            queue_mirror.track_started(queue, filename, data.get('normal_queue_length'), data.get('special_queue_length'))
             current_track_json = {
                 'filename': filename,
                 'artist': artist,
@@ -390,44 +696,55 @@ def handle_track():
                 'special_queue_timestamp': special_queue_timestamp,
                 'normal_queue_timestamp': normal_queue_timestamp,
                 'track_queue_timestamp': track_queue_timestamp,
-                'queue': queue
+                'queue': queue,
+                'cover_path': lookup_cover_path(filename),
+                'duration': get_track_duration(filename),
+                'started_at': time.time(),
+                'next_track': next_track,
+                'next_cover_path': get_current_track().get('next_cover_path', "/images/placeholder2.png"),
+                'trace': trace.context()
             }
-            with open(CURRENT_TRACK_FILE, 'w') as f:
-                json.dump(current_track_json, f)
-            last_played = get_last_played_track()
-            if last_played != filename:
+            trace.mark('lookup')
+            now_playing.set(current_track_json)
+            trace.mark('now_playing')
+            counted = bool(filename) and record_track_start(filename)
+            if filename:
+                share_track_start(filename, counted, {
+                    'queue': queue,
+                    'normal_queue_length': data.get('normal_queue_length'),
+                    'special_queue_length': data.get('special_queue_length')
+                })
+            if counted:
                 logger.info(f"Received and saved track metadata: artist={artist}, title={title}, filename={filename}, queue={queue}")
-                increment_play_count(filename)
-                add_to_playback_history(filename)
-                save_last_played_track(filename)
-                add_track_to_queue()
-            socketio.emit('track_update', current_track_json)
+                request_refill('track_started')
+            elif get_cached_normal_queue_length() < REFILL_WATERMARK:
+                request_refill('low_watermark')
+            trace.mark('record')
+            broadcaster.publish('track_update', now_playing.view('snapshot'))
+            trace.mark('publish')
             if data.get('queue') == 'special':
                 try:
                     conn = get_db()
-                    cursor = conn.cursor()
-                    cursor.execute("UPDATE schedule SET queued = 0 WHERE track_path = ? AND queued = 1", (data.get('filename'),))
-                    affected_rows = cursor.rowcount
-                    conn.commit()
-                    conn.close()
+                    try:
+                        cursor = conn.cursor()
+                        cursor.execute("UPDATE schedule SET queued = 0 WHERE track_path = ? AND queued = 1", (data.get('filename'),))
+                        affected_rows = cursor.rowcount
+                        conn.commit()
+                    finally:
+                        conn.close()
                     if affected_rows > 0:
                         logger.info(f"Cleared queued=0 for started special track: {data.get('filename')}")
                 except Exception as e:
                     logger.error(f"Error clearing queued in handle_track: {str(e)}")
-            return jsonify({'success': True})
+                trace.mark('schedule')
+            transition_tracer.finish(trace)
+            return jsonify({'success': True, 'trace_id': trace.id})
         except Exception as e:
             logger.error(f"Error in handle_track (POST): {str(e)}")
             return jsonify({'error': str(e)}), 500
     else:
         try:
-            with open(CURRENT_TRACK_FILE, 'r') as f:
-                data = json.load(f)
-            return jsonify([
-                ["filename", data.get("filename", "Unknown File")],
-                ["artist", data.get("artist", "Unknown Artist")],
-                ["title", data.get("title", "Unknown Title")],
-                ["album", data.get("album", "Radio VTRNK Stream")]
-            ])
+            return Response(now_playing.view('track'), mimetype='application/json')
         except Exception as e:
             logger.error(f"Error in handle_track (GET): {str(e)}")
             return jsonify([
@@ -451,7 +768,8 @@ def track_added_special():
             'timestamp': datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
         }
         logger.info(f"Track added to special queue: filename={filename}, type={track_type}, queue={queue}")
-        socketio.emit('track_added_special', track_added_json)
+        queue_mirror.added('special', filename)
+        broadcaster.publish('track_added_special', track_added_json)
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"Error in track_added_special: {str(e)}")
@@ -471,7 +789,8 @@ def track_added_normal():
             'timestamp': datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
         }
         logger.info(f"Track added to normal queue: filename={filename}, type={track_type}, queue={queue}")
-        socketio.emit('track_added_normal', track_added_json)
+        queue_mirror.added('normal', filename)
+        broadcaster.publish('track_added_normal', track_added_json)
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"Error in track_added_normal: {str(e)}")
@@ -488,12 +807,8 @@ def update_show():
         if not track_path:
             logger.warning("Missing track_path in update_show request")
             return jsonify({'success': False, 'error': 'Missing track_path'}), 400
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM tracks WHERE path = ?", (track_path,))
-        if not cursor.fetchone():
+        if not track_cache.get_by_path(track_path):
             logger.warning(f"No show found with path {track_path}")
-            conn.close()
             return jsonify({'success': False, 'error': f"No show found with path {track_path}"}), 404
         update_query = "UPDATE tracks SET "
         update_params = []
@@ -525,26 +840,23 @@ def update_show():
         if update_params:
             update_query = update_query.rstrip(', ') + " WHERE path = ?"
             update_params.append(track_path)
+            conn = get_db()
+            cursor = conn.cursor()
             cursor.execute(update_query, update_params)
             affected_rows = cursor.rowcount
             conn.commit()
+            conn.close()
+            track_cache.invalidate(paths=[track_path])
             if affected_rows > 0:
                 logger.info(f"Updated show for path {track_path}")
-                conn.close()
                 return jsonify({'success': True})
             else:
                 logger.warning(f"No show found with path {track_path} after update attempt")
-                conn.close()
                 return jsonify({'success': False, 'error': f"No show found with path {track_path}"}), 404
         else:
-            conn.close()
             return jsonify({'success': False, 'error': 'No updates provided'}), 400
     except Exception as e:
         logger.error(f"Error in update_show: {str(e)}")
-        try:
-            conn.close()
-        except:
-            pass
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/upload_radio_show', methods=['POST'])
@@ -580,6 +892,7 @@ def delete_radio_show():
         affected_rows = cursor.rowcount
         conn.commit()
         conn.close()
+        track_cache.invalidate(paths=[track_path])
         if affected_rows == 0:
             logger.warning(f"No radio show found with path {track_path}")
             return jsonify({'success': False, 'error': f"No radio show found with path {track_path}"}), 404
@@ -633,18 +946,29 @@ def get_db_schema():
 
 @socketio.on('connect')
 def handle_connect():
-    logger.info("WebSocket client connected")
-    emit('track_update', {'message': 'WebSocket connection established'})
+    logger.debug("WebSocket client connected")
+    broadcaster.client_connected(request.sid)
+    emit('track_update', now_playing.view('snapshot'))
+
+@socketio.on('track_ack')
+def handle_track_ack(data):
+    if isinstance(data, dict):
+        transition_tracer.acked(data.get('trace_id'), 'socketio')
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    logger.info("WebSocket client disconnected")
+    logger.debug("WebSocket client disconnected")
+    broadcaster.client_disconnected(request.sid)
 
 def get_special_queue_contents():
     try:
         response = liquidsoap_command("get_special_queue_contents")
-        logger.info(f"Special queue contents: {response}")
+        logger.debug("Special queue contents: %s", response)
+        queue_mirror.reconcile('special', entries=[path for path in response.split(',') if path])
         return response
+    except LiquidsoapUnavailable:
+        logger.warning("Using mirrored special queue contents")
+        return ','.join(queue_mirror.entries('special'))
     except Exception as e:
         logger.error(f"Error getting special queue contents: {str(e)}")
         return ""
@@ -652,97 +976,213 @@ def get_special_queue_contents():
 def skip_normal_queue():
     try:
         response = liquidsoap_command("skip_normal")
+        skips.labels('skip_normal').inc()
         logger.info(f"Skipped normal queue track, response: {response}")
         return response
     except Exception as e:
         logger.error(f"Error skipping normal queue: {str(e)}")
         return str(e)
 
-def schedule_checker():
-    last_played = None
+def load_schedule_entries():
     conn = get_db()
-    cursor = conn.cursor()
-    while True:
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM schedule WHERE enabled = 1 AND queued = 0")
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def run_radio_show_entry(entry):
+    """Queue a scheduled show and verify it started; return True once the entry is done"""
+    if not liquidsoap.available():
+        logger.warning(f"Liquidsoap unavailable, postponing show {entry['track_path']}")
+        return False
+    success = False
+    for attempt in range(1, 4):
+        logger.info(f"Attempt {attempt}/3 to add show {entry['track_path']} to special_queue")
         try:
-            msk_tz = pytz.timezone('Europe/Moscow')
-            current_time = datetime.now(msk_tz)
-            if current_time.second % 10 != 0:
-                time.sleep(1)
-                continue
-            current_time_rounded = current_time.replace(second=0, microsecond=0)
-            current_time_str = current_time_rounded.strftime('%Y-%m-%dT%H:%M')
-            logger.info(f"Checking schedule at {current_time_str}")
-            cursor.execute("SELECT * FROM schedule WHERE enabled = 1 AND queued = 0")
-            schedule = [dict(row) for row in cursor.fetchall()]
-            for entry in schedule:
-                try:
-                    try:
-                        scheduled_time = datetime.strptime(entry['start_time'], '%Y-%m-%dT%H:%M').replace(tzinfo=msk_tz)
-                    except ValueError:
-                        scheduled_time = datetime.strptime(entry['start_time'], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=msk_tz)
-                    scheduled_time_str = scheduled_time.strftime('%Y-%m-%dT%H:%M')
-                    window_end = scheduled_time + timedelta(minutes=5)
-                    window_end_str = window_end.strftime('%Y-%m-%dT%H:%M')
-                    logger.info(f"Schedule entry: id={entry['id']}, track_path={entry['track_path']}, start_time={scheduled_time_str}, current_time={current_time_str}, window_end={window_end_str}")
-                    if current_time_str >= scheduled_time_str and current_time_str <= window_end_str:
-                        success = False
-                        for attempt in range(1, 4):
-                            logger.info(f"Attempt {attempt}/3 to add show {entry['track_path']} to special_queue")
-                            response = liquidsoap_command(f"play_radio_show {entry['track_path']}")
-                            time.sleep(RADIO_SHOW_SKIP_DELAY)
-                            skip_response = skip_normal_queue()
-                            logger.info(f"Skipped normal queue after {RADIO_SHOW_SKIP_DELAY}s delay, response: {skip_response}")
-                            time.sleep(55)
-                            current_track_data = get_current_track()
-                            current_filename = current_track_data.get('filename', '')
-                            special_contents = get_special_queue_contents()
-                            if current_filename == entry['track_path']:
-                                logger.info(f"Success on attempt {attempt}: Show {entry['track_path']} is playing")
-                                success = True
-                                break
-                            elif entry['track_path'] in special_contents.split(','):
-                                logger.info(f"Success on attempt {attempt}: Show {entry['track_path']} in special_queue")
-                                success = True
-                                break
-                            else:
-                                logger.warning(f"Retry: Show not found, special_contents={special_contents}, current_filename={current_filename}")
-                        if success:
-                            cursor.execute("UPDATE schedule SET queued = 1, enabled = 0 WHERE id = ?", (entry['id'],))
-                            conn.commit()
-                            logger.info(f"Marked as queued=1 and enabled=0 for schedule entry id={entry['id']}, track={entry['track_path']}")
-                        else:
-                            logger.error(f"Failed to add show {entry['track_path']} after 3 attempts")
-                    else:
-                        logger.info(f"Condition not met for entry id={entry['id']}")
-                except ValueError as e:
-                    logger.error(f"Invalid start_time for entry {entry['id']}: {str(e)}")
-                    continue
-            time.sleep(1)
-        except Exception as e:
-            logger.error(f"Error in schedule_checker: {str(e)}")
-            try:
-                conn.close()
-            except:
-                pass
-            try:
-                conn = get_db()
-                cursor = conn.cursor()
-            except Exception as db_err:
-                logger.error(f"Failed to reconnect to database: {str(db_err)}")
-            time.sleep(10)
+            response = liquidsoap_command(f"play_radio_show {entry['track_path']}")
+        except LiquidsoapUnavailable:
+            logger.warning(f"Liquidsoap went away during attempt {attempt}, postponing show {entry['track_path']}")
+            break
+        time.sleep(RADIO_SHOW_SKIP_DELAY)
+        skip_response = skip_normal_queue()
+        logger.info(f"Skipped normal queue after {RADIO_SHOW_SKIP_DELAY}s delay, response: {skip_response}")
+        time.sleep(RADIO_SHOW_VERIFY_DELAY)
+        current_track_data = get_current_track()
+        current_filename = current_track_data.get('filename', '')
+        special_contents = ','.join(queue_mirror.entries('special'))
+        if not queue_mirror.contains('special', entry['track_path']):
+            special_contents = get_special_queue_contents()
+        if current_filename == entry['track_path']:
+            logger.info(f"Success on attempt {attempt}: Show {entry['track_path']} is playing")
+            success = True
+            break
+        elif entry['track_path'] in special_contents.split(','):
+            logger.info(f"Success on attempt {attempt}: Show {entry['track_path']} in special_queue")
+            success = True
+            break
+        else:
+            logger.warning(f"Retry: Show not found, special_contents={special_contents}, current_filename={current_filename}")
+    if not success:
+        logger.error(f"Failed to add show {entry['track_path']} after 3 attempts")
+        return False
+    conn = get_db()
     try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE schedule SET queued = 1, enabled = 0 WHERE id = ?", (entry['id'],))
+        conn.commit()
+    finally:
         conn.close()
-    except:
-        pass
-
-threading.Thread(target=schedule_checker, daemon=True).start()
-scheduler = AsyncIOScheduler()
-scheduler.add_job(add_track_to_queue, "interval", seconds=10)
-logger.info("Starting scheduler for add_track_to_queue every 10 seconds")
-scheduler.start()
-logger.info("Scheduler started")
-add_track_to_queue()
-logger.info("Starting radio player, initializing Flask server")
+    logger.info(f"Marked as queued=1 and enabled=0 for schedule entry id={entry['id']}, track={entry['track_path']}")
+    return True
+
+def disable_missed_schedule_entry(entry):
+    """Retire an entry whose start window closed, so reloads and restarts don't report it again"""
+    conn = get_db()
+    try:
+        with conn:
+            conn.execute("UPDATE schedule SET enabled = 0 WHERE id = ? AND start_time = ?", (entry['id'], entry['start_time']))
+    finally:
+        conn.close()
+    logger.info(f"Disabled missed schedule entry id={entry['id']}")
+
+schedule_engine = ScheduleEngine(load_schedule_entries, run_radio_show_entry, SCHEDULE_TZ,
+                                 window=SCHEDULE_WINDOW, retry_delay=SCHEDULE_RETRY_DELAY,
+                                 reload_interval=SCHEDULE_RELOAD_INTERVAL, on_missed=disable_missed_schedule_entry)
+refill_coordinator = RefillCoordinator(add_track_to_queue, debounce=REFILL_DEBOUNCE, safety_interval=REFILL_SAFETY_INTERVAL)
+
+def request_refill(reason):
+    """Refill runs on the leader; other processes forward the trigger over the broadcast bus"""
+    if leader.is_leader:
+        refill_coordinator.trigger(reason)
+    else:
+        broadcaster.publish('refill', {'reason': reason}, emit=False)
+
+def schedule_changed():
+    if not leader.is_leader:
+        broadcaster.publish('schedule_changed', {}, emit=False)
+
+def start_leader_work():
+    schedule_engine.start()
+    refill_coordinator.start()
+    refill_coordinator.trigger('elected')
+    logger.info(f"Leading: schedule engine and queue refill started, safety interval {REFILL_SAFETY_INTERVAL}s")
+
+def stop_leader_work():
+    schedule_engine.stop()
+    refill_coordinator.stop()
+    logger.info("No longer leading: schedule engine and queue refill stopped")
+
+# Only the process holding the lease checks the schedule and refills the queue; any process serves HTTP
+leader = LeaderElection(db, 'player', ttl=LEADER_LEASE_TTL, renew_interval=LEADER_RENEW_INTERVAL,
+                        on_elected=start_leader_work, on_demoted=stop_leader_work)
+
+def breaker_state():
+    state = liquidsoap.breaker.state
+    return {(name,): 1 if name == state else 0 for name in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN)}
+
+metrics.callback('radio_socketio_clients', 'Connected Socket.IO clients in this process', lambda: broadcaster.snapshot()['clients'])
+metrics.callback('radio_sse_listeners', 'Open /now_playing/stream connections', lambda: now_playing_events.listeners)
+metrics.callback('radio_broadcast_events_total', 'Broadcast events by stage', lambda: {(key,): value for key, value in broadcaster.snapshot().items() if key in ('published', 'emitted', 'coalesced')}, ('stage',), kind='counter')
+metrics.callback('radio_queue_length', 'Mirrored Liquidsoap queue length', lambda: {(name,): queue_mirror.length(name) for name in ('normal', 'special')}, ('queue',))
+metrics.callback('radio_refill_runs_total', 'Queue refills run', lambda: refill_coordinator.stats['runs'], kind='counter')
+metrics.callback('radio_refill_errors_total', 'Queue refills that failed', lambda: refill_coordinator.stats['errors'], kind='counter')
+metrics.callback('radio_refill_triggers_total', 'Queue refill triggers, including coalesced ones', lambda: refill_coordinator.stats['triggers'], kind='counter')
+metrics.callback('radio_schedule_lag_seconds', 'How late the schedule engine started its last entry', lambda: schedule_engine.stats['last_lag'])
+metrics.callback('radio_schedule_max_lag_seconds', 'Largest schedule engine lag since it started', lambda: schedule_engine.stats['max_lag'])
+metrics.callback('radio_schedule_pending_entries', 'Schedule entries waiting to start', lambda: len(schedule_engine))
+metrics.callback('radio_schedule_missed_total', 'Schedule entries whose start window passed', lambda: schedule_engine.stats['missed'], kind='counter')
+metrics.callback('radio_is_leader', 'Whether this process runs the schedule engine and queue refill', lambda: int(leader.is_leader))
+metrics.callback('radio_liquidsoap_breaker_state', 'Liquidsoap circuit breaker state', breaker_state, ('state',))
+metrics.callback('radio_liquidsoap_deferred_commands', 'Commands waiting for Liquidsoap to come back', lambda: len(liquidsoap.pending_commands()))
+metrics.callback('radio_db_connections_opened_total', 'SQLite connections opened', lambda: db.stats['opened'], kind='counter')
+metrics.callback('radio_db_connections_reused_total', 'SQLite connections taken from the pool', lambda: db.stats['reused'], kind='counter')
+metrics.callback('radio_track_cache_requests_total', 'Track cache lookups by result', lambda: {('hit',): track_cache.stats['hits'], ('miss',): track_cache.stats['misses']}, ('result',), kind='counter')
+metrics.callback('radio_track_cache_size', 'Track rows in the metadata cache', lambda: len(track_cache))
+metrics.callback('radio_jobs_active', 'Queued or running background jobs', lambda: len(job_manager.active()))
+metrics.callback('radio_plays_pending', 'Track starts not yet written to the database', lambda: play_recorder.snapshot()['pending'])
+
+# --- Lifecycle ---
+# Importing this module only builds objects: no files, sockets, threads or queries until start()
+lifecycle = {'started': False, 'stopped': False, 'draining': False}
+readiness = {'database': False, 'catalog': False, 'track_cache': False, 'liquidsoap': False}
+lifecycle_lock = threading.Lock()
+
+def probe_liquidsoap():
+    try:
+        liquidsoap.command("get_normal_queue_length")
+        return True
+    except LiquidsoapError:
+        return False
+
+def warm_track_cache():
+    current = get_current_track()
+    try:
+        for track_path in [current.get('filename'), current.get('next_track')] + playback_history.recent():
+            if track_path:
+                track_cache.get_by_path(track_path)
+        return True
+    except Exception as e:
+        logger.error(f"Error warming track cache: {str(e)}")
+        return False
+
+def warm_up():
+    """Retry each dependency until it answers; /ready reports the steps done so far"""
+    while not lifecycle['stopped']:
+        if not readiness['database']:
+            readiness['database'] = migrate_db()
+        if readiness['database'] and not readiness['catalog']:
+            sync_track_catalog()
+            readiness['catalog'] = not track_catalog.needs_load()
+        if readiness['database'] and not readiness['track_cache']:
+            readiness['track_cache'] = warm_track_cache()
+        if not readiness['liquidsoap']:
+            readiness['liquidsoap'] = probe_liquidsoap()
+        if all(readiness.values()):
+            logger.info("Warm-up finished, ready")
+            return
+        time.sleep(WARM_UP_RETRY_DELAY)
+
+def start():
+    """Load state, start background threads and warm up; returns at once, see /ready. Safe to call again"""
+    with lifecycle_lock:
+        if lifecycle['started']:
+            return
+        lifecycle['started'] = True
+    setup_logging('radio_player', os.path.join(LOGS_DIR, LOG_FILE), level=LOG_LEVEL)
+    logger.info("Starting radio player, initializing Flask server")
+    now_playing.load()
+    now_playing.start()
+    playback_history.load()
+    readiness['database'] = migrate_db()  # The leases table must exist before the election
+    play_recorder.set_last_played(get_last_played_track())
+    play_recorder.start()
+    now_playing_events.publish('track_update', now_playing.view('snapshot'))
+    broadcaster.start()
+    leader.start()
+    atexit.register(stop)
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def stop():
+    """Release the lease, write buffered plays and state, and close connections. Safe to call again"""
+    with lifecycle_lock:
+        if not lifecycle['started'] or lifecycle['stopped']:
+            return
+        lifecycle['stopped'] = True
+    logger.info("Stopping radio player")
+    leader.stop()
+    play_recorder.stop()
+    broadcaster.stop()
+    now_playing.stop()
+    job_manager.shutdown(wait=False)
+    liquidsoap.close()
+    db.close_all()
+
+def create_app():
+    """Start the player and return the Flask app for a WSGI server"""
+    start()
+    return app
 
 def reset_play_counts():
     try:
@@ -752,6 +1192,8 @@ def reset_play_counts():
         affected_rows = cursor.rowcount
         conn.commit()
         conn.close()
+        track_cache.clear()
+        track_catalog.invalidate()
         logger.info(f"Reset play counts for {affected_rows} tracks")
         return {"success": True, "message": f"Reset play counts for {affected_rows} tracks"}
     except Exception as e:
@@ -760,28 +1202,213 @@ def reset_play_counts():
 
 def fetch_cover_path():
     try:
-        with open(CURRENT_TRACK_FILE, 'r') as f:
-            data = json.load(f)
-        filename = data.get('filename', '')
+        current_track = get_current_track()
+        filename = current_track.get('filename', '')
         if not filename:
-            logger.warning("No filename found in JSON")
+            logger.warning("No filename found in current track")
             return "/images/placeholder2.png"
-        static_cover = getattr(fetch_cover_path, 'static_cover', None)
-        if static_cover and static_cover['filename'] == filename:
-            return static_cover['cover_path']
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT path_img FROM tracks WHERE path = ?", (filename,))
-        track = cursor.fetchone()
-        conn.close()
-        cover_path = track['path_img'] if track and track['path_img'] else "/images/placeholder2.png"
-        logger.debug(f"Found cover for {filename}: {cover_path}")
-        fetch_cover_path.static_cover = {'filename': filename, 'cover_path': cover_path}
+        if current_track.get('cover_path'):
+            return current_track['cover_path']
+        # Snapshot written before covers were stored with the track
+        cover_path = lookup_cover_path(filename)
+        now_playing.update(cover_path=cover_path)
+        logger.debug("Found cover for %s: %s", filename, cover_path)
         return cover_path
     except Exception as e:
         logger.error(f"Error fetching cover path: {str(e)}")
         return "/images/placeholder2.png"
 
+@app.route('/now_playing', methods=['GET'])
+def now_playing_endpoint():
+    try:
+        etag, data, body = now_playing.peek('now_playing')
+        max_age = NOW_PLAYING_MAX_AGE
+        if data.get('started_at') and data.get('duration'):
+            # Don't let clients cache past the expected end of the track
+            remaining = data['started_at'] + data['duration'] - time.time()
+            max_age = int(max(1, min(NOW_PLAYING_MAX_AGE, remaining)))
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+        return response
+    except Exception as e:
+        logger.error(f"Error in now_playing_endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/track_cache', methods=['GET'])
+def track_cache_stats():
+    return jsonify(track_cache.snapshot())
+
+@app.route('/now_playing/stream', methods=['GET'])
+def now_playing_stream():
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = Response(now_playing_events.stream(last_event_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass each event through as it is written
+    return response
+
+@app.route('/now_playing/ack', methods=['POST'])
+def now_playing_ack():
+    # Sent with navigator.sendBeacon by EventSource clients, so the body may arrive as text/plain
+    data = request.get_json(force=True, silent=True)
+    if isinstance(data, dict):
+        transition_tracer.acked(data.get('trace_id'), 'sse')
+    return '', 204
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Warm-up only latches the first successful probe; afterwards the breaker tracks whether Liquidsoap answers
+    checks = dict(readiness, liquidsoap=readiness['liquidsoap'] and liquidsoap.available())
+    is_ready = lifecycle['started'] and not lifecycle['stopped'] and not lifecycle['draining'] and all(checks.values())
+    return jsonify({
+        'ready': is_ready,
+        'draining': lifecycle['draining'],
+        'checks': checks,
+        'leader': leader.is_leader
+    }), 200 if is_ready else 503
+
+@app.route('/transitions', methods=['GET'])
+def transitions():
+    return jsonify(transition_tracer.snapshot())
+
+def admin_only(fn):
+    """Require ADMIN_TOKEN in X-Admin-Token or as a Bearer token (as Prometheus sends it); off while it is unset.
+
+    There is no localhost fallback: behind nginx every request comes from 127.0.0.1.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Forbidden: set ADMIN_TOKEN to enable this endpoint'}), 403
+        token = request.headers.get('X-Admin-Token', '')
+        authorization = request.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+            return jsonify({'error': 'Forbidden'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+@app.route('/metrics', methods=['GET'])
+@admin_only
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=Registry.CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+@admin_only
+def profile_status():
+    return jsonify(stack_sampler.snapshot())
+
+@app.route('/debug/profile/start', methods=['POST'])
+@admin_only
+def start_profile():
+    try:
+        data = request.get_json(silent=True) or {}
+        if not stack_sampler.start(float(data.get('seconds', 30)), float(data.get('interval', 0.01))):
+            return jsonify({'error': 'A profiling session is already running', **stack_sampler.snapshot()}), 409
+        logger.info(f"Started stack sampling for {stack_sampler.seconds}s every {stack_sampler.interval}s")
+        return jsonify(stack_sampler.snapshot()), 202
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in start_profile: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/debug/profile/stop', methods=['POST'])
+@admin_only
+def stop_profile():
+    stack_sampler.stop()
+    return jsonify(stack_sampler.snapshot())
+
+@app.route('/debug/profile/collapsed', methods=['GET'])
+@admin_only
+def profile_collapsed():
+    response = Response(stack_sampler.collapsed(), mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename=player-{int(stack_sampler.started_at or time.time())}.collapsed'
+    return response
+
+@app.route('/debug/tracemalloc', methods=['GET'])
+@admin_only
+def tracemalloc_status():
+    return jsonify(memory_tracker.snapshot())
+
+@app.route('/debug/tracemalloc/start', methods=['POST'])
+@admin_only
+def start_tracemalloc():
+    try:
+        data = request.get_json(silent=True) or {}
+        frames = memory_tracker.start(max(1, min(int(data.get('frames', 1)), 25)))
+        logger.info(f"Started tracemalloc with {frames} frames")
+        return jsonify(dict(memory_tracker.snapshot(), frames=frames))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/debug/tracemalloc/stop', methods=['POST'])
+@admin_only
+def stop_tracemalloc():
+    memory_tracker.stop()
+    logger.info("Stopped tracemalloc")
+    return jsonify(memory_tracker.snapshot())
+
+@app.route('/debug/tracemalloc/snapshot', methods=['POST'])
+@admin_only
+def take_tracemalloc_snapshot():
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        # Only the capture goes to the native pool; the tracker's lock is taken here, in the greenlet
+        snapshot = run_blocking(MemoryTracker.capture)
+        snapshot_id = memory_tracker.add(snapshot)
+        top = run_blocking(MemoryTracker.top, snapshot, request.args.get('key', 'lineno'), limit)
+        return jsonify({'id': snapshot_id, 'top': top, **memory_tracker.snapshot()})
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error in take_tracemalloc_snapshot: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/debug/tracemalloc/diff', methods=['GET'])
+@admin_only
+def tracemalloc_diff():
+    try:
+        base = memory_tracker.get(request.args.get('base', type=int))
+        target = memory_tracker.get(request.args.get('target', type=int))
+        if base is None or target is None:
+            return jsonify({'error': 'Unknown snapshot id', 'snapshots': memory_tracker.ids()}), 404
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify({'diff': run_blocking(MemoryTracker.diff, base, target, request.args.get('key', 'lineno'), limit)})
+    except Exception as e:
+        logger.error(f"Error in tracemalloc_diff: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/leader', methods=['GET'])
+def leader_status():
+    return jsonify(leader.snapshot())
+
+@app.route('/broadcast_stats', methods=['GET'])
+def broadcast_stats():
+    return jsonify(dict(broadcaster.snapshot(), sse=now_playing_events.snapshot()))
+
+@app.route('/track_cache/invalidate', methods=['POST'])
+def invalidate_track_cache():
+    """Called by track_watcher after it inserts or deletes tracks"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('all'):
+            track_cache.clear()
+            track_catalog.invalidate()
+            dropped = None
+        else:
+            dropped = track_cache.invalidate(paths=data.get('paths', []), names=data.get('names', []))
+            refresh_catalog_tracks(paths=data.get('paths', []), names=data.get('names', []))
+        logger.info(f"Track cache invalidated: {data}, dropped {dropped if dropped is not None else 'all'}")
+        return jsonify({'success': True, 'dropped': dropped})
+    except Exception as e:
+        logger.error(f"Error in invalidate_track_cache: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/get_next_track', methods=['GET'])
 def get_next_track_endpoint():
     global next_track
@@ -789,22 +1416,37 @@ def get_next_track_endpoint():
         if not next_track:
             logger.warning("No next track available")
             return jsonify({"next_track": "", "cover_path": "/images/placeholder2.png"}), 200
-        static_next_track = getattr(get_next_track_endpoint, 'static_next_track', None)
-        if static_next_track and static_next_track['next_track'] == next_track:
-            return jsonify({"next_track": next_track, "cover_path": static_next_track['cover_path']})
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT path_img FROM tracks WHERE path = ?", (next_track,))
-        track = cursor.fetchone()
-        conn.close()
-        cover_path = track['path_img'] if track and track['path_img'] else "/images/placeholder2.png"
-        logger.debug(f"Returning next track: {next_track}, cover: {cover_path}")
-        get_next_track_endpoint.static_next_track = {'next_track': next_track, 'cover_path': cover_path}
+        cover_path = lookup_cover_path(next_track)
+        logger.debug("Returning next track: %s, cover: %s", next_track, cover_path)
         return jsonify({"next_track": next_track, "cover_path": cover_path})
     except Exception as e:
         logger.error(f"Error in get_next_track_endpoint: {str(e)}")
         return jsonify({"next_track": "", "cover_path": "/images/placeholder2.png"}), 500
 
+@app.route('/liquidsoap_stats', methods=['GET'])
+def liquidsoap_stats():
+    try:
+        stats = liquidsoap.get_stats()
+        for entry in stats.values():
+            entry['avg_time'] = entry['total_time'] / entry['count'] if entry['count'] else 0.0
+        return jsonify({
+            'breaker': liquidsoap.breaker.snapshot(),
+            'pending_commands': liquidsoap.pending_commands(),
+            'queues': queue_mirror.snapshot(),
+            'commands': stats
+        })
+    except Exception as e:
+        logger.error(f"Error in liquidsoap_stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/queue_state', methods=['GET'])
+def queue_state_endpoint():
+    try:
+        return jsonify(queue_mirror.snapshot())
+    except Exception as e:
+        logger.error(f"Error in queue_state_endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/test', methods=['GET'])
 def test_endpoint():
     logger.info("Test endpoint accessed")
@@ -822,23 +1464,126 @@ def reset_play_counts_endpoint():
         logger.error(f"Error in reset_play_counts_endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+TRACK_COLUMNS = ('id', 'name', 'title', 'cover', 'duration', 'style', 'uploaded_by', 'upload_date', 'playcount',
+                 'status', 'artist', 'track_title', 'path', 'track_info', 'path_img')
+
+def iter_tracks(conn, columns, filters, after=None, limit=None):
+    """Yield track rows newest first, ordered by (upload_date, id) and starting after the cursor values.
+
+    Rows without an upload_date sort last; they are read in a second pass so
+    both passes can seek through an index instead of skipping earlier pages.
+    """
+    select = f"SELECT {', '.join(columns)} FROM tracks WHERE " + " AND ".join(f"{column} = ?" for column in filters)
+    params = list(filters.values())
+    passes = []
+    if after is None or after[0] is not None:
+        if after is None:
+            passes.append((" AND upload_date IS NOT NULL ORDER BY upload_date DESC, id DESC", []))
+        else:
+            passes.append((" AND (upload_date, id) < (?, ?) ORDER BY upload_date DESC, id DESC", list(after)))
+        passes.append((" AND upload_date IS NULL ORDER BY id DESC", []))
+    else:
+        passes.append((" AND upload_date IS NULL AND id < ? ORDER BY id DESC", [after[1]]))
+    remaining = limit
+    for clause, extra in passes:
+        query = select + clause
+        query_params = params + extra
+        if remaining is not None:
+            query += " LIMIT ?"
+            query_params.append(remaining)
+        cursor = conn.cursor()
+        cursor.execute(query, query_params)
+        while True:
+            rows = cursor.fetchmany(TRACKS_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+            if remaining is not None:
+                remaining -= len(rows)
+        if remaining is not None and remaining <= 0:
+            return
+
 @app.route('/tracks', methods=['GET'])
 def get_tracks():
+    """List tracks newest first.
+
+    Query parameters: status (default available), track_info, style, fields
+    (comma-separated columns), limit and cursor. With limit the response is
+    one page and X-Next-Cursor holds the cursor for the next one; without it
+    every matching track is streamed.
+    """
     try:
+        filters = {'status': request.args.get('status', 'available')}
+        for column in ('track_info', 'style'):
+            if request.args.get(column):
+                filters[column] = request.args[column]
+        # The old schedule page asks for radio shows with 'schedule' in the query string
+        if 'track_info' not in filters and 'schedule' in request.query_string.decode('utf-8', 'ignore'):
+            filters['track_info'] = 'radio_show'
+        fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+        unknown = [field for field in fields if field not in TRACK_COLUMNS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        fields = fields or list(TRACK_COLUMNS)
+        columns = fields + [column for column in ('id', 'upload_date') if column not in fields]
+        limit = request.args.get('limit', type=int)
+        if limit is not None and not 1 <= limit <= TRACKS_PAGE_MAX:
+            return jsonify({'error': f"limit must be between 1 and {TRACKS_PAGE_MAX}"}), 400
+        after = None
+        if request.args.get('cursor'):
+            try:
+                after = decode_cursor(request.args['cursor'])
+                if len(after) != 2 or not isinstance(after[1], int):
+                    raise ValueError("Invalid cursor")
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         conn = get_db()
-        cursor = conn.cursor()
-        if 'schedule' in request.url:
-            cursor.execute("SELECT * FROM tracks WHERE status = 'available' AND track_info = 'radio_show' ORDER BY upload_date DESC")
-        else:
-            cursor.execute("SELECT * FROM tracks WHERE status = 'available' ORDER BY upload_date DESC")
-        tracks = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        logger.info(f"Fetched {len(tracks)} tracks")
-        return jsonify(tracks)
     except Exception as e:
         logger.error(f"Error in get_tracks: {str(e)}")
         return jsonify([]), 500
 
+    headers = {'Vary': 'Accept-Encoding'}
+    if limit is not None:
+        # One bounded page: read it up front so the next cursor can go in a header
+        try:
+            rows = list(iter_tracks(conn, columns, filters, after, limit + 1))
+        except Exception as e:
+            logger.error(f"Error in get_tracks: {str(e)}")
+            return jsonify([]), 500
+        finally:
+            conn.close()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers['X-Next-Cursor'] = encode_cursor([rows[-1]['upload_date'], rows[-1]['id']])
+        items = iter(rows)
+        logger.debug("Fetched page of %d tracks, filters=%s", len(rows), filters)
+    else:
+        def stream_rows():
+            count = 0
+            try:
+                for row in iter_tracks(conn, columns, filters):
+                    count += 1
+                    yield row
+            except Exception as e:
+                # Headers are already sent; abort so the client sees a truncated body, not a short list
+                logger.error(f"Error streaming tracks after {count} rows: {str(e)}")
+                raise
+            finally:
+                conn.close()
+                logger.info(f"Streamed {count} tracks, filters={filters}")
+        items = stream_rows()
+
+    def render(rows):
+        for row in rows:
+            yield {field: row[field] for field in fields}
+
+    chunks = json_array_chunks(render(items))
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(chunks, mimetype='application/json', headers=headers)
+
 @app.route('/track_duration', methods=['POST'])
 def get_track_duration_endpoint():
     try:
@@ -847,13 +1592,9 @@ def get_track_duration_endpoint():
         if not track_name:
             logger.warning("Missing track_name in track_duration request")
             return jsonify({'error': 'Missing track_name'}), 400
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT duration FROM tracks WHERE name = ?", (track_name,))
-        track = cursor.fetchone()
-        conn.close()
+        track = track_cache.get_by_name(track_name)
         if track and track['duration']:
-            logger.info(f"Found duration for {track_name}: {track['duration']}")
+            logger.debug("Found duration for %s: %s", track_name, track['duration'])
             return jsonify({'duration': track['duration']})
         else:
             logger.warning(f"No duration found for {track_name}")
@@ -892,6 +1633,7 @@ def update_style():
         affected_rows = cursor.rowcount
         conn.commit()
         conn.close()
+        track_cache.invalidate(names=[track_name])
         if affected_rows == 0:
             logger.warning(f"No track found with name {track_name}")
             return jsonify({'error': f"No track found with name {track_name}"}), 404
@@ -914,15 +1656,22 @@ def update_track_info():
         if new_track_info not in valid_types:
             logger.warning(f"Invalid track_info value: {new_track_info}")
             return jsonify({'error': f"Invalid track_info value. Must be one of {valid_types}"}), 400
+        try:
+            track_id = int(track_id)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid track_id in update_track_info request: {track_id}")
+            return jsonify({'error': 'Invalid track_id'}), 400
         conn = get_db()
         cursor = conn.cursor()
         cursor.execute("UPDATE tracks SET track_info = ? WHERE id = ?", (new_track_info, track_id))
         affected_rows = cursor.rowcount
         conn.commit()
         conn.close()
+        track_cache.invalidate(ids=[track_id])
         if affected_rows == 0:
             logger.warning(f"No track found with id {track_id}")
             return jsonify({'error': f"No track found with id {track_id}"}), 404
+        refresh_catalog_tracks(ids=[track_id])
         logger.info(f"Updated track_info for track id {track_id} to {new_track_info}")
         return jsonify({'success': True})
     except Exception as e:
@@ -968,8 +1717,11 @@ def schedule_play():
         cursor = conn.cursor()
         cursor.execute("INSERT INTO schedule (track_path, start_time, enabled) VALUES (?, ?, 1)",
                       (track_path, scheduled_time))
+        entry_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        schedule_engine.add({'id': entry_id, 'track_path': track_path, 'start_time': scheduled_time})
+        schedule_changed()
         logger.info(f"Scheduled radio show {track_path} for {scheduled_time}")
         return jsonify({'success': True})
     except Exception as e:
@@ -984,6 +1736,8 @@ def delete_schedule(id):
         cursor.execute("DELETE FROM schedule WHERE id = ?", (id,))
         conn.commit()
         conn.close()
+        schedule_engine.remove(id)
+        schedule_changed()
         logger.info(f"Deleted schedule entry with id {id}")
         return jsonify({'success': True})
     except Exception as e:
@@ -998,27 +1752,20 @@ def play_radio_show():
         if not track_path:
             logger.warning("Missing track_path in play_radio_show request")
             return jsonify({'error': 'Missing track_path'}), 400
+        if liquidsoap_breaker_open():
+            return liquidsoap_unavailable_response(LiquidsoapUnavailable("Liquidsoap circuit breaker is open"))
         with last_played_track_lock:
             current_track = get_current_track().get('filename', '')
             if current_track == track_path:
                 logger.warning(f"Attempted to play the same track {track_path} twice consecutively")
                 return jsonify({'error': 'Cannot play the same track twice consecutively'}), 400
-            response = liquidsoap_command(f"play_radio_show {track_path}")
-            time.sleep(RADIO_SHOW_SKIP_DELAY)
-            logger.info(f"Sent to Liquidsoap: play_radio_show {track_path}, response: {response}")
-            skip_response = skip_normal_queue()
-            logger.info(f"Skipped normal queue after manual show play, response: {skip_response}")
-            artist, title = get_track_metadata(track_path)
-            save_last_played_track(track_path)
-            add_track_to_queue()
-            return jsonify({
-                'success': True,
-                'response': response,
-                'skip_response': skip_response,
-                'track_path': track_path,
-                'artist': artist,
-                'title': title
-            })
+            # One show insertion at a time: a second request for the same show joins the running job
+            job, created = job_manager.submit('play_radio_show', lambda: play_radio_show_now(track_path),
+                                              params={'track_path': track_path})
+        if not created and job['params'].get('track_path') != track_path:
+            logger.warning(f"Rejected play_radio_show {track_path}: show {job['params'].get('track_path')} is being inserted")
+            return jsonify({'error': 'Another radio show is being inserted', 'job_id': job['id']}), 409
+        return job_accepted_response(job, created)
     except Exception as e:
         logger.error(f"Error in play_radio_show: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1038,6 +1785,8 @@ def play_jingle():
             'response': response,
             'jingle_path': jingle_path
         })
+    except LiquidsoapUnavailable as e:
+        return liquidsoap_unavailable_response(e)
     except Exception as e:
         logger.error(f"Error in play_jingle: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1045,8 +1794,8 @@ def play_jingle():
 @app.route('/add_track_to_queue', methods=['POST'])
 def add_track_to_queue_endpoint():
     try:
-        add_track_to_queue()
-        return jsonify({'success': True})
+        request_refill('api')
+        return jsonify({'success': True, 'leader': leader.is_leader})
     except Exception as e:
         logger.error(f"Error adding track to queue: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1055,23 +1804,31 @@ def add_track_to_queue_endpoint():
 def smart_skip_endpoint():
     try:
         logger.info("Received smart_skip request")
-        result = smart_skip()
-        if result["success"]:
-            logger.info("Smart skip executed successfully")
-            return jsonify(result)
-        else:
-            logger.error(f"Smart skip failed: {result['error']}")
-            return jsonify(result), 500
+        if liquidsoap_breaker_open():
+            return liquidsoap_unavailable_response(LiquidsoapUnavailable("Liquidsoap circuit breaker is open"))
+        job, created = job_manager.submit('smart_skip', smart_skip)
+        if not created:
+            logger.info(f"Smart skip already in progress, joined job {job['id']}")
+        return job_accepted_response(job, created)
     except Exception as e:
         logger.error(f"Error in smart_skip_endpoint: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 @app.route('/skip_track', methods=['POST'])
 def skip_track_endpoint():
     try:
         response = skip_track()
-        add_track_to_queue()
+        request_refill('skip')
         return jsonify({'success': True, 'response': response})
+    except LiquidsoapUnavailable as e:
+        return liquidsoap_unavailable_response(e)
     except Exception as e:
         logger.error(f"Error skipping track: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1080,15 +1837,30 @@ def skip_track_endpoint():
 def play_playlist():
     try:
         response = liquidsoap_command("play_playlist")
-        add_track_to_queue()
+        request_refill('play_playlist')
         return jsonify({'success': True, 'response': response})
+    except LiquidsoapUnavailable as e:
+        return liquidsoap_unavailable_response(e)
     except Exception as e:
         logger.error(f"Error in play_playlist: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    logger.info("Starting radio player, initializing Flask server...")
+    import gevent
+    import signal
     from gevent.pywsgi import WSGIServer
     from geventwebsocket.handler import WebSocketHandler
-    http_server = WSGIServer(('0.0.0.0', 5001), app, handler_class=WebSocketHandler)
-    http_server.serve_forever()
\ No newline at end of file
+    http_server = WSGIServer(('0.0.0.0', 5001), create_app(), handler_class=WebSocketHandler)
+
+    def drain():
+        # /ready turns 503 at once but the server keeps serving for SHUTDOWN_GRACE seconds, so health checks
+        # take the process out of rotation; then the listener closes and requests in flight get SHUTDOWN_TIMEOUT
+        if lifecycle['draining']:
+            return
+        logger.info(f"SIGTERM received, draining: serving {SHUTDOWN_GRACE}s more, then up to {SHUTDOWN_TIMEOUT}s for requests in flight")
+        lifecycle['draining'] = True
+        gevent.spawn_later(SHUTDOWN_GRACE, http_server.stop, timeout=SHUTDOWN_TIMEOUT)
+
+    gevent.signal_handler(signal.SIGTERM, drain)
+    http_server.serve_forever()
+    stop()
\ No newline at end of file
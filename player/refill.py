@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger('radio_player.refill')
+
+
+class RefillCoordinator:
+    """Runs the queue refill on events instead of a fixed poll.
+
+    trigger() requests a refill; triggers arriving within the debounce
+    window are coalesced into one run. A slow safety timer covers missed
+    callbacks. Every run, including run_now() from request handlers, holds
+    the same lock, so only one refill is ever in flight.
+    """
+
+    def __init__(self, refill, debounce=0.5, safety_interval=60.0):
+        self._refill = refill
+        self.debounce = debounce
+        self.safety_interval = safety_interval
+        self._cond = threading.Condition()
+        self._run_lock = threading.Lock()
+        self._due = None
+        self._reasons = set()
+        self._thread = None
+        self._stopped = False
+        self.stats = {'triggers': 0, 'coalesced': 0, 'runs': 0, 'errors': 0, 'last_run': None, 'last_reasons': []}
+
+    def start(self):
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name='queue-refill', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def trigger(self, reason):
+        """Ask for a refill soon; cheap and safe to call from request handlers"""
+        with self._cond:
+            self.stats['triggers'] += 1
+            self._reasons.add(reason)
+            if self._due is None:
+                self._due = time.monotonic() + self.debounce
+                self._cond.notify()
+            else:
+                self.stats['coalesced'] += 1
+
+    def run_now(self, reason):
+        """Refill synchronously in the calling thread, waiting for any refill in flight"""
+        with self._cond:
+            self._reasons.discard(reason)
+        with self._run_lock:
+            self._run([reason])
+
+    def _loop(self):
+        next_safety = time.monotonic() + self.safety_interval
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    deadline = self._due if self._due is not None else next_safety
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                if self._stopped:
+                    return
+                reasons = sorted(self._reasons) or ['safety_timer']
+                self._reasons.clear()
+                self._due = None
+            with self._run_lock:
+                self._run(reasons)
+            next_safety = time.monotonic() + self.safety_interval
+
+    def _run(self, reasons):
+        start_time = time.monotonic()
+        try:
+            self._refill()
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Queue refill failed (triggered by {', '.join(reasons)}): {str(e)}")
+        self.stats['runs'] += 1
+        self.stats['last_run'] = time.time()
+        self.stats['last_reasons'] = reasons
+        logger.info(f"Queue refill triggered by {', '.join(reasons)} took {(time.monotonic() - start_time) * 1000:.1f}ms")
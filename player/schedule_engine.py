@@ -0,0 +1,208 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger('radio_player.schedule')
+
+START_TIME_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S')
+
+
+def parse_start_time(value, tz):
+    """Parse a schedule start_time in the station timezone into a Unix timestamp"""
+    for time_format in START_TIME_FORMATS:
+        try:
+            return tz.localize(datetime.strptime(value, time_format)).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"time data {value!r} does not match {' or '.join(START_TIME_FORMATS)}")
+
+
+class ScheduleEngine:
+    """Timer heap of pending schedule entries.
+
+    The engine thread sleeps until the earliest entry is due, or until
+    add()/remove()/reload() wake it. Each due entry runs run_entry(entry) on
+    its own thread, so a slow insertion never delays another entry.
+    run_entry returns True when the entry is done; otherwise it is retried
+    after retry_delay for as long as its start window is open. An entry
+    whose window closed is passed to on_missed(entry), which should retire it
+    in the database; until then reload() skips it, so it is reported once.
+    """
+
+    def __init__(self, load_entries, run_entry, tz, window=300, retry_delay=10, reload_interval=600, on_missed=None):
+        self._load_entries = load_entries
+        self._run_entry = run_entry
+        self._on_missed = on_missed
+        self.tz = tz
+        self.window = window
+        self.retry_delay = retry_delay
+        self.reload_interval = reload_interval
+        self._entries = {}  # id -> entry dict with '_start_ts'
+        self._due = {}  # id -> timestamp of the next attempt
+        self._heap = []  # (due timestamp, id); stale items are skipped lazily
+        self._running = set()
+        self._missed = {}  # id -> start_time of entries already reported missed
+        self._cond = threading.Condition()
+        self._reload_at = 0.0
+        self._thread = None
+        self._stopped = False
+        self.stats = {'runs': 0, 'retries': 0, 'missed': 0, 'last_lag': None, 'max_lag': 0.0}
+
+    def start(self):
+        if self._thread is None:
+            self._stopped = False
+            self._reload_at = 0.0  # Entries may have changed while stopped
+            self._thread = threading.Thread(target=self._loop, name='schedule-engine', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _schedule(self, entry_id, due):
+        self._due[entry_id] = due
+        heapq.heappush(self._heap, (due, entry_id))
+
+    def _put(self, entry):
+        try:
+            start_ts = parse_start_time(entry['start_time'], self.tz)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Invalid start_time for entry {entry.get('id')}: {str(e)}")
+            return False
+        if self._missed.get(entry['id']) == entry['start_time']:
+            return False
+        entry = dict(entry, _start_ts=start_ts)
+        self._entries[entry['id']] = entry
+        if entry['id'] not in self._running:
+            self._schedule(entry['id'], start_ts)
+        return True
+
+    def add(self, entry):
+        with self._cond:
+            added = self._put(entry)
+            self._cond.notify()
+        if added:
+            logger.info(f"Scheduled entry id={entry['id']}, track_path={entry['track_path']}, start_time={entry['start_time']}")
+        return added
+
+    def remove(self, entry_id):
+        with self._cond:
+            removed = self._entries.pop(entry_id, None) is not None
+            self._due.pop(entry_id, None)
+            self._cond.notify()
+        return removed
+
+    def reload(self):
+        """Replace pending entries with the database contents"""
+        entries = self._load_entries()
+        with self._cond:
+            self._entries.clear()
+            self._due.clear()
+            self._heap = []
+            for entry in entries:
+                self._put(entry)
+            self._reload_at = time.monotonic() + self.reload_interval
+            self._cond.notify()
+        logger.info(f"Loaded {len(self._entries)} pending schedule entries")
+
+    def __contains__(self, entry_id):
+        with self._cond:
+            return entry_id in self._entries
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def _next_due(self):
+        """Drop stale heap items and return the earliest live one, if any"""
+        while self._heap:
+            due, entry_id = self._heap[0]
+            if self._due.get(entry_id) == due and entry_id not in self._running:
+                return due, entry_id
+            heapq.heappop(self._heap)
+        return None
+
+    def _loop(self):
+        while True:
+            if time.monotonic() >= self._reload_at:
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"Error loading schedule: {str(e)}")
+                    self._reload_at = time.monotonic() + self.retry_delay
+            with self._cond:
+                if self._stopped:
+                    return
+                item = self._next_due()
+                now = time.time()
+                if item is None or item[0] > now:
+                    timeout = self._reload_at - time.monotonic()
+                    if item is not None:
+                        timeout = min(timeout, item[0] - now)
+                    self._cond.wait(max(0.0, timeout))
+                    continue
+                heapq.heappop(self._heap)
+                entry_id = item[1]
+                entry = self._entries[entry_id]
+                del self._due[entry_id]
+                missed = now > entry['_start_ts'] + self.window
+                if missed:
+                    logger.error(f"Missed start window for entry id={entry_id}, track_path={entry['track_path']}, start_time={entry['start_time']}")
+                    self._mark_missed(entry)
+                else:
+                    self._running.add(entry_id)
+                    # How late the engine woke up for this attempt
+                    self.stats['last_lag'] = now - item[0]
+                    self.stats['max_lag'] = max(self.stats['max_lag'], now - item[0])
+                    self.stats['runs'] += 1
+            if missed:
+                self._report_missed(entry)
+                continue
+            threading.Thread(target=self._run, args=(entry,), name=f"schedule-entry-{entry_id}", daemon=True).start()
+
+    def _run(self, entry):
+        entry_id = entry['id']
+        try:
+            done = self._run_entry(entry)
+        except Exception as e:
+            logger.error(f"Error running schedule entry id={entry_id}: {str(e)}")
+            done = False
+        missed = False
+        with self._cond:
+            self._running.discard(entry_id)
+            if entry_id not in self._entries:
+                return
+            if done:
+                del self._entries[entry_id]
+            else:
+                retry_at = time.time() + self.retry_delay
+                if retry_at <= entry['_start_ts'] + self.window:
+                    self._schedule(entry_id, retry_at)
+                    self.stats['retries'] += 1
+                else:
+                    logger.error(f"Giving up on entry id={entry_id}, track_path={entry['track_path']}: start window closed")
+                    self._mark_missed(entry)
+                    missed = True
+            self._cond.notify()
+        if missed:
+            self._report_missed(entry)
+
+    def _mark_missed(self, entry):
+        # Call with the lock held
+        del self._entries[entry['id']]
+        self._missed[entry['id']] = entry['start_time']
+        self.stats['missed'] += 1
+
+    def _report_missed(self, entry):
+        if self._on_missed is None:
+            return
+        try:
+            self._on_missed(entry)
+        except Exception as e:
+            logger.error(f"Error retiring missed entry id={entry['id']}: {str(e)}")
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from collections import deque
+from cooperative import HubWaiter, in_unpatched_greenlet
+
+
+class EventStream:
+    """Server-Sent Events served from one shared buffer of pre-encoded messages.
+
+    publish() encodes a message once; every listener reads the same bytes
+    and keeps only the id of the last message it sent, so an idle listener
+    costs a parked generator. A listener that falls behind (a slow client,
+    or a Last-Event-ID older than the buffer) skips to the newest message
+    instead of queueing, since each message is a complete snapshot.
+    Listeners served by gevent without monkey-patching wait on their hub
+    rather than the condition, so they don't block other requests.
+    """
+
+    def __init__(self, buffer_size=32, heartbeat=15, retry=3000):
+        self.heartbeat = heartbeat
+        self.retry = retry
+        # Ids restart with the process; the epoch makes a Last-Event-ID from a previous run unknown
+        self._epoch = format(int(time.time()), 'x')
+        self._seq = 0
+        self._buffer = deque(maxlen=buffer_size)  # (seq, encoded message)
+        self._cond = threading.Condition()
+        self._waiters = set()  # HubWaiter of each listener in an unpatched greenlet
+        self.listeners = 0
+        self.stats = {'published': 0, 'connections': 0, 'resumed': 0, 'skipped': 0}
+
+    def publish(self, event, data):
+        with self._cond:
+            self._seq += 1
+            message = (f"id: {self._epoch}-{self._seq}\nevent: {event}\n"
+                       f"data: {json.dumps(data, separators=(',', ':'))}\n\n").encode('utf-8')
+            self._buffer.append((self._seq, message))
+            self.stats['published'] += 1
+            self._cond.notify_all()
+            for waiter in self._waiters:
+                waiter.wake()
+
+    def _parse_id(self, last_event_id):
+        epoch, _, seq = (last_event_id or '').partition('-')
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _pending(self, seen):
+        """Return (messages after seen, new seen); call with the lock held"""
+        if not self._buffer:
+            return [], seen
+        oldest, newest = self._buffer[0][0], self._buffer[-1][0]
+        if seen is not None and seen == newest:
+            return [], seen
+        if seen is None or seen < oldest - 1 or seen > newest:
+            if seen is not None:
+                self.stats['skipped'] += 1
+            return [self._buffer[-1][1]], newest
+        return [message for seq, message in self._buffer if seq > seen], newest
+
+    def stream(self, last_event_id=None):
+        """Generator of response chunks for one listener"""
+        seen = self._parse_id(last_event_id)
+        waiter = HubWaiter() if in_unpatched_greenlet() else None
+        with self._cond:
+            self.listeners += 1
+            self.stats['connections'] += 1
+            if seen is not None:
+                self.stats['resumed'] += 1
+            if waiter is not None:
+                self._waiters.add(waiter)
+        try:
+            yield f"retry: {self.retry}\n\n".encode('utf-8')
+            while True:
+                with self._cond:
+                    messages, seen = self._pending(seen)
+                    if not messages and waiter is None:
+                        self._cond.wait(self.heartbeat)
+                        messages, seen = self._pending(seen)
+                if not messages and waiter is not None:
+                    # A publish between the check and the wait has already set the waiter's event
+                    waiter.wait(self.heartbeat)
+                    with self._cond:
+                        messages, seen = self._pending(seen)
+                yield b''.join(messages) if messages else b': keepalive\n\n'
+        finally:
+            with self._cond:
+                self.listeners -= 1
+                self._waiters.discard(waiter)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, listeners=self.listeners, buffered=len(self._buffer))
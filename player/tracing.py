@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+MAX_TRACE_ID_LENGTH = 64
+MAX_ORIGIN_SKEW = 3600  # Seconds an origin timestamp may differ from our clock before it is ignored
+
+
+def clean_trace_id(value):
+    if isinstance(value, str) and 0 < len(value) <= MAX_TRACE_ID_LENGTH and value.isprintable():
+        return value
+    return uuid.uuid4().hex[:16]
+
+
+def clean_origin_ts(value, now=None):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if abs((now or time.time()) - value) <= MAX_ORIGIN_SKEW else None
+
+
+class TransitionTrace:
+    """Stage timings of one track transition inside the POST /track callback"""
+
+    def __init__(self, trace_id, origin_ts=None):
+        self.id = trace_id
+        self.origin_ts = origin_ts
+        self.received_at = time.time()
+        self.stages = []
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """Close the stage that ends now"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def context(self):
+        """Carried in the track_update payload, so any process that emits it can time the emit"""
+        return {'id': self.id, 'origin_ts': self.origin_ts, 'received_at': self.received_at}
+
+
+class TransitionTracer:
+    """Latency of track transitions from Liquidsoap to listeners.
+
+    A transition is traced from the origin timestamp Liquidsoap sends (or
+    the arrival of POST /track), through the stages of the callback, to the
+    Socket.IO emit and optional client acknowledgements. Timings go to
+    on_stage(stage, seconds), on_emit(callback_to_emit, origin_to_emit) and
+    on_ack(seconds, transport); the last keep transitions are kept for
+    inspection. A transition superseded by a newer one before the coalesced
+    emit is never emitted.
+    """
+
+    def __init__(self, on_stage=None, on_emit=None, on_ack=None, keep=50, ack_window=60):
+        self.on_stage = on_stage
+        self.on_emit = on_emit
+        self.on_ack = on_ack
+        self.keep = keep
+        self.ack_window = ack_window
+        self._recent = OrderedDict()  # trace id -> summary
+        self._lock = threading.Lock()
+        self.stats = {'traced': 0, 'emitted': 0, 'acks': 0, 'ignored_acks': 0}
+
+    def _summary(self, trace_id, origin_ts=None, received_at=None):
+        summary = self._recent.get(trace_id)
+        if summary is None:
+            summary = {'id': trace_id, 'origin_ts': origin_ts, 'received_at': received_at, 'stages': {},
+                       'callback_ms': None, 'emitted_at': None, 'callback_to_emit_ms': None,
+                       'origin_to_emit_ms': None, 'acks': 0, 'first_ack_ms': None}
+            self._recent[trace_id] = summary
+            while len(self._recent) > self.keep:
+                self._recent.popitem(last=False)
+        return summary
+
+    def begin(self, trace_id=None, origin_ts=None):
+        trace = TransitionTrace(clean_trace_id(trace_id), clean_origin_ts(origin_ts))
+        with self._lock:
+            self._summary(trace.id, trace.origin_ts, trace.received_at)
+            self.stats['traced'] += 1
+        return trace
+
+    def finish(self, trace):
+        with self._lock:
+            summary = self._summary(trace.id, trace.origin_ts, trace.received_at)
+            summary['stages'] = {stage: round(seconds * 1000, 3) for stage, seconds in trace.stages}
+            summary['callback_ms'] = round(sum(seconds for _, seconds in trace.stages) * 1000, 3)
+        if self.on_stage is not None:
+            for stage, seconds in trace.stages:
+                self.on_stage(stage, seconds)
+
+    def emitted(self, context):
+        """Called as a track_update carrying context is emitted to this process's clients"""
+        if not context or not context.get('id'):
+            return
+        now = time.time()
+        callback_to_emit = now - context['received_at'] if context.get('received_at') else None
+        origin_to_emit = now - context['origin_ts'] if context.get('origin_ts') else None
+        with self._lock:
+            summary = self._summary(context['id'], context.get('origin_ts'), context.get('received_at'))
+            summary['emitted_at'] = now
+            if callback_to_emit is not None:
+                summary['callback_to_emit_ms'] = round(callback_to_emit * 1000, 3)
+            if origin_to_emit is not None:
+                summary['origin_to_emit_ms'] = round(origin_to_emit * 1000, 3)
+            self.stats['emitted'] += 1
+        if self.on_emit is not None:
+            self.on_emit(callback_to_emit, origin_to_emit)
+
+    def acked(self, trace_id, transport):
+        """A client showed the transition; returns False for unknown, unemitted or stale traces"""
+        now = time.time()
+        with self._lock:
+            summary = self._recent.get(trace_id) if isinstance(trace_id, str) else None
+            if summary is None or summary['emitted_at'] is None or now - summary['emitted_at'] > self.ack_window:
+                self.stats['ignored_acks'] += 1
+                return False
+            elapsed = now - summary['emitted_at']
+            summary['acks'] += 1
+            if summary['first_ack_ms'] is None:
+                summary['first_ack_ms'] = round(elapsed * 1000, 3)
+            self.stats['acks'] += 1
+        if self.on_ack is not None:
+            self.on_ack(elapsed, transport)
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return {'stats': dict(self.stats), 'recent': [dict(summary) for summary in reversed(self._recent.values())]}
@@ -0,0 +1,113 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('radio_player.track_cache')
+
+
+class TrackCache:
+    """Bounded LRU cache of track rows keyed by path, with name and id indexes.
+
+    load(column, value) fetches one row as a dict (or None) from the
+    database; column is 'path' or 'name'. Only found rows are cached, so a
+    newly inserted track is visible on its first lookup. Writers keep the
+    cache honest by calling update() or invalidate() after changing a row.
+    """
+
+    def __init__(self, load, max_size=2048):
+        self._load = load
+        self.max_size = max_size
+        self._records = OrderedDict()  # path -> row dict
+        self._by_name = {}
+        self._by_id = {}
+        self._generation = 0  # Bumped by every write so a slow load can't store a row invalidated meanwhile
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def _store(self, record):
+        path = record['path']
+        self._drop(path)
+        self._records[path] = record
+        if record.get('name'):
+            self._by_name[record['name']] = path
+        if record.get('id') is not None:
+            self._by_id[record['id']] = path
+        while len(self._records) > self.max_size:
+            self._drop(next(iter(self._records)))
+            self.stats['evictions'] += 1
+
+    def _drop(self, path):
+        record = self._records.pop(path, None)
+        if record is None:
+            return False
+        if self._by_name.get(record.get('name')) == path:
+            del self._by_name[record['name']]
+        if self._by_id.get(record.get('id')) == path:
+            del self._by_id[record['id']]
+        return True
+
+    def _get(self, path):
+        record = self._records.get(path)
+        if record is not None:
+            self._records.move_to_end(path)
+            self.stats['hits'] += 1
+        return record
+
+    def _fetch(self, column, value):
+        with self._lock:
+            self.stats['misses'] += 1
+            generation = self._generation
+        record = self._load(column, value)
+        if record is not None and record.get('path'):
+            with self._lock:
+                if generation == self._generation:
+                    self._store(record)
+        return record
+
+    def get_by_path(self, path):
+        """Return the track row for path as a dict, or None; the dict must not be modified"""
+        if not path:
+            return None
+        with self._lock:
+            record = self._get(path)
+        return record if record is not None else self._fetch('path', path)
+
+    def get_by_name(self, name):
+        if not name:
+            return None
+        with self._lock:
+            path = self._by_name.get(name)
+            record = self._get(path) if path is not None else None
+        return record if record is not None else self._fetch('name', name)
+
+    def update(self, path, **fields):
+        """Write-through for a change the caller just committed"""
+        with self._lock:
+            self._generation += 1
+            record = self._records.get(path)
+            if record is not None:
+                self._store(dict(record, **fields))
+
+    def invalidate(self, paths=(), names=(), ids=()):
+        with self._lock:
+            self._generation += 1
+            dropped = sum(self._drop(path) for path in paths)
+            dropped += sum(self._drop(self._by_name[name]) for name in names if name in self._by_name)
+            dropped += sum(self._drop(self._by_id[track_id]) for track_id in ids if track_id in self._by_id)
+            self.stats['invalidations'] += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.stats['invalidations'] += len(self._records)
+            self._records.clear()
+            self._by_name.clear()
+            self._by_id.clear()
+
+    def __len__(self):
+        return len(self._records)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._records), max_size=self.max_size)
@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import sys
+import urllib.request
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import Database
+from common.styles import reclassify_tracks
+
+# Загрузка .env
+load_dotenv('/home/beasty197/projects/vtrnk_radio/.env')
+
+DB_PATH = os.getenv('DB_PATH')
+PLAYER_URL = os.getenv('PLAYER_URL', 'http://127.0.0.1:5001')  # radio_player.py, для сброса кэша треков
+
+
+def notify_player():
+    """Стили закэшированы в radio_player вместе со строками треков: сбрасываем кэш целиком"""
+    try:
+        body = json.dumps({'all': True}).encode('utf-8')
+        request = urllib.request.Request(f"{PLAYER_URL}/track_cache/invalidate", data=body,
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=2) as response:
+            response.read()
+    except Exception as e:
+        print(f"Не удалось сбросить кэш плеера: {str(e)}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчитать tracks.style по общей таксономии стилей (common/styles.py)")
+    parser.add_argument('--apply', action='store_true', help="записать изменения; без флага только отчёт (dry run)")
+    parser.add_argument('--db', default=DB_PATH, help="путь к radio.db (по умолчанию DB_PATH из .env)")
+    parser.add_argument('--samples', type=int, default=20, help="сколько изменённых треков показать в отчёте")
+    args = parser.parse_args()
+
+    db = Database(args.db, pool_size=1)
+    conn = db.connect()
+    try:
+        report = reclassify_tracks(conn, apply=args.apply, sample_size=args.samples)
+    finally:
+        conn.close()
+        db.close_all()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.apply and report['changed']:
+        notify_player()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,24 @@
 import os
+import sys
 import time
-import sqlite3
 import json
+import urllib.request
 from mutagen.easyid3 import EasyID3
 from mutagen.mp3 import MP3
 from mutagen.id3 import ID3
-import logging
-import logging.handlers
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.db import Database
+from common.migrations import migrate
+from common.logs import setup_logging
+from common.styles import classify_style
+
 # Загрузка .env
 load_dotenv('/home/beasty197/projects/vtrnk_radio/.env')
 
-# Настройка логирования
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-handler = logging.handlers.RotatingFileHandler(
-    filename=os.path.join(os.getenv('LOGS_DIR'), 'track_watcher.log'),
-    maxBytes=5*1024*1024,  # 5 МБ
-    backupCount=5
-)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+# Настройка логирования: запись на диск в отдельном потоке (common/logs.py), DEBUG через LOG_LEVEL
+logger = setup_logging(__name__, os.path.join(os.getenv('LOGS_DIR'), 'track_watcher.log'), level=os.getenv('LOG_LEVEL', 'INFO'))
 
 # Пути и настройки из .env
 AUDIO_DIRS = [
@@ -37,6 +33,7 @@ DB_PATH = os.getenv('DB_PATH')
 TRACKS_DATA_DIR = os.getenv('TRACKS_DATA_DIR')
 PLACEHOLDER_COVER = os.getenv('PLACEHOLDER_COVER')
 RADIO_SHOW_LIMIT = int(os.getenv('RADIO_SHOW_LIMIT', 20))
+PLAYER_URL = os.getenv('PLAYER_URL', 'http://127.0.0.1:5001')  # radio_player.py, для сброса кэша треков
 
 # Title validation settings
 MAX_TITLE_LENGTH = 200  # Maximum length for track/set titles
@@ -75,87 +72,37 @@ def validate_artist_length(artist, max_length=MAX_ARTIST_LENGTH):
         return artist[:max_length].rstrip()
     return artist
 
-PREDEFINED_STYLES = [
-    "Jungle", "Techstep", "Drum & Bass", "Breakbeat", "Liquid Funk", "Neurofunk",
-    "Hardstep", "Darkstep", "Ragga Jungle", "Jump Up", "Minimal DnB", "Ambient DnB"
-]
-
-STYLE_VARIANTS = {
-    "Drum & Bass": [
-        "drum and bass", "dnb", "drum n bass", "d&b", "drumnbass", "drum&bass",
-        "drum 'n' bass", "d'n'b", "drumn'bass"
-    ],
-    "Jungle": [
-        "ragga jungle", "junglist", "jungle dnb", "jungle drum & bass",
-        "jungle drum and bass", "oldskool jungle"
-    ],
-    "Techstep": ["tech step", "tech-step"],
-    "Liquid Funk": ["liquid funk", "liquid dnb", "liquid"],
-    "Neurofunk": ["neuro funk", "neuro"],
-    "Breakbeat": ["break beat", "breaks"],
-    "Hardstep": ["hard step"],
-    "Darkstep": ["dark step", "dark dnb"],
-    "Jump Up": ["jumpup", "jump-up"],
-    "Minimal DnB": ["minimal drum & bass", "minimal dnb"],
-    "Ambient DnB": ["ambient drum & bass", "ambient dnb"]
-}
+# Один пул соединений на процесс: WAL и busy_timeout вместо повторных попыток при "database is locked"
+db = Database(DB_PATH, pool_size=1)
 
-def normalize_style(style):
-    style = style.lower().strip()
-    for canonical, variants in STYLE_VARIANTS.items():
-        if style == canonical.lower() or style in [v.lower() for v in variants]:
-            return canonical
-    return style.title()
+def get_db():
+    try:
+        return db.connect()
+    except Exception as e:
+        logger.error(f"Failed to connect to database {DB_PATH}: {str(e)}")
+        raise
 
-def get_db(retries=5, delay=0.1):
-    for attempt in range(retries):
-        try:
-            conn = sqlite3.connect(DB_PATH, timeout=10)
-            conn.row_factory = sqlite3.Row
-            logger.debug(f"Connected to database: {DB_PATH}")
-            return conn
-        except sqlite3.OperationalError as e:
-            if "database is locked" in str(e) and attempt < retries - 1:
-                logger.warning(f"Database locked, retrying in {delay}s (attempt {attempt + 1}/{retries})")
-                time.sleep(delay)
-            else:
-                logger.error(f"Failed to connect to database after {retries} attempts: {str(e)}")
-                raise
+def notify_player(paths=(), names=()):
+    """Сообщаем radio_player об изменённых треках, чтобы он сбросил их из кэша"""
+    if not paths and not names:
+        return
+    try:
+        body = json.dumps({'paths': list(paths), 'names': list(names)}).encode('utf-8')
+        request = urllib.request.Request(f"{PLAYER_URL}/track_cache/invalidate", data=body,
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=2) as response:
+            response.read()
+        logger.debug(f"Notified player about changed tracks: paths={list(paths)}, names={list(names)}")
+    except Exception as e:
+        # Плеер сам подхватит изменения при следующей синхронизации каталога
+        logger.warning(f"Could not notify player about changed tracks: {str(e)}")
 
 def init_db():
     try:
         conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tracks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                title TEXT,
-                cover TEXT,
-                duration REAL,
-                style TEXT,
-                uploaded_by TEXT,
-                upload_date TEXT,
-                playcount INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'available',
-                artist TEXT DEFAULT 'Unknown Artist',
-                track_title TEXT DEFAULT '',
-                path TEXT,
-                track_info TEXT DEFAULT 'track',
-                path_img TEXT
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                track_id INTEGER,
-                played_at REAL,
-                FOREIGN KEY (track_id) REFERENCES tracks(id)
-            )
-        """)
-        conn.commit()
+        version = migrate(conn)
         conn.close()
-        logger.info("Database initialized successfully")
+        logger.info(f"Database initialized successfully, schema version {version}")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
 
@@ -206,15 +153,7 @@ def get_track_metadata(file_path):
                 artist = 'Unknown Artist'
             if not title or title == '':
                 title = os.path.basename(file_path).replace('.mp3', '')
-        if style:
-            style = normalize_style(style)
-        else:
-            style = "Unknown"
-        if style == "Unknown":
-            for predefined in PREDEFINED_STYLES:
-                if predefined.lower() in title.lower() or predefined.lower() in artist.lower():
-                    style = predefined
-                    break
+        style = classify_style(style, title, artist)
         logger.debug(f"Extracted metadata for {file_path}: artist={artist}, title={title}, style={style}")
         return artist, title, style
     except Exception as e:
@@ -228,11 +167,7 @@ def get_track_metadata(file_path):
         else:
             artist = "Unknown Artist"
             title = os.path.basename(file_path).replace('.mp3', '')
-        style = "Unknown"
-        for predefined in PREDEFINED_STYLES:
-            if predefined.lower() in title.lower() or predefined.lower() in artist.lower():
-                style = predefined
-                break
+        style = classify_style(None, title, artist)
         return artist, title, style
 
 def get_track_duration(file_path):
@@ -342,6 +277,7 @@ def add_track_to_db(mp3_name, audio_path):
             VALUES (?, ?, ?, ?, ?, ?, ?, 'available', 0, ?, ?, ?, ?, ?)
         """, (mp3_name, full_title, artist, title, cover, duration, style, upload_date, uploaded_by, audio_path, track_info, path_img))
         conn.commit()
+        notify_player(paths=[audio_path], names=[mp3_name])
         logger.info(
             f"Added track to db: {mp3_name} | Title: {full_title} | Artist: {artist} | Track Title: {title} | Duration: {duration}s | Cover: {cover} | Style: {style} | Uploaded by: {uploaded_by} | Upload date: {upload_date} | Path: {audio_path} | Track Info: {track_info} | Path Img: {path_img} | Cover saved: {cover_saved}")
     except Exception as e:
@@ -356,14 +292,13 @@ def sync_db_with_folder(current_files):
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM tracks WHERE status = 'available'")
         db_files = set(row['name'] for row in cursor.fetchall())
-        logger.debug(f"Files in database (status='available'): {db_files}")
-        logger.debug(f"Files on disk: {current_files}")
         missing_in_folder = db_files - current_files
-        logger.debug(f"Files missing in folder: {missing_in_folder}")
+        logger.debug("Files in database: %d, on disk: %d, missing in folder: %d", len(db_files), len(current_files), len(missing_in_folder))
         for mp3_name in missing_in_folder:
             cursor.execute("UPDATE tracks SET status = 'deleted' WHERE name = ?", (mp3_name,))
             logger.info(f"Marked as deleted in db: {mp3_name}")
         conn.commit()
+        notify_player(names=missing_in_folder)
         logger.debug("Database synchronized with folder (marked deleted tracks)")
     except Exception as e:
         logger.error(f"Error syncing database with folder: {str(e)}")
@@ -377,6 +312,7 @@ def delete_marked_files():
         cursor.execute("SELECT id, name, path FROM tracks WHERE status = 'deleted'")
         deleted_tracks = cursor.fetchall()
         logger.debug(f"Tracks to delete (status='deleted'): {[(track['name'], track['path']) for track in deleted_tracks]}")
+        removed_paths = []
         for track in deleted_tracks:
             track_id = track['id']
             name = track['name']
@@ -390,10 +326,12 @@ def delete_marked_files():
                 cursor.execute("DELETE FROM history WHERE track_id = ?", (track_id,))
                 logger.info(f"Removed {cursor.rowcount} history entries for track id {track_id}")
                 cursor.execute("DELETE FROM tracks WHERE name = ?", (name,))
+                removed_paths.append(path)
                 logger.info(f"Removed track from database: {name}")
             except Exception as e:
                 logger.error(f"Error processing track {name}: {str(e)}")
         conn.commit()
+        notify_player(paths=removed_paths)
         logger.debug("Processed tracks marked as deleted")
     except Exception as e:
         logger.error(f"Error in delete_marked_files: {str(e)}")
@@ -421,6 +359,7 @@ def manage_radio_shows():
             cursor.execute("UPDATE tracks SET status = 'deleted' WHERE name = ? AND track_info = 'radio_show'", (file_name,))
             if cursor.rowcount > 0:
                 conn.commit()
+                notify_player(names=[file_name])
                 logger.info(f"Marked {file_name} as deleted in database")
             conn.close()
         except Exception as e:
@@ -446,11 +385,10 @@ def watch_directory():
         logger.debug(f"Processing initial track: {mp3_name}")
         add_track_to_db(mp3_name, file_path)
     known_files = initial_file_names
-    logger.debug(f"Initial known files: {known_files}")
     logger.info("Starting watch directory loop")
     while True:
         try:
-            logger.debug(f"Starting new scan cycle at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.debug("Starting new scan cycle")
             current_files = set()
             for audio_dir in AUDIO_DIRS:
                 if audio_dir is None:
@@ -462,10 +400,8 @@ def watch_directory():
                 else:
                     logger.warning(f"Directory {audio_dir} does not exist")
             current_file_names = set(os.path.basename(f) for f in current_files)
-            logger.debug(f"Current files in directories: {current_file_names}")
-            logger.debug(f"Known files before update: {known_files}")
             new_files = current_file_names - known_files
-            logger.debug(f"Found {len(new_files)} new files: {new_files}")
+            logger.debug("Files in directories: %d, known: %d, new: %d", len(current_file_names), len(known_files), len(new_files))
             for mp3_name in new_files:
                 file_path = next((f for f in current_files if os.path.basename(f) == mp3_name), None)
                 if file_path:
@@ -477,14 +413,13 @@ def watch_directory():
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) as count FROM tracks WHERE status = 'deleted'")
             deleted_count = cursor.fetchone()['count']
-            logger.info(f"Found {deleted_count} tracks with status='deleted' before cleanup")
+            logger.debug("Found %d tracks with status='deleted' before cleanup", deleted_count)
             conn.close()
             logger.debug("Running delete_marked_files")
             delete_marked_files()
             logger.debug("Running manage_radio_shows")
             manage_radio_shows()
             known_files = current_file_names
-            logger.debug(f"Updated known files: {known_files}")
             time.sleep(10)
         except Exception as e:
             logger.error(f"Error in watch_directory loop: {str(e)}")
@@ -1,4 +1,5 @@
 import os
+import sys
 import subprocess
 from mutagen.id3 import ID3, TIT2, TPE1, APIC
 from mutagen.flac import FLAC
@@ -10,25 +11,17 @@ import shutil
 import json
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.logs import setup_logging
+
 # Загрузка .env
 load_dotenv()
 
 # Настройка логирования
 try:
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(os.path.join(os.getenv('LOGS_DIR'), 'upload_manager.log'), mode='a'),
-            logging.StreamHandler()
-        ]
-    )
+    setup_logging(None, os.path.join(os.getenv('LOGS_DIR'), 'upload_manager.log'), console=True)
 except Exception as e:
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[logging.StreamHandler()]
-    )
+    setup_logging(None, console=True)
     print(f"Ошибка настройки файл-лога: {str(e)}. Используем только консоль.")
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Player modules are run as scripts from their own directory; make them importable in tests
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'player'))
+sys.path.insert(0, ROOT_DIR)
@@ -0,0 +1,70 @@
+import time
+from broadcast import Broadcaster, LocalBus, UnixSocketBus
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, skip_sid=None):
+        self.emitted.append((event, data, skip_sid))
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_bursts_are_coalesced_to_the_latest_payload():
+    """Check that a burst of track_update events is emitted once with the last payload."""
+    socketio = FakeSocketIO()
+    broadcaster = Broadcaster(socketio, LocalBus(), interval=0.2)
+    for i in range(10):
+        broadcaster.publish('track_update', {'filename': f"t{i}.mp3"})
+    broadcaster.flush()
+    assert socketio.emitted == [('track_update', {'filename': 't9.mp3'}, None)]
+    assert broadcaster.stats['coalesced'] == 9
+
+
+def test_other_events_are_emitted_immediately():
+    """Check that events outside coalesce are emitted as they are published."""
+    socketio = FakeSocketIO()
+    broadcaster = Broadcaster(socketio, LocalBus())
+    broadcaster.publish('job_update', {'id': 'a'})
+    broadcaster.publish('job_update', {'id': 'b'})
+    assert [data['id'] for _, data, _ in socketio.emitted] == ['a', 'b']
+
+
+def test_clients_with_a_current_snapshot_are_skipped():
+    """Check that a client connecting after an update was queued does not get it twice."""
+    socketio = FakeSocketIO()
+    broadcaster = Broadcaster(socketio, LocalBus())
+    broadcaster.client_connected('old')
+    broadcaster.publish('track_update', {'filename': 'a.mp3'})
+    broadcaster.client_connected('new')
+    broadcaster.flush()
+    assert socketio.emitted == [('track_update', {'filename': 'a.mp3'}, ['new'])]
+    broadcaster.publish('track_update', {'filename': 'b.mp3'})
+    broadcaster.flush()
+    assert socketio.emitted[-1][2] is None
+
+
+def test_unix_socket_bus_fans_out_between_processes(tmp_path):
+    """Check that a message published on one bus reaches every bus in the directory once."""
+    directory = str(tmp_path / 'bus')
+    first, second = UnixSocketBus(directory), UnixSocketBus(directory)
+    socketios = [FakeSocketIO(), FakeSocketIO()]
+    remote = []
+    publisher = Broadcaster(socketios[0], first, interval=0.01)
+    Broadcaster(socketios[1], second, interval=0.01, on_remote=lambda event, data: remote.append(data)).start()
+    publisher.start()
+    try:
+        publisher.publish('track_update', {'filename': 'a.mp3', 'cover_path': '/images/a.png'})
+        assert wait_for(lambda: all(s.emitted for s in socketios))
+        assert socketios[1].emitted == [('track_update', {'filename': 'a.mp3', 'cover_path': '/images/a.png'}, None)]
+        assert remote == [{'filename': 'a.mp3', 'cover_path': '/images/a.png'}]  # Only the other process applies it
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,129 @@
+import json
+import random
+import subprocess
+import sys
+from catalog import TrackCatalog
+from test_cooperative import PLAYER_DIR, server_env
+
+# Every catalog load fails; the pooled connection must go back to the pool each time
+FAILING_SYNC_SCRIPT = """
+import json
+import radio_player
+def fail(rows):
+    raise RuntimeError('load failed')
+radio_player.track_catalog.load = fail
+for _ in range(5):
+    radio_player.sync_track_catalog()
+print(json.dumps(radio_player.db.stats))
+"""
+
+# track_watcher notifications are applied to the loaded catalog without reloading it
+NOTIFY_SCRIPT = """
+import json
+import radio_player
+radio_player.sync_track_catalog()
+loaded_at = radio_player.track_catalog.loaded_at
+conn = radio_player.get_db()
+conn.execute("INSERT INTO tracks (name, path, upload_date) VALUES ('new.mp3', '/audio/new.mp3', '2025-01-01')")
+conn.execute("UPDATE tracks SET status = 'deleted' WHERE name = 'track1.mp3'")
+conn.execute("DELETE FROM tracks WHERE name = 'track2.mp3'")
+conn.commit()
+conn.close()
+client = radio_player.app.test_client()
+client.post('/track_cache/invalidate', json={'paths': ['/audio/new.mp3', '/audio/track2.mp3'], 'names': ['track1.mp3']})
+catalog = radio_player.track_catalog
+print(json.dumps({'reloaded': catalog.loaded_at != loaded_at, 'count': len(catalog),
+                  'paths': ['/audio/new.mp3' in catalog, '/audio/track1.mp3' in catalog, '/audio/track2.mp3' in catalog]}))
+client.post('/track_cache/invalidate', json={'names': ['gone.mp3']})
+print(json.dumps({'reloaded': catalog.needs_load()}))
+"""
+
+# Changing one track's type drops only that track from the cache and the catalog
+TRACK_INFO_SCRIPT = """
+import json
+import radio_player
+radio_player.sync_track_catalog()
+for i in range(3):
+    radio_player.track_cache.get_by_path(f'/audio/track{i}.mp3')
+client = radio_player.app.test_client()
+status = [client.post('/update_track_info', json={'track_id': track_id, 'track_info': 'jingle'}).status_code
+          for track_id in ('2', 'x')]
+print(json.dumps({'status': status, 'cached': len(radio_player.track_cache),
+                  'catalog': len(radio_player.track_catalog), 'in_catalog': '/audio/track1.mp3' in radio_player.track_catalog}))
+"""
+
+
+def make_catalog(count=1000, seed=1):
+    catalog = TrackCatalog(rng=random.Random(seed))
+    catalog.load([
+        {'id': i, 'path': f'/t{i}.mp3', 'playcount': i % 5, 'upload_date': f'2024-01-01 00:{i % 60:02d}:00'}
+        for i in range(1, count + 1)
+    ])
+    return catalog
+
+
+def test_sample_respects_exclusions():
+    """Check that excluded tracks are never picked, even when they fill the lowest bucket."""
+    catalog = TrackCatalog(rng=random.Random(1))
+    catalog.load([
+        {'id': 1, 'path': '/a.mp3', 'playcount': 0, 'upload_date': '2024-01-01'},
+        {'id': 2, 'path': '/b.mp3', 'playcount': 0, 'upload_date': '2024-01-02'},
+        {'id': 3, 'path': '/c.mp3', 'playcount': 9, 'upload_date': '2024-01-03'},
+    ])
+    for _ in range(50):
+        assert catalog.sample({'/a.mp3', '/b.mp3'})['path'] == '/c.mp3'
+    assert catalog.sample({'/a.mp3', '/b.mp3', '/c.mp3'}) is None
+
+
+def test_sample_favors_low_playcount():
+    """Check that the least played bucket is chosen most often."""
+    catalog = make_catalog()
+    picks = [catalog.sample(set())['playcount'] for _ in range(2000)]
+    assert picks.count(0) > picks.count(1) > picks.count(4)
+
+
+def test_incremental_updates():
+    """Check that plays, additions and removals are reflected without a reload."""
+    catalog = make_catalog(count=10)
+    catalog.played('/t5.mp3')
+    assert catalog.get('/t5.mp3')['playcount'] == 1
+    catalog.add('/new.mp3', 11, 0, '2025-01-01 00:00:00')
+    assert catalog.max_id == 11
+    assert catalog.remove('/t1.mp3')
+    assert '/t1.mp3' not in catalog
+    assert len(catalog) == 10
+
+
+def test_sample_skips_excluded_lowest_bucket_across_large_gap():
+    """Check that excluding the only new track does not underflow the weights of heavily played buckets."""
+    catalog = TrackCatalog(rng=random.Random(1))
+    catalog.load([{'id': 1, 'path': '/new.mp3', 'playcount': 0, 'upload_date': '2025-01-01'}] + [
+        {'id': i, 'path': f'/t{i}.mp3', 'playcount': 1200, 'upload_date': '2024-01-01'} for i in range(2, 50)
+    ])
+    for _ in range(20):
+        track = catalog.sample({'/new.mp3'})
+        assert track is not None and track['playcount'] == 1200
+
+
+def test_failed_sync_returns_its_connection(tmp_path):
+    """Check that a catalog sync failing mid-load does not leak a pooled database connection."""
+    output = subprocess.run([sys.executable, '-c', FAILING_SYNC_SCRIPT], cwd=PLAYER_DIR,
+                            env=server_env(tmp_path, COOPERATIVE_MODE='0'), capture_output=True, text=True, timeout=60).stdout
+    stats = json.loads(output.strip().splitlines()[-1])
+    assert stats == {'opened': 1, 'reused': 4}
+
+
+def test_notifications_update_the_catalog_in_place(tmp_path):
+    """Check that added and deleted tracks reach the catalog without a reload, and an unknown name still forces one."""
+    output = subprocess.run([sys.executable, '-c', NOTIFY_SCRIPT], cwd=PLAYER_DIR,
+                            env=server_env(tmp_path, COOPERATIVE_MODE='0'), capture_output=True, text=True, timeout=60).stdout
+    applied, unknown = [json.loads(line) for line in output.strip().splitlines()[-2:]]
+    assert applied == {'reloaded': False, 'count': 9, 'paths': [True, False, False]}
+    assert unknown == {'reloaded': True}
+
+
+def test_track_info_change_drops_only_that_track(tmp_path):
+    """Check that a track info edit keeps other cached tracks and removes the edited one from the catalog."""
+    output = subprocess.run([sys.executable, '-c', TRACK_INFO_SCRIPT], cwd=PLAYER_DIR,
+                            env=server_env(tmp_path, COOPERATIVE_MODE='0'), capture_output=True, text=True, timeout=60).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == {'status': [200, 400], 'cached': 2, 'catalog': 9, 'in_catalog': False}
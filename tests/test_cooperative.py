@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAYER_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'player')
+
+# Runs radio_player the way its __main__ block does: patched first unless COOPERATIVE_MODE=0, then served by gevent's WSGIServer
+SERVER_SCRIPT = """
+import cooperative
+if cooperative.enabled():
+    cooperative.patch()
+import os
+import sys
+sys.path.insert(0, {tests_dir!r})
+from test_liquidsoap_client import FakeLiquidsoap
+liquidsoap_server = FakeLiquidsoap(delay=float(os.environ.get('FAKE_LIQUIDSOAP_DELAY', 0)))
+os.environ['TELNET_PORT'] = str(liquidsoap_server.port)
+import radio_player
+from gevent.pywsgi import WSGIServer
+from geventwebsocket.handler import WebSocketHandler
+server = WSGIServer(('127.0.0.1', 0), radio_player.create_app(), handler_class=WebSocketHandler, log=None)
+server.start()
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tracks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, title TEXT, cover TEXT, duration REAL, style TEXT, uploaded_by TEXT, upload_date TEXT, playcount INTEGER DEFAULT 0, status TEXT DEFAULT 'available', artist TEXT DEFAULT 'Unknown Artist', track_title TEXT DEFAULT '', path TEXT, track_info TEXT DEFAULT 'track', path_img TEXT)")
+    conn.execute("CREATE TABLE schedule (id INTEGER PRIMARY KEY AUTOINCREMENT, track_path TEXT, start_time TEXT, enabled INTEGER DEFAULT 1, queued INTEGER DEFAULT 0)")
+    for i in range(10):
+        conn.execute("INSERT INTO tracks (name, path, upload_date) VALUES (?, ?, ?)", (f"track{i}.mp3", f"/audio/track{i}.mp3", f"2024-01-{i + 1:02d}"))
+    conn.commit()
+    conn.close()
+
+
+def server_env(tmp_path, **overrides):
+    make_db(str(tmp_path / 'radio.db'))
+    (tmp_path / 'logs').mkdir()
+    return dict(os.environ,
+                DB_PATH=str(tmp_path / 'radio.db'),
+                LOGS_DIR=str(tmp_path / 'logs'),
+                CURRENT_TRACK_FILE=str(tmp_path / 'current_track.json'),
+                LAST_PLAYED_TRACK_FILE=str(tmp_path / 'last_played.txt'),
+                PLAYBACK_HISTORY_FILE=str(tmp_path / 'history.txt'),
+                IMAGES_DIR=str(tmp_path / 'images'),
+                **overrides)
+
+
+def start_server(env):
+    """Start SERVER_SCRIPT; returns (process, base url)"""
+    process = subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT.format(tests_dir=TESTS_DIR)],
+                               cwd=PLAYER_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    port = int(process.stdout.readline())
+    return process, f"http://127.0.0.1:{port}"
+
+
+def timed_get(url):
+    start_time = time.monotonic()
+    with urllib.request.urlopen(url, timeout=10) as response:
+        body = response.read()
+    return time.monotonic() - start_time, body
+
+
+def track_latency_during_telnet(tmp_path, cooperative_mode):
+    """Slowest GET /track while POST /skip_track waits on a 1s Liquidsoap round trip inside the request"""
+    process, base_url = start_server(server_env(tmp_path, COOPERATIVE_MODE=cooperative_mode, FAKE_LIQUIDSOAP_DELAY='1'))
+    try:
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:  # Warm-up probes Liquidsoap too; measure once it is done
+            try:
+                timed_get(f"{base_url}/ready")
+                break
+            except urllib.error.HTTPError:
+                time.sleep(0.1)
+        request = urllib.request.Request(f"{base_url}/skip_track", data=b'', method='POST')
+        skipped = []
+        slow = threading.Thread(target=lambda: skipped.append(json.loads(urllib.request.urlopen(request, timeout=10).read())))
+        slow.start()
+        time.sleep(0.2)  # Let it reach the telnet read
+        during = []
+        while slow.is_alive():
+            during.append(timed_get(f"{base_url}/track")[0])
+        slow.join()
+        assert skipped and skipped[0]['success'], "Skip did not complete"
+        return max(during)
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_track_answers_during_telnet_round_trip_when_patched(tmp_path):
+    """Check that a request blocked on Liquidsoap yields the hub, so /track keeps answering."""
+    slowest = track_latency_during_telnet(tmp_path, '1')
+    assert slowest < 0.25, f"/track stalled behind the telnet round trip: {slowest:.3f}s"
+
+
+def test_track_waits_for_telnet_round_trip_when_unpatched(tmp_path):
+    """Check that with COOPERATIVE_MODE=0 the same round trip holds the hub, so patching is what keeps /track fast."""
+    slowest = track_latency_during_telnet(tmp_path, '0')
+    assert slowest > 0.5, f"/track was not serialized behind the telnet round trip: {slowest:.3f}s"
@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+from common.db import Database
+
+
+def make_db(tmp_path, **kwargs):
+    db = Database(str(tmp_path / 'radio.db'), **kwargs)
+    conn = db.connect()
+    conn.cursor().execute("CREATE TABLE tracks (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+    return db
+
+
+def test_connections_use_wal_and_pragmas(tmp_path):
+    """Check that connections come configured with WAL, synchronous=NORMAL, busy timeout and mmap."""
+    db = make_db(tmp_path, busy_timeout=2.5, mmap_size=1024 * 1024)
+    conn = db.connect()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 2500
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1024 * 1024
+        assert isinstance(conn.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+    finally:
+        conn.close()
+
+
+def test_connections_are_reused(tmp_path):
+    """Check that close() returns the connection to the pool and the next connect() reuses it."""
+    db = make_db(tmp_path, pool_size=2)
+    opened = db.stats['opened']
+    for _ in range(20):
+        conn = db.connect()
+        conn.execute("SELECT COUNT(*) FROM tracks").fetchone()
+        conn.close()
+    assert db.stats['opened'] == opened
+    conn = db.connect()
+    conn.close()
+    conn.close()  # Double close is harmless
+    assert db._idle.qsize() == 1
+
+
+def test_uncommitted_work_is_rolled_back_on_close(tmp_path):
+    """Check that a pooled connection does not carry an open transaction to its next user."""
+    db = make_db(tmp_path, pool_size=1)
+    conn = db.connect()
+    conn.cursor().execute("INSERT INTO tracks (name) VALUES ('a.mp3')")
+    conn.close()
+    conn = db.connect()
+    try:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_readers_proceed_while_another_connection_writes(tmp_path):
+    """Check that a reader in another thread is not blocked by an open write transaction."""
+    db = make_db(tmp_path)
+    writer = Database(db.path)  # Stands in for the track watcher process
+    conn = writer.connect()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("INSERT INTO tracks (name) VALUES ('new.mp3')")
+    counts = []
+
+    def read():
+        reader = db.connect()
+        counts.append(reader.execute("SELECT COUNT(*) FROM tracks").fetchone()[0])
+        reader.close()
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join(timeout=2)
+    try:
+        assert counts == [0]
+    finally:
+        conn.commit()
+        conn.close()
@@ -0,0 +1,57 @@
+import threading
+import history as history_module
+from history import PlaybackHistory
+
+
+def test_eviction_and_reorder(tmp_path):
+    """Check that replays move a track to the end and the oldest track is evicted."""
+    history = PlaybackHistory(str(tmp_path / 'history.txt'), max_size=3)
+    history.load()
+    for track in ['/a.mp3', '/b.mp3', '/c.mp3', '/a.mp3', '/d.mp3']:
+        history.add(track)
+    assert history.recent() == ['/c.mp3', '/a.mp3', '/d.mp3']
+    assert '/b.mp3' not in history
+    assert history.recent(2) == ['/a.mp3', '/d.mp3']
+
+
+def test_journal_replay_and_compaction(tmp_path):
+    """Check that the journal rebuilds the same history and is compacted to the classic format."""
+    path = tmp_path / 'history.txt'
+    history = PlaybackHistory(str(path), max_size=2, compact_factor=2)
+    history.load()
+    for track in ['/a.mp3', '/b.mp3', '/c.mp3', '/b.mp3']:
+        history.add(track)
+    assert path.read_text().splitlines() == ['/a.mp3', '/b.mp3', '/c.mp3', '/b.mp3']
+    history.add('/d.mp3')
+    assert path.read_text().splitlines() == ['/b.mp3', '/d.mp3'], "Journal was not compacted"
+
+    restored = PlaybackHistory(str(path), max_size=2)
+    restored.load()
+    assert restored.recent() == history.recent()
+
+
+def test_lookups_do_not_wait_for_journal_writes(tmp_path, monkeypatch):
+    """Check that adds and lookups proceed while a journal write is stuck on the disk."""
+    history = PlaybackHistory(str(tmp_path / 'history.txt'), max_size=3)
+    history.load()
+    writing, release = threading.Event(), threading.Event()
+
+    def slow_append(path, lines):
+        writing.set()
+        release.wait(5)
+        history_module.append_lines(path, lines)
+
+    monkeypatch.setattr(history_module, 'run_blocking', lambda fn, *args: (slow_append if fn is history_module.append_lines else fn)(*args))
+    writer = threading.Thread(target=history.add, args=('/a.mp3',))
+    writer.start()
+    try:
+        assert writing.wait(2)
+        done = threading.Event()
+        threading.Thread(target=lambda: (history.add('/b.mp3', persist=False), history.recent(), done.set())).start()
+        assert done.wait(1), "History lookups blocked behind a journal write"
+        assert history.recent() == ['/a.mp3', '/b.mp3']
+    finally:
+        release.set()
+        writer.join()
+    history.persist(['/b.mp3'])
+    assert (tmp_path / 'history.txt').read_text().splitlines() == ['/a.mp3', '/b.mp3']
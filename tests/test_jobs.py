@@ -0,0 +1,73 @@
+import threading
+import time
+from jobs import JobManager
+
+
+def wait_for(manager, job_id, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_submit_returns_immediately_and_records_result():
+    """Check that submit does not wait for the job and the result is available afterwards."""
+    updates = []
+    release = threading.Event()
+    manager = JobManager(on_update=lambda job: updates.append(job['status']))
+    try:
+        start_time = time.monotonic()
+        job, created = manager.submit('smart_skip', lambda: release.wait(2) and {'message': 'done'})
+        assert created
+        assert time.monotonic() - start_time < 0.5
+        release.set()
+        job = wait_for(manager, job['id'])
+        assert job['status'] == 'succeeded'
+        assert job['result'] == {'message': 'done'}
+        assert updates == ['queued', 'running', 'succeeded']
+    finally:
+        manager.shutdown()
+
+
+def test_concurrent_submits_are_deduplicated():
+    """Check that a second submit with the same key joins the active job instead of running twice."""
+    runs = []
+    release = threading.Event()
+
+    def skip():
+        runs.append(1)
+        release.wait(2)
+
+    manager = JobManager(max_workers=4)
+    try:
+        first, created_first = manager.submit('smart_skip', skip)
+        second, created_second = manager.submit('smart_skip', skip)
+        assert created_first and not created_second
+        assert second['id'] == first['id']
+        release.set()
+        wait_for(manager, first['id'])
+        assert runs == [1]
+        third, created_third = manager.submit('smart_skip', skip)
+        assert created_third and third['id'] != first['id']
+        wait_for(manager, third['id'])
+    finally:
+        manager.shutdown()
+
+
+def test_failed_job_records_error():
+    """Check that an exception marks the job failed and frees its key."""
+    def fail():
+        raise RuntimeError("Liquidsoap circuit breaker is open")
+
+    manager = JobManager()
+    try:
+        job, _ = manager.submit('play_radio_show', fail)
+        job = wait_for(manager, job['id'])
+        assert job['status'] == 'failed'
+        assert job['error'] == "Liquidsoap circuit breaker is open"
+        assert manager.active() == []
+    finally:
+        manager.shutdown()
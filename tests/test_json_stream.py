@@ -0,0 +1,28 @@
+import gzip
+import json
+import pytest
+from json_stream import encode_cursor, decode_cursor, json_array_chunks, gzip_chunks
+
+
+def test_cursor_round_trip():
+    """Check that cursors decode to the values they were built from and reject garbage."""
+    for values in (['2024-01-01 00:00:00', 42], [None, 7]):
+        assert decode_cursor(encode_cursor(values)) == values
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+
+
+@pytest.mark.parametrize('count', [0, 1, 5, 6, 13])
+def test_json_array_chunks_match_json_dumps(count):
+    """Check that the streamed encoding is one valid array whatever the batch boundaries."""
+    items = [{'id': i, 'name': f"t{i}.mp3"} for i in range(count)]
+    chunks = list(json_array_chunks(iter(items), batch_size=5))
+    assert json.loads(b''.join(chunks)) == items
+    assert len(chunks) == 2 + (count + 4) // 5
+
+
+def test_gzip_chunks_decompress_to_input():
+    """Check that the streamed gzip output is a single valid gzip member."""
+    items = [{'id': i} for i in range(1000)]
+    body = b''.join(gzip_chunks(json_array_chunks(iter(items))))
+    assert json.loads(gzip.decompress(body)) == items
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+import time
+from common.db import Database
+from common.migrations import migrate
+from leader import LeaderElection, holder_alive
+
+
+def make_db(tmp_path):
+    db = Database(str(tmp_path / 'radio.db'))
+    conn = db.connect()
+    migrate(conn)
+    conn.close()
+    return db
+
+
+def make_election(db, events, ttl=15.0):
+    return LeaderElection(db, 'player', ttl=ttl, renew_interval=0.05,
+                          on_elected=lambda: events.append('elected'), on_demoted=lambda: events.append('demoted'))
+
+
+def test_only_one_process_leads(tmp_path):
+    """Check that the second candidate follows while the first one renews its lease."""
+    db = make_db(tmp_path)
+    first_events, second_events = [], []
+    first, second = make_election(db, first_events), make_election(db, second_events)
+    assert first.elect() and not second.elect()
+    assert first.elect() and not second.elect()
+    assert first_events == ['elected'] and second_events == []
+    assert second.snapshot()['leader'] == first.holder
+
+
+def test_expired_lease_fails_over(tmp_path):
+    """Check that a follower takes over a lease its holder stopped renewing, and the old leader steps down."""
+    db = make_db(tmp_path)
+    first_events, second_events = [], []
+    first, second = make_election(db, first_events, ttl=0.1), make_election(db, second_events, ttl=0.1)
+    assert first.elect()
+    time.sleep(0.15)
+    assert second.elect()
+    assert not first.elect()
+    assert first_events == ['elected', 'demoted'] and second_events == ['elected']
+
+
+def test_stop_releases_the_lease(tmp_path):
+    """Check that a leader stopping cleanly hands over without waiting for the lease to expire."""
+    db = make_db(tmp_path)
+    first_events = []
+    first, second = make_election(db, first_events), make_election(db, [])
+    first.start()
+    assert first.is_leader
+    first.stop()
+    assert first_events == ['elected', 'demoted']
+    assert second.elect()
+
+
+def test_lease_of_a_dead_process_is_taken_at_once(tmp_path):
+    """Check that a lease held by a process on this host that has exited is not waited out."""
+    db = make_db(tmp_path)
+    process = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+    dead = LeaderElection(db, 'player', ttl=60)
+    dead.holder = f"{dead.holder.split(':')[0]}:{process.stdout.strip()}:dead"
+    assert not holder_alive(dead.holder)
+    assert dead.elect()
+    assert make_election(db, []).elect()
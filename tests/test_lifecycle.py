@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+from test_cooperative import PLAYER_DIR, TESTS_DIR, make_db
+
+# Imports radio_player without starting it, then starts it against a fake Liquidsoap and polls /ready
+LIFECYCLE_SCRIPT = """
+import json, os, sys, threading, time
+sys.path.insert(0, {tests_dir!r})
+from test_liquidsoap_client import FakeLiquidsoap
+liquidsoap_server = FakeLiquidsoap(responses={{'get_normal_queue_length': '3'}})
+os.environ['TELNET_PORT'] = str(liquidsoap_server.port)
+threads_before = {{thread.name for thread in threading.enumerate()}}
+import radio_player
+result = {{
+    'import_threads': sorted({{thread.name for thread in threading.enumerate()}} - threads_before),
+    'import_files': sorted(os.listdir(os.environ['LOGS_DIR'])),
+    'import_db_connections': radio_player.db.stats['opened']
+}}
+client = radio_player.app.test_client()
+result['before_start'] = client.get('/ready').status_code
+client = radio_player.create_app().test_client()
+deadline = time.time() + 10
+while client.get('/ready').status_code != 200 and time.time() < deadline:
+    time.sleep(0.05)
+result['ready'] = client.get('/ready').get_json()
+breaker = radio_player.liquidsoap.breaker
+for _ in range(breaker.failure_threshold):
+    breaker.record_failure()
+result['breaker_open'] = client.get('/ready').get_json()
+breaker.record_success()
+result['breaker_closed'] = client.get('/ready').status_code
+radio_player.stop()
+result['after_stop'] = client.get('/ready').status_code
+print(json.dumps(result))
+"""
+
+
+def test_import_is_side_effect_free_and_ready_reports_warm_up(tmp_path):
+    """Check that importing starts nothing, /ready turns 200 only after start() warmed every dependency, and follows the Liquidsoap breaker."""
+    make_db(str(tmp_path / 'radio.db'))
+    (tmp_path / 'logs').mkdir()
+    env = dict(os.environ,
+               COOPERATIVE_MODE='0',
+               DB_PATH=str(tmp_path / 'radio.db'),
+               LOGS_DIR=str(tmp_path / 'logs'),
+               CURRENT_TRACK_FILE=str(tmp_path / 'current_track.json'),
+               LAST_PLAYED_TRACK_FILE=str(tmp_path / 'last_played.txt'),
+               PLAYBACK_HISTORY_FILE=str(tmp_path / 'history.txt'),
+               IMAGES_DIR=str(tmp_path / 'images'))
+    output = subprocess.run([sys.executable, '-c', LIFECYCLE_SCRIPT.format(tests_dir=TESTS_DIR)],
+                            cwd=PLAYER_DIR, env=env, capture_output=True, text=True, timeout=60).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result['import_threads'] == []
+    assert result['import_files'] == []
+    assert result['import_db_connections'] == 0
+    assert result['before_start'] == 503
+    assert result['ready']['ready'] is True
+    assert all(result['ready']['checks'].values())
+    assert result['breaker_open']['ready'] is False
+    assert result['breaker_open']['checks']['liquidsoap'] is False
+    assert result['breaker_closed'] == 200
+    assert result['after_stop'] == 503
@@ -0,0 +1,183 @@
+import socket
+import threading
+import time
+import pytest
+from liquidsoap_client import LiquidsoapClient, LiquidsoapError, LiquidsoapUnavailable, CircuitBreaker
+
+
+class FakeLiquidsoap:
+    """Minimal Liquidsoap-style telnet server answering every command with END framing."""
+
+    def __init__(self, responses=None, delay=0, close_after_reply=False, hang_up_on=(), port=0):
+        self.responses = responses or {}
+        self.delay = delay
+        self.close_after_reply = close_after_reply
+        self.hang_up_on = hang_up_on  # Commands answered by closing the connection without a reply
+        self.connections = 0
+        self.received = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', port))
+        self.sock.listen(5)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn, conn.makefile('rb') as reader:
+            for line in reader:
+                command = line.decode().strip()
+                if command == 'quit':
+                    return
+                self.received.append(command)
+                if command in self.hang_up_on:
+                    return
+                time.sleep(self.delay)
+                conn.sendall((self.responses.get(command, 'OK') + "\r\nEND\r\n").encode())
+                if self.close_after_reply:
+                    return
+
+    def close(self):
+        self.sock.close()
+
+
+def test_reuses_connection_and_reads_multiline():
+    """Check that commands share one connection and multi-line responses are read up to END."""
+    server = FakeLiquidsoap({'get_special_queue_contents': 'a.mp3\r\nb.mp3'})
+    client = LiquidsoapClient('127.0.0.1', server.port, pool_size=1)
+    try:
+        assert client.command('get_special_queue_contents') == 'a.mp3\nb.mp3'
+        assert client.command('get_status') == 'OK'
+        assert server.connections == 1, "Connection was not reused"
+        stats = client.get_stats()
+        assert stats['get_status']['count'] == 1
+        assert stats['get_status']['last_time'] > 0
+    finally:
+        client.close()
+        server.close()
+
+
+def test_command_deadline():
+    """Check that a stuck Liquidsoap response raises instead of hanging."""
+    server = FakeLiquidsoap(delay=2)
+    client = LiquidsoapClient('127.0.0.1', server.port, command_timeout=0.3)
+    try:
+        start = time.monotonic()
+        with pytest.raises(LiquidsoapError):
+            client.command('get_status')
+        assert time.monotonic() - start < 1.5, "Command deadline was not applied"
+        assert client.get_stats()['get_status']['errors'] == 1
+    finally:
+        client.close()
+        server.close()
+
+
+def test_reconnects_after_server_close():
+    """Check that a pooled connection closed by Liquidsoap is replaced transparently."""
+    server = FakeLiquidsoap(close_after_reply=True)
+    client = LiquidsoapClient('127.0.0.1', server.port)
+    try:
+        assert client.command('get_status') == 'OK'
+        time.sleep(0.1)
+        assert client.command('get_status') == 'OK'
+        time.sleep(0.1)
+        assert client.command('skip_track') == 'OK'
+        assert server.connections == 3
+        assert server.received.count('skip_track') == 1
+    finally:
+        client.close()
+        server.close()
+
+
+def test_lost_reply_is_retried_only_for_read_only_commands():
+    """Check that a command written before the connection dropped is resent only if it is a get_* command."""
+    server = FakeLiquidsoap(hang_up_on={'skip_track', 'get_queue'})
+    client = LiquidsoapClient('127.0.0.1', server.port, pool_size=1)
+    try:
+        assert client.command('get_status') == 'OK'
+        with pytest.raises(LiquidsoapError):
+            client.command('skip_track')
+        assert server.received.count('skip_track') == 1
+        assert client.command('get_status') == 'OK'
+        with pytest.raises(LiquidsoapError):
+            client.command('get_queue')
+        assert server.received.count('get_queue') == 2
+    finally:
+        client.close()
+        server.close()
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_connection_refused():
+    """Check that an unreachable Liquidsoap raises LiquidsoapUnavailable."""
+    client = LiquidsoapClient('127.0.0.1', free_port())
+    with pytest.raises(LiquidsoapUnavailable):
+        client.command('get_status')
+
+
+def test_breaker_fails_fast_and_replays_once():
+    """Check that the breaker opens, fails fast, and replays deferred commands once on recovery."""
+    port = free_port()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    client = LiquidsoapClient('127.0.0.1', port, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(LiquidsoapUnavailable):
+            client.command('get_normal_queue_length')
+    assert breaker.state == CircuitBreaker.OPEN
+    start = time.monotonic()
+    with pytest.raises(LiquidsoapUnavailable):
+        client.command('get_normal_queue_length')
+    assert time.monotonic() - start < 0.05, "Open breaker did not fail fast"
+    assert client.command_or_defer('set_next_track /a.mp3') is None
+    assert client.command_or_defer('set_next_track /b.mp3') is None
+    assert client.pending_commands() == ['set_next_track /b.mp3']
+
+    server = FakeLiquidsoap(port=port)
+    try:
+        time.sleep(0.3)
+        assert client.command('get_normal_queue_length') == 'OK'
+        assert breaker.state == CircuitBreaker.CLOSED
+        for _ in range(20):
+            if 'set_next_track /b.mp3' in server.received:
+                break
+            time.sleep(0.05)
+        assert server.received.count('set_next_track /b.mp3') == 1
+        assert 'set_next_track /a.mp3' not in server.received
+        assert client.pending_commands() == []
+    finally:
+        client.close()
+        server.close()
+
+
+def test_failed_command_keeps_deferred_command():
+    """Check that a deferred command is only superseded by a same-name command that was delivered."""
+    port = free_port()
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.2)
+    client = LiquidsoapClient('127.0.0.1', port, breaker=breaker)
+    client.defer('set_next_track /a.mp3')
+    with pytest.raises(LiquidsoapUnavailable):
+        client.command('set_next_track /b.mp3')
+    assert client.pending_commands() == ['set_next_track /a.mp3']
+
+    server = FakeLiquidsoap(port=port)
+    try:
+        assert client.command('set_next_track /c.mp3') == 'OK'
+        assert client.pending_commands() == []
+    finally:
+        client.close()
+        server.close()
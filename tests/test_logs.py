@@ -0,0 +1,51 @@
+import json
+import logging
+from common.logs import setup_logging, get_writer, RepeatFilter
+
+
+def test_records_are_written_by_the_writer_thread(tmp_path):
+    """Check that records reach the file after a flush and mutable arguments keep their value at call time."""
+    path = tmp_path / 'player.log'
+    logger = setup_logging('test_logs.text', str(path), json_format=False)
+    queued = ['/a.mp3']
+    logger.info("Queue: %s, length %d", queued, len(queued))
+    queued.append('/b.mp3')
+    logger.debug("Not written at INFO")
+    assert get_writer().flush()
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("INFO - Queue: ['/a.mp3'], length 1")
+
+
+def test_json_lines_include_extra_fields_and_exceptions(tmp_path):
+    """Check that JSON mode writes one object per record with extra= fields and the traceback."""
+    path = tmp_path / 'player.json.log'
+    logger = setup_logging('test_logs.json', str(path), json_format=True)
+    logger.warning("Slow command %s", 'skip', extra={'elapsed_ms': 812.5})
+    try:
+        raise RuntimeError("telnet closed")
+    except RuntimeError:
+        logger.exception("Command failed")
+    assert get_writer().flush()
+    first, second = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (first['level'], first['logger'], first['message'], first['elapsed_ms']) == ('WARNING', 'test_logs.json', 'Slow command skip', 812.5)
+    assert 'RuntimeError: telnet closed' in second['exception']
+
+
+def test_repeated_messages_are_collapsed():
+    """Check that identical messages inside the window are dropped and the next one reports the count."""
+    repeat_filter = RepeatFilter(window=10)
+
+    def record(message, created):
+        entry = logging.LogRecord('radio_player', logging.ERROR, __file__, 1, message, None, None)
+        entry.created = created
+        return entry
+
+    assert repeat_filter.filter(record("Liquidsoap unavailable", 100))
+    assert not repeat_filter.filter(record("Liquidsoap unavailable", 101))
+    assert not repeat_filter.filter(record("Liquidsoap unavailable", 105))
+    assert repeat_filter.filter(record("Track started", 105))
+    late = record("Liquidsoap unavailable", 112)
+    assert repeat_filter.filter(late)
+    assert late.getMessage() == "Liquidsoap unavailable (repeated 2 more times in 12s)"
+    assert repeat_filter.suppressed == 2
@@ -0,0 +1,83 @@
+import threading
+from common.db import Database
+from metrics import Registry
+
+
+def test_counters_and_histograms_render_in_exposition_format():
+    """Check the text format of labelled counters, cumulative histogram buckets and label escaping."""
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ('route',))
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    requests.labels('/track').inc()
+    requests.labels('/track').inc(2)
+    requests.labels('a"b').inc()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+    lines = registry.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{route="/track"} 3' in lines
+    assert 'requests_total{route="a\\"b"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum 5.55' in lines
+    assert 'latency_seconds_count 3' in lines
+
+
+def test_callbacks_are_read_at_scrape_time():
+    """Check that callback metrics reflect current state and a failing callback does not break the scrape."""
+    registry = Registry()
+    state = {'normal': 2, 'special': None}
+    registry.callback('queue_length', 'Queue length', lambda: {(name,): length for name, length in state.items()}, ('queue',))
+    registry.callback('broken', 'Broken', lambda: 1 / 0)
+    state['normal'] = 5
+    text = registry.render()
+    assert 'queue_length{queue="normal"} 5' in text
+    assert 'queue="special"' not in text
+    assert '# Error collecting broken' in text
+
+
+def test_concurrent_updates_are_not_lost():
+    """Check that increments from many threads all land while another thread scrapes."""
+    registry = Registry()
+    counter = registry.counter('hits_total', 'Hits', ('kind',))
+    threads = [threading.Thread(target=lambda: [counter.labels('a').inc() for _ in range(2000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        registry.render()
+    for thread in threads:
+        thread.join()
+    assert 'hits_total{kind="a"} 16000' in registry.render()
+
+
+def test_database_reports_query_time_by_call_site(tmp_path):
+    """Check that on_query receives statement and fetch timings labelled with the calling function."""
+    observed = []
+    db = Database(str(tmp_path / 'radio.db'), on_query=lambda site, operation, elapsed: observed.append((site, operation)))
+
+    def load_tracks():
+        conn = db.connect()
+        try:
+            conn.execute("CREATE TABLE tracks (id INTEGER PRIMARY KEY, name TEXT)")
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM tracks")
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    assert load_tracks() == []
+    assert observed[-3:] == [('load_tracks', 'execute'), ('load_tracks', 'execute'), ('load_tracks', 'fetch')]
+
+    def count_tracks():
+        conn = db.connect()
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM tracks")
+            return count, cursor.fetchmany(10)
+        finally:
+            conn.close()
+
+    assert count_tracks() == (0, [])
+    assert observed[-4:] == [('count_tracks', 'execute'), ('count_tracks', 'fetch'), ('count_tracks', 'execute'), ('count_tracks', 'fetch')]
@@ -0,0 +1,74 @@
+import sqlite3
+import pytest
+from common.migrations import MIGRATIONS, migrate, schema_version
+
+# Hot queries from radio_player.py and track_watcher.py with the tables they must reach through an index
+HOT_QUERIES = [
+    ("SELECT playcount FROM tracks WHERE path = ?", ('/a.mp3',)),
+    ("UPDATE tracks SET playcount = playcount + 1 WHERE path = ?", ('/a.mp3',)),
+    ("SELECT path_img FROM tracks WHERE path = ?", ('/a.mp3',)),
+    ("SELECT duration FROM tracks WHERE path = ?", ('/a.mp3',)),
+    ("SELECT artist, track_title, name FROM tracks WHERE path = ?", ('/a.mp3',)),
+    ("SELECT duration FROM tracks WHERE name = ?", ('a.mp3',)),
+    ("UPDATE tracks SET style = ? WHERE name = ?", ('Jungle', 'a.mp3')),
+    ("SELECT * FROM tracks WHERE name = ? AND status = 'available'", ('a.mp3',)),
+    ("SELECT id, path, playcount, upload_date FROM tracks WHERE status = 'available' AND track_info = 'track'", ()),
+    ("SELECT COUNT(*) AS count FROM tracks WHERE status = 'available' AND track_info = 'track'", ()),
+    ("SELECT * FROM tracks WHERE status = ? AND track_info = ? AND upload_date IS NOT NULL ORDER BY upload_date DESC, id DESC", ('available', 'radio_show')),
+    ("SELECT * FROM tracks WHERE status = ? AND upload_date IS NOT NULL ORDER BY upload_date DESC, id DESC", ('available',)),
+    ("SELECT id FROM tracks WHERE status = ? AND (upload_date, id) < (?, ?) ORDER BY upload_date DESC, id DESC LIMIT ?", ('available', '2024-01-10', 50, 20)),
+    ("SELECT id FROM tracks WHERE status = ? AND style = ? AND (upload_date, id) < (?, ?) ORDER BY upload_date DESC, id DESC LIMIT ?", ('available', 'Jungle', '2024-01-10', 50, 20)),
+    ("SELECT id FROM tracks WHERE status = ? AND track_info = ? AND upload_date IS NULL AND id < ? ORDER BY id DESC LIMIT ?", ('available', 'track', 50, 20)),
+    ("SELECT style, COUNT(*) as count FROM tracks WHERE status = 'available' GROUP BY style", ()),
+    ("DELETE FROM history WHERE track_id = ?", (1,)),
+    ("SELECT * FROM schedule WHERE enabled = 1 AND queued = 0", ()),
+    ("UPDATE schedule SET queued = 0 WHERE track_path = ? AND queued = 1", ('/a.mp3',)),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    for i in range(200):
+        conn.execute("INSERT INTO tracks (name, path, upload_date, status, track_info) VALUES (?, ?, ?, ?, ?)",
+                     (f"t{i}.mp3", f"/audio/t{i}.mp3", f"2024-01-{i % 28 + 1:02d}",
+                      'available' if i % 10 else 'deleted', 'radio_show' if i % 7 == 0 else 'track'))
+    conn.execute("ANALYZE")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrate_records_version_and_is_idempotent():
+    """Check that migrate applies every migration once and records the schema version."""
+    conn = sqlite3.connect(':memory:')
+    latest = MIGRATIONS[-1][0]
+    assert migrate(conn) == latest
+    assert migrate(conn) == latest
+    assert schema_version(conn) == latest
+    assert conn.execute("SELECT COUNT(*) FROM schema_migrations").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_migrate_upgrades_existing_database(tmp_path):
+    """Check that a database created by the old init_db gets indexes without losing rows."""
+    path = str(tmp_path / 'radio.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tracks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, path TEXT, status TEXT DEFAULT 'available', track_info TEXT DEFAULT 'track', playcount INTEGER DEFAULT 0, upload_date TEXT, style TEXT)")
+    conn.execute("INSERT INTO tracks (name, path) VALUES ('a.mp3', '/a.mp3')")
+    conn.commit()
+    migrate(conn)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'idx_tracks_path' in indexes
+    assert conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0] == 1
+    conn.close()
+
+
+@pytest.mark.parametrize('query, params', HOT_QUERIES)
+def test_hot_queries_use_an_index(conn, query, params):
+    """Check with EXPLAIN QUERY PLAN that each hot query searches an index instead of scanning or sorting."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    for detail in plan:
+        assert 'TEMP B-TREE' not in detail, f"{query} sorts in memory: {plan}"
+        if detail.startswith(('SCAN', 'SEARCH')):
+            assert 'INDEX' in detail or 'INTEGER PRIMARY KEY' in detail, f"{query} scans a table: {plan}"
@@ -0,0 +1,46 @@
+import json
+import os
+from now_playing import NowPlayingStore, dump_json
+
+
+def test_set_updates_views_and_persists(tmp_path):
+    """Check that updates are visible immediately and survive a restart via the snapshot file."""
+    path = str(tmp_path / 'current_track.json')
+    store = NowPlayingStore(path, {'filename': '', 'artist': 'VTRNK'})
+    store.add_view('artist', lambda data: dump_json([data.get('artist')]))
+    store.load()
+    store.start()
+    version = store.version
+    store.set({'filename': '/a.mp3', 'artist': 'Art'})
+    assert store.version == version + 1
+    assert store.get()['filename'] == '/a.mp3'
+    assert json.loads(store.view('artist')) == ['Art']
+    store.stop()
+    with open(path) as f:
+        assert json.load(f)['filename'] == '/a.mp3'
+    assert [name for name in os.listdir(tmp_path) if name != 'current_track.json'] == [], "Temp file left behind"
+
+    restarted = NowPlayingStore(path, {'filename': ''})
+    restarted.load()
+    assert restarted.get()['artist'] == 'Art'
+
+
+def test_corrupt_snapshot_falls_back_to_default(tmp_path):
+    """Check that a half-written snapshot does not break startup."""
+    path = tmp_path / 'current_track.json'
+    path.write_text('{"filename": "/a.m')
+    store = NowPlayingStore(str(path), {'filename': ''})
+    store.load()
+    assert store.get() == {'filename': ''}
+
+
+def test_update_changes_etag(tmp_path):
+    """Check that merging fields produces a new ETag and re-renders views."""
+    store = NowPlayingStore(str(tmp_path / 'current_track.json'), {'filename': '/a.mp3'})
+    store.add_view('full', dump_json)
+    etag, data, body = store.peek('full')
+    store.update(next_track='/b.mp3')
+    new_etag, new_data, new_body = store.peek('full')
+    assert new_etag != etag
+    assert new_data == {'filename': '/a.mp3', 'next_track': '/b.mp3'}
+    assert json.loads(new_body)['next_track'] == '/b.mp3'
@@ -0,0 +1,156 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from play_recorder import PlayRecorder
+from test_cooperative import PLAYER_DIR, make_db
+
+# Plays a show by hand against stubbed Liquidsoap commands, then reports the callbacks for its start
+SHOW_SCRIPT = """
+import json
+import radio_player
+radio_player.RADIO_SHOW_SKIP_DELAY = 0
+radio_player.liquidsoap_command = lambda command: 'OK'
+radio_player.skip_normal_queue = lambda: 'OK'
+radio_player.request_refill = lambda reason: None
+radio_player.play_radio_show_now('/audio/track1.mp3')
+print(json.dumps({
+    'track_started': radio_player.record_track_start('/audio/track1.mp3'),
+    'post_track': radio_player.record_track_start('/audio/track1.mp3'),
+    'unflushed': radio_player.play_recorder.unflushed()
+}))
+"""
+
+
+class FakeStore:
+    def __init__(self, fail=0):
+        self.batches = []
+        self.fail = fail
+
+    def persist(self, increments, plays):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("database is locked")
+        self.batches.append((increments, [path for path, _ in plays]))
+
+
+def test_same_transition_is_recorded_once():
+    """Check that /track_started and POST /track for one track start count a single play."""
+    store = FakeStore()
+    recorder = PlayRecorder(store.persist, last_played='/a.mp3')
+    assert not recorder.record('/a.mp3')  # Already counted before a restart
+    assert recorder.record('/b.mp3')
+    assert not recorder.record('/b.mp3')
+    assert recorder.record('/a.mp3')
+    assert recorder.stats['duplicates'] == 2
+    assert recorder.unflushed() == {'/b.mp3': 1, '/a.mp3': 1}
+
+
+def test_plays_are_flushed_in_one_batch():
+    """Check that buffered plays reach persist together, in order, and leave nothing unflushed."""
+    store = FakeStore()
+    recorder = PlayRecorder(store.persist)
+    for path in ['/a.mp3', '/b.mp3', '/a.mp3']:
+        recorder.record(path)
+    assert store.batches == []
+    assert recorder.flush() == 3
+    assert store.batches == [({'/a.mp3': 2, '/b.mp3': 1}, ['/a.mp3', '/b.mp3', '/a.mp3'])]
+    assert recorder.unflushed() == {}
+    assert recorder.flush() == 0
+
+
+def test_failed_flush_is_retried_without_losing_plays():
+    """Check that plays from a failed flush are written, before newer ones, by the next flush."""
+    store = FakeStore(fail=1)
+    recorder = PlayRecorder(store.persist)
+    recorder.record('/a.mp3')
+    assert recorder.flush() == 0
+    recorder.record('/b.mp3')
+    assert recorder.flush() == 2
+    assert store.batches == [({'/a.mp3': 1, '/b.mp3': 1}, ['/a.mp3', '/b.mp3'])]
+
+
+def test_background_flush_and_stop():
+    """Check that the flusher writes after the interval and stop() flushes what is left."""
+    store = FakeStore()
+    recorder = PlayRecorder(store.persist, interval=0.05)
+    recorder.start()
+    recorder.record('/a.mp3')
+    deadline = time.time() + 2
+    while not store.batches and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.batches == [({'/a.mp3': 1}, ['/a.mp3'])]
+    recorder.record('/b.mp3')
+    threading.Thread(target=recorder.stop).start()
+    deadline = time.time() + 2
+    while len(store.batches) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.batches[-1] == ({'/b.mp3': 1}, ['/b.mp3'])
+
+
+# A follower received POST /track for track2; this process gets its track_started broadcast
+REMOTE_START_SCRIPT = """
+import json
+import radio_player
+radio_player.sync_track_catalog()
+radio_player.apply_remote_broadcast('track_started', {
+    'filename': '/audio/track2.mp3', 'counted': True, 'queue': 'normal',
+    'normal_queue_length': 1, 'special_queue_length': 0
+})
+print(json.dumps({
+    'history': radio_player.playback_history.recent(),
+    'playcount': radio_player.track_catalog.get('/audio/track2.mp3')['playcount'],
+    'normal_queue_length': radio_player.queue_mirror.length('normal'),
+    'local_callback_counted': radio_player.record_track_start('/audio/track2.mp3'),
+    'unflushed': radio_player.play_recorder.unflushed()
+}))
+"""
+
+
+def player_env(tmp_path):
+    make_db(str(tmp_path / 'radio.db'))
+    (tmp_path / 'logs').mkdir()
+    return dict(os.environ,
+                COOPERATIVE_MODE='0',
+                DB_PATH=str(tmp_path / 'radio.db'),
+                LOGS_DIR=str(tmp_path / 'logs'),
+                CURRENT_TRACK_FILE=str(tmp_path / 'current_track.json'),
+                LAST_PLAYED_TRACK_FILE=str(tmp_path / 'last_played.txt'),
+                PLAYBACK_HISTORY_FILE=str(tmp_path / 'history.txt'),
+                IMAGES_DIR=str(tmp_path / 'images'))
+
+
+def run_player_script(script, tmp_path):
+    output = subprocess.run([sys.executable, '-c', script], cwd=PLAYER_DIR, env=player_env(tmp_path),
+                            capture_output=True, text=True, timeout=60).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_recorded_elsewhere_marks_the_transition():
+    """Check that a start recorded by another process is applied once and not counted again here."""
+    recorder = PlayRecorder(FakeStore().persist)
+    assert recorder.recorded_elsewhere('/a.mp3')
+    assert not recorder.recorded_elsewhere('/a.mp3')
+    assert not recorder.record('/a.mp3')
+    assert recorder.unflushed() == {}
+
+
+def test_start_received_by_another_process_reaches_history_catalog_and_mirror(tmp_path):
+    """Check that a track_started broadcast updates what the leader selects from, without writing the play twice."""
+    result = run_player_script(REMOTE_START_SCRIPT, tmp_path)
+    assert result['history'][-1] == '/audio/track2.mp3'
+    assert result['playcount'] == 1
+    assert result['normal_queue_length'] == 1
+    assert result['local_callback_counted'] is False
+    assert result['unflushed'] == {}
+
+
+def test_manually_played_show_is_counted_when_it_starts(tmp_path):
+    """Check that playing a show by hand does not make its later start look like a duplicate."""
+    result = run_player_script(SHOW_SCRIPT, tmp_path)
+    assert result['track_started'] is True
+    assert result['post_track'] is False
+    assert result['unflushed'] == {'/audio/track1.mp3': 1}
+    assert (tmp_path / 'last_played.txt').read_text() == '/audio/track1.mp3'
@@ -0,0 +1,113 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from profiler import StackSampler, MemoryTracker
+from test_cooperative import PLAYER_DIR, server_env
+
+# Status codes of admin endpoints for a request from 127.0.0.1, as nginx would send it
+ADMIN_SCRIPT = """
+import json
+import radio_player
+client = radio_player.app.test_client()
+print(json.dumps({
+    'no_header': client.get('/debug/profile').status_code,
+    'wrong_token': client.get('/debug/profile', headers={'X-Admin-Token': 'nope'}).status_code,
+    'token': client.get('/debug/profile', headers={'X-Admin-Token': 'secret'}).status_code,
+    'metrics_no_header': client.get('/metrics').status_code,
+    'metrics_bearer': client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code
+}))
+"""
+
+
+def spin_until(event):
+    while not event.is_set():
+        sum(range(100))
+
+
+def test_sampler_collects_stacks_of_other_threads():
+    """Check that a busy thread shows up by name and function in the collapsed stacks."""
+    done = threading.Event()
+    worker = threading.Thread(target=spin_until, args=(done,), name='busy-worker')
+    worker.start()
+    sampler = StackSampler()
+    try:
+        assert sampler.start(0.3, interval=0.005)
+        assert not sampler.start(0.3)
+        deadline = time.time() + 3
+        while sampler.running and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        done.set()
+        worker.join()
+    lines = sampler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith('busy-worker;') and 'spin_until (test_profiler.py' in line]
+    assert busy
+    assert sampler.snapshot()['samples'] > 10
+    assert not any('_run (profiler.py' in line for line in lines)
+
+
+def test_sampler_rejects_bad_sessions():
+    """Check that too long sessions and intervals are refused."""
+    sampler = StackSampler(max_seconds=10)
+    for seconds, interval in [(0, 0.01), (11, 0.01), (1, 0)]:
+        try:
+            sampler.start(seconds, interval)
+        except ValueError:
+            continue
+        raise AssertionError(f"{seconds}s every {interval}s was accepted")
+
+
+def test_concurrent_starts_open_one_session():
+    """Check that of several simultaneous start requests exactly one starts a session."""
+    sampler = StackSampler()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def start():
+        barrier.wait()
+        results.append(sampler.start(0.1, interval=0.01))
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    sampler.stop()
+
+
+def test_tracemalloc_diff_shows_growth():
+    """Check that a diff between two snapshots points at the line that allocated."""
+    tracker = MemoryTracker(max_snapshots=2)
+    tracker.start()
+    try:
+        base_id, _ = tracker.take_snapshot()
+        leak = [bytearray(1024) for _ in range(500)]
+        target_id, _ = tracker.take_snapshot()
+        growth = MemoryTracker.diff(tracker.get(base_id), tracker.get(target_id), limit=1)[0]
+        assert 'test_profiler.py' in growth['location']
+        assert growth['size_diff'] >= 500 * 1024
+        tracker.take_snapshot()
+        assert tracker.ids() == [target_id, target_id + 1]
+        assert len(leak) == 500
+    finally:
+        tracker.stop()
+    assert tracker.ids() == []
+
+
+def admin_status_codes(tmp_path, token):
+    tmp_path.mkdir()
+    env = server_env(tmp_path, COOPERATIVE_MODE='0', ADMIN_TOKEN=token)
+    output = subprocess.run([sys.executable, '-c', ADMIN_SCRIPT], cwd=PLAYER_DIR, env=env,
+                            capture_output=True, text=True, timeout=60).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_admin_endpoints_need_the_token_even_from_localhost(tmp_path):
+    """Check that localhost gets no anonymous access and the token works as a header or a bearer token."""
+    assert admin_status_codes(tmp_path / 'with', 'secret') == {
+        'no_header': 403, 'wrong_token': 403, 'token': 200, 'metrics_no_header': 403, 'metrics_bearer': 200
+    }
+    assert set(admin_status_codes(tmp_path / 'without', '').values()) == {403}
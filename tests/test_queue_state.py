@@ -0,0 +1,30 @@
+from queue_state import QueueMirror
+
+
+def test_callbacks_drive_queue_lengths():
+    """Check that added/started callbacks keep the mirrored queues in step with Liquidsoap."""
+    mirror = QueueMirror()
+    assert mirror.length('normal') is None
+    assert mirror.is_stale('normal', 60)
+    mirror.reconcile('normal', length=0)
+    mirror.pushed('normal', '/a.mp3')
+    mirror.added('normal', '/a.mp3')
+    assert mirror.length('normal') == 1, "Own push and its callback were counted twice"
+    mirror.added('normal', '/b.mp3')
+    assert mirror.entries('normal') == ['/a.mp3', '/b.mp3']
+    mirror.track_started('normal', '/a.mp3', normal_length=1, special_length=0)
+    assert mirror.entries('normal') == ['/b.mp3']
+    assert mirror.length('normal') == 1
+    assert not mirror.is_stale('normal', 60)
+
+
+def test_special_queue_reconcile():
+    """Check that reconciling the special queue replaces its contents."""
+    mirror = QueueMirror()
+    mirror.added('special', '/show1.mp3')
+    mirror.reconcile('special', entries=['/show2.mp3'])
+    assert not mirror.contains('special', '/show1.mp3')
+    assert mirror.contains('special', '/show2.mp3')
+    mirror.track_started('special', '/show2.mp3')
+    assert mirror.length('special') == 0
+    assert mirror.snapshot()['special']['entries'] == []
@@ -0,0 +1,60 @@
+import threading
+import time
+from refill import RefillCoordinator
+
+
+def test_triggers_are_coalesced():
+    """Check that a burst of triggers results in a single refill."""
+    calls = []
+    coordinator = RefillCoordinator(lambda: calls.append(time.monotonic()), debounce=0.1, safety_interval=60)
+    coordinator.start()
+    try:
+        for reason in ['track_started', 'skip', 'low_watermark', 'skip']:
+            coordinator.trigger(reason)
+        time.sleep(0.3)
+        assert len(calls) == 1
+        assert coordinator.stats['last_reasons'] == ['low_watermark', 'skip', 'track_started']
+        assert coordinator.stats['coalesced'] == 3
+    finally:
+        coordinator.stop()
+
+
+def test_single_refill_in_flight():
+    """Check that run_now and the background loop never refill concurrently."""
+    active = []
+    overlaps = []
+
+    def refill():
+        active.append(1)
+        if len(active) > 1:
+            overlaps.append(1)
+        time.sleep(0.05)
+        active.pop()
+
+    coordinator = RefillCoordinator(refill, debounce=0.0, safety_interval=60)
+    coordinator.start()
+    try:
+        coordinator.trigger('track_started')
+        threads = [threading.Thread(target=coordinator.run_now, args=('api',)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(0.1)
+        assert not overlaps
+        assert coordinator.stats['runs'] == 4
+    finally:
+        coordinator.stop()
+
+
+def test_safety_timer():
+    """Check that the safety timer refills when no events arrive."""
+    calls = []
+    coordinator = RefillCoordinator(lambda: calls.append(1), safety_interval=0.1)
+    coordinator.start()
+    try:
+        time.sleep(0.35)
+        assert len(calls) >= 2
+        assert coordinator.stats['last_reasons'] == ['safety_timer']
+    finally:
+        coordinator.stop()
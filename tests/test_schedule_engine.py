@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytz
+from schedule_engine import ScheduleEngine, parse_start_time
+
+MSK = pytz.timezone('Europe/Moscow')
+
+
+def start_time(offset):
+    return (datetime.now(MSK) + timedelta(seconds=offset)).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def test_parse_start_time_uses_station_offset():
+    """Check that start times are localized to +03:00 rather than the zone's LMT offset."""
+    expected = datetime(2025, 1, 1, 9, 0, tzinfo=pytz.utc).timestamp()
+    assert parse_start_time('2025-01-01T12:00', MSK) == expected
+    assert parse_start_time('2025-01-01T12:00:00', MSK) == expected
+
+
+def test_entries_run_when_due_and_do_not_block_each_other():
+    """Check that a slow entry does not delay another entry due at the same time."""
+    started = {}
+    release = threading.Event()
+
+    def run_entry(entry):
+        started[entry['id']] = time.monotonic()
+        if entry['id'] == 1:
+            release.wait(5)
+        return True
+
+    entries = [{'id': 1, 'track_path': 'a.mp3', 'start_time': start_time(0)},
+               {'id': 2, 'track_path': 'b.mp3', 'start_time': start_time(0)}]
+    engine = ScheduleEngine(lambda: entries, run_entry, MSK)
+    engine.start()
+    try:
+        deadline = time.monotonic() + 2
+        while len(started) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert set(started) == {1, 2}
+        assert 1 in engine and 2 not in engine
+    finally:
+        release.set()
+        engine.stop()
+
+
+def test_add_and_remove_wake_the_engine():
+    """Check that added entries run without waiting for a reload and removed ones never run."""
+    ran = []
+    engine = ScheduleEngine(lambda: [], lambda entry: ran.append(entry['id']) or True, MSK, reload_interval=600)
+    engine.start()
+    try:
+        engine.add({'id': 1, 'track_path': 'a.mp3', 'start_time': start_time(-1)})
+        engine.add({'id': 2, 'track_path': 'b.mp3', 'start_time': start_time(2)})
+        assert engine.remove(2)
+        time.sleep(0.3)
+        assert ran == [1]
+        assert len(engine) == 0
+    finally:
+        engine.stop()
+
+
+def test_failed_entry_is_retried_within_window():
+    """Check that an entry is retried until it succeeds and dropped once its window closes."""
+    attempts = {1: 0, 2: 0}
+
+    def run_entry(entry):
+        attempts[entry['id']] += 1
+        return entry['id'] == 1 and attempts[1] == 3
+
+    entries = [{'id': 1, 'track_path': 'a.mp3', 'start_time': start_time(0)},
+               {'id': 2, 'track_path': 'b.mp3', 'start_time': start_time(-299)}]
+    engine = ScheduleEngine(lambda: entries, run_entry, MSK, window=300, retry_delay=0.05)
+    engine.start()
+    try:
+        time.sleep(1.5)
+        assert attempts[1] == 3
+        assert 1 <= attempts[2] < 30
+        assert len(engine) == 0
+    finally:
+        engine.stop()
+
+
+def test_missed_entries_are_dropped():
+    """Check that entries past their start window are never run."""
+    ran = []
+    entries = [{'id': 1, 'track_path': 'a.mp3', 'start_time': start_time(-600)},
+               {'id': 2, 'track_path': 'b.mp3', 'start_time': 'not a time'}]
+    engine = ScheduleEngine(lambda: entries, lambda entry: ran.append(entry['id']) or True, MSK)
+    engine.start()
+    try:
+        time.sleep(0.2)
+        assert ran == []
+        assert len(engine) == 0
+    finally:
+        engine.stop()
+
+
+def test_missed_entry_is_reported_once_across_reloads():
+    """Check that a missed entry still enabled in the database is retired once and not counted again on reload."""
+    missed, ran = [], []
+    entries = [{'id': 1, 'track_path': 'a.mp3', 'start_time': start_time(-600)}]
+    engine = ScheduleEngine(lambda: entries, lambda entry: ran.append(entry['id']) or True, MSK,
+                            on_missed=lambda entry: missed.append(entry['id']))
+    engine.start()
+    try:
+        time.sleep(0.2)
+        engine.reload()
+        engine.reload()
+        time.sleep(0.2)
+        assert missed == [1]
+        assert engine.stats['missed'] == 1
+        entries[0] = dict(entries[0], start_time=start_time(-1))  # Rescheduled: the new start is run
+        engine.reload()
+        time.sleep(0.2)
+        assert ran == [1]
+    finally:
+        engine.stop()
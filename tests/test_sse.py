@@ -0,0 +1,76 @@
+import threading
+import urllib.request
+from sse import EventStream
+from test_cooperative import server_env, start_server, timed_get
+
+
+def event_ids(chunk):
+    return [line[len('id: '):] for line in chunk.decode('utf-8').splitlines() if line.startswith('id: ')]
+
+
+def test_new_listener_gets_the_latest_message_first():
+    """Check that a listener starts with the retry hint and the newest snapshot only."""
+    stream = EventStream()
+    stream.publish('track_update', {'filename': 'a.mp3'})
+    stream.publish('track_update', {'filename': 'b.mp3'})
+    listener = stream.stream()
+    assert next(listener) == b'retry: 3000\n\n'
+    chunk = next(listener)
+    assert b'event: track_update\n' in chunk and b'"filename":"b.mp3"' in chunk
+    assert b'a.mp3' not in chunk
+    assert stream.listeners == 1
+    listener.close()
+    assert stream.listeners == 0
+
+
+def test_last_event_id_resumes_after_the_missed_messages():
+    """Check that Last-Event-ID replays buffered messages and an unknown id skips to the newest."""
+    stream = EventStream(buffer_size=4)
+    stream.publish('track_update', {'filename': 'a.mp3'})
+    listener = stream.stream()
+    next(listener)
+    first_id = event_ids(next(listener))[0]
+    listener.close()
+    stream.publish('track_update', {'filename': 'b.mp3'})
+    stream.publish('track_update', {'filename': 'c.mp3'})
+    resumed = stream.stream(first_id)
+    next(resumed)
+    assert len(event_ids(next(resumed))) == 2
+    for name in 'defgh':
+        stream.publish('track_update', {'filename': f"{name}.mp3"})
+    lagging = stream.stream(first_id)  # Older than the buffer: only the newest snapshot
+    next(lagging)
+    chunk = next(lagging)
+    assert len(event_ids(chunk)) == 1 and b'h.mp3' in chunk
+    stale = stream.stream('0-1')  # Id from a previous run
+    next(stale)
+    assert b'h.mp3' in next(stale)
+
+
+def test_idle_listener_gets_heartbeats_and_wakes_on_publish():
+    """Check that an idle listener receives keepalive comments and then the next message."""
+    stream = EventStream(heartbeat=0.05)
+    stream.publish('track_update', {'filename': 'a.mp3'})
+    listener = stream.stream()
+    next(listener)
+    next(listener)
+    assert next(listener) == b': keepalive\n\n'
+    timer = threading.Timer(0.02, stream.publish, ('track_update', {'filename': 'b.mp3'}))
+    timer.start()
+    chunk = next(listener)
+    while chunk == b': keepalive\n\n':
+        chunk = next(listener)
+    assert b'b.mp3' in chunk
+
+
+def test_open_stream_does_not_stall_an_unpatched_server(tmp_path):
+    """Check that with COOPERATIVE_MODE=0 a waiting SSE listener leaves gevent's server free for /now_playing."""
+    process, base_url = start_server(server_env(tmp_path, COOPERATIVE_MODE='0', SSE_HEARTBEAT='5'))
+    try:
+        with urllib.request.urlopen(f"{base_url}/now_playing/stream", timeout=10) as stream:
+            assert stream.readline() == b'retry: 3000\n'
+            elapsed, _ = timed_get(f"{base_url}/now_playing")
+            assert elapsed < 1, f"/now_playing waited {elapsed:.3f}s behind the SSE listener"
+    finally:
+        process.kill()
+        process.wait()
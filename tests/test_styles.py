@@ -0,0 +1,52 @@
+from common.db import Database
+from common.styles import normalize_style, classify_style, reclassify_tracks, taxonomy, STYLE_VARIANTS
+
+
+def test_genre_tags_map_to_one_style():
+    """Check that every spelling maps to its style regardless of case, spacing and punctuation."""
+    for canonical, spellings in STYLE_VARIANTS.items():
+        for spelling in [canonical] + spellings:
+            assert normalize_style(spelling.upper()) == canonical
+    assert normalize_style("  Drum-N-Bass ") == "Drum & Bass"
+    assert normalize_style("jump up") == "Jump Up"
+    assert normalize_style("Blues") == "Blues"
+    assert normalize_style("dnb; jungle") == "Drum & Bass"
+    assert normalize_style("Techno") == "Unknown"
+    assert normalize_style("") == "Unknown"
+
+
+def test_style_named_in_title_or_artist():
+    """Check that styles are found as whole words, the first predefined style winning."""
+    assert taxonomy.match("Summer Ragga Jungle Mix") == "Jungle"
+    assert taxonomy.match("Deep Neurofunk & Liquid Funk") == "Liquid Funk"
+    assert taxonomy.match("Abundance", "Bluesman") == "Unknown"
+    assert classify_style("", "Night Drive", "Neurofunk Crew") == "Neurofunk"
+    assert classify_style("Dubstep", "Ambient DnB session", "") == "Ambient DnB"
+    assert classify_style("liquid", "Neurofunk", "") == "Liquid Funk"  # The genre tag comes first
+
+
+def test_reclassify_reports_then_applies(tmp_path):
+    """Check that a dry run changes nothing, the applied run rewrites the column as reported and curated styles are kept."""
+    db = Database(str(tmp_path / 'radio.db'))
+    conn = db.connect()
+    conn.execute("CREATE TABLE tracks (id INTEGER PRIMARY KEY, name TEXT, style TEXT, track_title TEXT, artist TEXT)")
+    conn.executemany("INSERT INTO tracks (name, style, track_title, artist) VALUES (?, ?, ?, ?)", [
+        ('a.mp3', 'Drum & Bass', 'A', 'X'),
+        ('b.mp3', 'Drum N Bass', 'B', 'Y'),
+        ('c.mp3', 'Techno', 'Jungle Tekno', 'Z'),
+        ('d.mp3', None, 'D', 'W'),
+        ('e.mp3', 'Unknown', 'Jungle Tekno', 'Z')
+    ])
+    conn.commit()
+    try:
+        report = reclassify_tracks(conn)
+        assert (report['applied'], report['total'], report['changed']) == (False, 5, 3)
+        assert {'old': 'Unknown', 'new': 'Jungle', 'count': 1} in report['transitions']
+        assert report['unmapped'] == [{'style': 'Techno', 'count': 1}]
+        assert conn.execute("SELECT style FROM tracks WHERE name = 'b.mp3'").fetchone()[0] == 'Drum N Bass'
+        assert reclassify_tracks(conn, apply=True)['changed'] == 3
+        styles = [row[0] for row in conn.execute("SELECT style FROM tracks ORDER BY id")]
+        assert styles == ['Drum & Bass', 'Drum & Bass', 'Techno', 'Unknown', 'Jungle']
+        assert reclassify_tracks(conn)['changed'] == 0
+    finally:
+        conn.close()
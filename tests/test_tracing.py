@@ -0,0 +1,38 @@
+import time
+from tracing import TransitionTracer
+
+
+def test_transition_is_timed_from_callback_to_ack():
+    """Check that stage, emit and ack timings of one transition reach the callbacks and the summary."""
+    stages, emits, acks = [], [], []
+    tracer = TransitionTracer(on_stage=lambda stage, seconds: stages.append(stage),
+                              on_emit=lambda callback, origin: emits.append((callback, origin)),
+                              on_ack=lambda seconds, transport: acks.append(transport))
+    trace = tracer.begin('t-1', time.time() - 0.5)
+    trace.mark('metadata')
+    trace.mark('publish')
+    tracer.emitted(trace.context())  # The coalesced emit may run before the callback returns
+    tracer.finish(trace)
+    assert tracer.acked('t-1', 'socketio')
+    assert stages == ['metadata', 'publish']
+    callback_to_emit, origin_to_emit = emits[0]
+    assert 0 <= callback_to_emit < 0.5 <= origin_to_emit
+    assert acks == ['socketio']
+    summary = tracer.snapshot()['recent'][0]
+    assert summary['id'] == 't-1'
+    assert set(summary['stages']) == {'metadata', 'publish'}
+    assert summary['acks'] == 1 and summary['first_ack_ms'] is not None
+
+
+def test_bad_input_is_not_trusted():
+    """Check that invalid trace ids and skewed origins are replaced, and unknown or unemitted acks are ignored."""
+    tracer = TransitionTracer(keep=2)
+    trace = tracer.begin('x' * 100, 'yesterday')
+    assert len(trace.id) == 16 and trace.origin_ts is None
+    assert tracer.begin(None, time.time() - 86400).origin_ts is None
+    assert not tracer.acked(trace.id, 'sse')  # Not emitted yet
+    tracer.begin('newest')
+    assert not tracer.acked('unknown', 'sse')
+    assert [summary['id'] for summary in tracer.snapshot()['recent']][0] == 'newest'
+    assert len(tracer.snapshot()['recent']) == 2
+    assert tracer.stats['ignored_acks'] == 2
@@ -0,0 +1,64 @@
+from track_cache import TrackCache
+
+
+class FakeTracks:
+    def __init__(self, count):
+        self.rows = {f"/audio/t{i}.mp3": {'id': i, 'name': f"t{i}.mp3", 'path': f"/audio/t{i}.mp3", 'duration': 180.0 + i}
+                     for i in range(count)}
+        self.queries = 0
+
+    def load(self, column, value):
+        self.queries += 1
+        for row in self.rows.values():
+            if row[column] == value:
+                return dict(row)
+        return None
+
+
+def test_repeated_lookups_are_served_from_memory():
+    """Check that lookups by path and name hit the database once and count hits and misses."""
+    tracks = FakeTracks(3)
+    cache = TrackCache(tracks.load)
+    for _ in range(5):
+        assert cache.get_by_path('/audio/t1.mp3')['duration'] == 181.0
+        assert cache.get_by_name('t1.mp3')['path'] == '/audio/t1.mp3'
+    assert tracks.queries == 1
+    assert cache.stats['hits'] == 9 and cache.stats['misses'] == 1
+
+
+def test_missing_tracks_are_not_cached():
+    """Check that a miss is retried, so a track inserted later is found on its next lookup."""
+    tracks = FakeTracks(1)
+    cache = TrackCache(tracks.load)
+    assert cache.get_by_path('/audio/new.mp3') is None
+    tracks.rows['/audio/new.mp3'] = {'id': 9, 'name': 'new.mp3', 'path': '/audio/new.mp3', 'duration': 60.0}
+    assert cache.get_by_path('/audio/new.mp3')['id'] == 9
+
+
+def test_lru_eviction_is_bounded():
+    """Check that the least recently used track is evicted once max_size is exceeded."""
+    tracks = FakeTracks(4)
+    cache = TrackCache(tracks.load, max_size=2)
+    cache.get_by_path('/audio/t0.mp3')
+    cache.get_by_path('/audio/t1.mp3')
+    cache.get_by_path('/audio/t0.mp3')
+    cache.get_by_path('/audio/t2.mp3')
+    assert len(cache) == 2
+    assert cache.stats['evictions'] == 1
+    assert cache.get_by_name('t1.mp3') is not None  # Evicted, reloaded from the database
+    assert tracks.queries == 4
+
+
+def test_invalidation_and_write_through():
+    """Check that invalidated rows are reloaded and update() changes the cached row in place."""
+    tracks = FakeTracks(2)
+    cache = TrackCache(tracks.load)
+    cache.get_by_path('/audio/t0.mp3')
+    cache.get_by_path('/audio/t1.mp3')
+    tracks.rows['/audio/t0.mp3']['duration'] = 1.0
+    assert cache.invalidate(names=['t0.mp3']) == 1
+    assert cache.get_by_path('/audio/t0.mp3')['duration'] == 1.0
+    cache.update('/audio/t1.mp3', duration=2.0)
+    assert cache.get_by_name('t1.mp3')['duration'] == 2.0
+    cache.clear()
+    assert len(cache) == 0